@@ -1,8 +1,15 @@
-from .game import Game
-from .player import Player
-from .fishing_system import FishingSystem
-from .shop import Shop
-from .item import Item
-from .equipment import Equipment
-from .monopoly import MonopolySystem
-__all__ = ['Game', 'Player', 'FishingSystem', 'Shop', 'Item', 'Equipment', 'MonopolySystem']
+try:
+    import plugins
+except ImportError:
+    # 不在 chatgpt-on-wechat 中加载(如在插件目录下直接运行测试)时不导出插件类
+    plugins = None
+
+if plugins is not None:
+    from .game import Game
+    from .player import Player
+    from .fishing_system import FishingSystem
+    from .shop import Shop
+    from .item import Item
+    from .equipment import Equipment
+    from .monopoly import MonopolySystem
+    __all__ = ['Game', 'Player', 'FishingSystem', 'Shop', 'Item', 'Equipment', 'MonopolySystem']
@@ -0,0 +1,42 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from common.log import logger
+
+
+class CommandPool:
+    """执行耗时命令的线程池,等待执行的任务数量有上限
+
+    线程池满且等待队列也满时 submit 直接返回 False,由调用方提示玩家稍后再试,
+    不会阻塞接收消息的线程。
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="GameCommand")
+        # 正在执行和排队中的任务总数上限
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def submit(self, func: Callable[[], None]) -> bool:
+        """提交任务,队列已满时返回 False"""
+        if not self._slots.acquire(blocking=False):
+            return False
+        try:
+            self._executor.submit(self._run, func)
+        except RuntimeError:
+            # 线程池已关闭
+            self._slots.release()
+            return False
+        return True
+
+    def _run(self, func: Callable[[], None]) -> None:
+        try:
+            func()
+        except Exception as e:
+            logger.error(f"后台执行命令出错: {e}")
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """等待已提交的任务执行完毕后关闭线程池"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,66 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class Command:
+    """一条游戏命令: 处理函数及其需要的参数
+
+    params 中的名字在调用时从当前消息的参数表中取值,可用的名字有
+    user_id、nickname、content、args(命令后的各个参数)、msg、group_id。
+    """
+
+    __slots__ = ('name', 'handler', 'params', 'always_available', 'heavy', 'read_only')
+
+    def __init__(self, name: str, handler: Callable, params: Sequence[str] = (),
+                 always_available: bool = False, heavy: bool = False, read_only: bool = False):
+        self.name = name
+        self.handler = handler
+        self.params = tuple(params)
+        # 游戏系统关闭时仍然可以使用的命令(注册和管理员命令)
+        self.always_available = always_available
+        # 耗时较长的命令,开启线程池时在后台线程中执行
+        self.heavy = heavy
+        # 只读取数据的命令,执行时不锁玩家,不会阻塞同一玩家的其他命令
+        self.read_only = read_only
+
+    def __call__(self, values: Dict[str, object]):
+        return self.handler(*[values[param] for param in self.params])
+
+
+class CommandRouter:
+    """命令路由表,插件初始化时建立一次
+
+    每条消息先只取第一个词,不是游戏命令时只需一次字典查找就会被放行;
+    命令后的各个参数以 args 传给处理函数,处理函数不再自己分词。
+    """
+
+    PARAMS = frozenset(('user_id', 'nickname', 'content', 'args', 'msg', 'group_id'))
+
+    def __init__(self):
+        self._commands: Dict[str, Command] = {}
+
+    def register(self, name: str, handler: Callable, params: Sequence[str] = (),
+                 always_available: bool = False, heavy: bool = False, read_only: bool = False) -> None:
+        """注册命令,params 为处理函数按顺序需要的参数名"""
+        unknown = set(params) - self.PARAMS
+        if unknown:
+            raise ValueError(f"命令 {name} 使用了未知参数: {', '.join(sorted(unknown))}")
+        self._commands[name] = Command(name, handler, params, always_available, heavy, read_only)
+
+    def match(self, content: str) -> Optional[Tuple[Command, List[str]]]:
+        """匹配消息对应的命令,返回 (命令, 命令后的各个参数);不是游戏命令时返回 None
+
+        只切出第一个词查表,匹配到命令后才对其余部分分词。
+        """
+        head = content.split(None, 1)
+        if not head:
+            return None
+        command = self._commands.get(head[0])
+        if command is None:
+            return None
+        return command, head[1].split() if len(head) > 1 else []
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._commands
+
+    def __len__(self) -> int:
+        return len(self._commands)
@@ -96,13 +96,13 @@ class Equipment:
             return f"没有装备{item_type}"
             
         # 更新背包
-        inventory = player.inventory  # 已经是 list 类型
+        inventory = player.inventory  # 已经是 Inventory 类型
         inventory.append(current_equipment)
         
         # 更新数据
         updates = {
             slot: '',
-            'inventory': inventory  # Player 类会自动处理 JSON 转换
+            'inventory': inventory  # Player 类会自动处理编码
         }
         self.game._update_player_data(user_id, updates)
         
@@ -115,24 +115,17 @@ class Equipment:
         if not player:
             return {'attack': 0, 'defense': 0, 'hp': 0}
             
-        items = self.game.item_system.get_all_items()
+        item_system = self.game.item_system
         stats = {'attack': 0, 'defense': 0, 'hp': 0}
         
-        # 计算武器加成
-        weapon = getattr(player, 'equipped_weapon', '')
-        if weapon and weapon in items:
-            weapon_item = items[weapon]
-            stats['attack'] += int(weapon_item.get('attack', 0))
-            stats['defense'] += int(weapon_item.get('defense', 0))
-            stats['hp'] += int(weapon_item.get('hp', 0))
-            
-        # 计算护甲加成
-        armor = getattr(player, 'equipped_armor', '')
-        if armor and armor in items:
-            armor_item = items[armor]
-            stats['attack'] += int(armor_item.get('attack', 0))
-            stats['defense'] += int(armor_item.get('defense', 0))
-            stats['hp'] += int(armor_item.get('hp', 0))
+        # 计算武器和护甲加成
+        for slot in ('equipped_weapon', 'equipped_armor'):
+            item_name = getattr(player, slot, '')
+            item = item_system.get_item(item_name) if item_name else None
+            if item:
+                stats['attack'] += item['attack']
+                stats['defense'] += item['defense']
+                stats['hp'] += item['hp']
             
         return stats
 
@@ -141,12 +134,11 @@ class Equipment:
         if not player.equipped_weapon:
             return 0
         
-        items = self.game.item_system.get_all_items()
-        weapon = items.get(player.equipped_weapon)
+        weapon = self.game.item_system.get_item(player.equipped_weapon)
         if not weapon:
             return 0
         
-        return int(weapon.get('attack', 0))
+        return weapon['attack']
 
     def get_armor_reduction(self, target) -> float:
         """获取护甲减伤比例"""
@@ -156,11 +148,10 @@ class Equipment:
         if not target.equipped_armor:
             return 0.0
         
-        items = self.game.item_system.get_all_items()
-        armor = items.get(target.equipped_armor)
+        armor = self.game.item_system.get_item(target.equipped_armor)
         if not armor:
             return 0.0
         
         # 将防御值转换为减伤比例,每点防御提供1%减伤,最高80%
-        reduction = min(0.8, int(armor.get('defense', 0)) * 0.01)
+        reduction = min(0.8, armor['defense'] * 0.01)
         return reduction
@@ -4,32 +4,100 @@ import json
 import datetime
 import os
 from common.log import logger
+from .item import Item
+
+
+class AliasSampler:
+    """Walker 别名表加权抽样器,建表 O(n),每次抽样 O(1)"""
+
+    def __init__(self, values: list, weights: list):
+        if not values or len(values) != len(weights):
+            raise ValueError("values 和 weights 必须非空且长度一致")
+        n = len(values)
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("权重之和必须大于0")
+        self.values = values
+        self._prob = [0.0] * n
+        self._alias = [0] * n
+        
+        # 按平均权重缩放后分为不足1和超过1的两组,用后者补齐前者
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self._prob[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # 剩余项因浮点误差接近1,直接视为满格
+        for i in large + small:
+            self._prob[i] = 1.0
+            self._alias[i] = i
+
+    def sample(self, rng=random):
+        """抽取一个值"""
+        i = int(rng.random() * len(self._prob))
+        if rng.random() < self._prob[i]:
+            return self.values[i]
+        return self.values[self._alias[i]]
+
 
 class FishingSystem:
+    # 鱼竿属性: 成功率、耐久加成、冷却缩减
+    ROD_ATTRIBUTES = {
+        '木制鱼竿': {
+            'base_chance': 0.6,
+            'durability_bonus': 1.0,
+            'cooldown_reduction': 1.0
+        },
+        '铁制鱼竿': {
+            'base_chance': 0.75,
+            'durability_bonus': 1.2,
+            'cooldown_reduction': 0.8
+        },
+        '金制鱼竿': {
+            'base_chance': 0.9,
+            'durability_bonus': 1.5,
+            'cooldown_reduction': 0.6
+        }
+    }
+    
+    # 鱼竿金币奖励加成
+    ROD_REWARD_BONUS = {
+        '木制鱼竿': 1.0,
+        '铁制鱼竿': 1.2,
+        '金制鱼竿': 1.5
+    }
+
     def __init__(self, data_dir):
         self.data_dir = data_dir
         self.item_file = os.path.join(data_dir, "items.csv")
+        self.item_system = Item(data_dir)
+        # 鱼类抽样器及其对应的物品目录版本
+        self._fish_sampler = None
+        self._fish_sampler_version = None
+
+    def _get_fish_sampler(self) -> AliasSampler:
+        """获取按稀有度加权的鱼类抽样器,物品目录更新后重建"""
+        catalog = self.item_system.catalog()
+        if self._fish_sampler is None or self._fish_sampler_version != catalog.version:
+            fish_data = list(catalog.fish.values())
+            # 稀有度越高越难钓到,权重为 1/稀有度
+            weights = [1 / (row['rarity'] or 1) for row in fish_data]
+            self._fish_sampler = AliasSampler(fish_data, weights)
+            self._fish_sampler_version = catalog.version
+        return self._fish_sampler
         
     def go_fishing(self, player, rod):
         """钓鱼主逻辑"""
         # 根据鱼竿类型设置基础属性
-        rod_attributes = {
-            '木制鱼竿': {
-                'base_chance': 0.6,
-                'durability_bonus': 1.0,
-                'cooldown_reduction': 1.0
-            },
-            '铁制鱼竿': {
-                'base_chance': 0.75,
-                'durability_bonus': 1.2,
-                'cooldown_reduction': 0.8
-            },
-            '金制鱼竿': {
-                'base_chance': 0.9,
-                'durability_bonus': 1.5,
-                'cooldown_reduction': 0.6
-            }
-        }[rod]
+        rod_attributes = self.ROD_ATTRIBUTES[rod]
         
         base_chance = rod_attributes['base_chance']
         durability_bonus = rod_attributes['durability_bonus']
@@ -42,32 +110,16 @@ class FishingSystem:
         
         # 随机判断是否钓到鱼
         if random.random() < base_chance:
-            # 读取鱼的数据
-            fish_data = []
-            with open(self.item_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['type'] == 'fish':  # 只获取鱼类物品
-                        fish_data.append(row)
-                
             # 根据稀有度加权随机选择一条鱼
-            weights = [1/int(row.get('rarity', '1')) for row in fish_data]
-            total_weight = sum(weights)
-            normalized_weights = [w/total_weight for w in weights]
-            
-            caught_fish = random.choices(fish_data, normalized_weights)[0]
+            caught_fish = self._get_fish_sampler().sample()
             
             # 修改耐久度消耗计算
             base_durability_cost = random.randint(5, 15)
             durability_cost = max(1, int(base_durability_cost / durability_bonus))
             
             # 修改金币奖励计算逻辑
-            base_reward = int(caught_fish.get('price', '0')) * 0.3
-            rod_bonus = {
-                '木制鱼竿': 1.0,
-                '铁制鱼竿': 1.2,
-                '金制鱼竿': 1.5
-            }[rod]
+            base_reward = caught_fish['price'] * 0.3
+            rod_bonus = self.ROD_REWARD_BONUS[rod]
             
             coins_reward = max(1, int(base_reward * rod_bonus))
             
@@ -83,12 +135,12 @@ class FishingSystem:
             # 计算耐久度百分比
             remaining_durability = current_durability - durability_cost
             
-            stars = "⭐" * int(caught_fish.get('rarity', '1'))
+            stars = "⭐" * caught_fish['rarity']
             message = f"{random.choice(fishing_messages)}\n"
             message += f"━━━━━━━━━━━━━━━\n"
             message += f"🎣 你钓到了 {caught_fish['name']}\n"
             message += f"📊 稀有度: {stars}\n"
-            message += f"💰 基础价值: {caught_fish.get('price', '0')}金币\n"
+            message += f"💰 基础价值: {caught_fish['price']}金币\n"
             message += f"🎯 鱼竿加成: x{rod_bonus} ({rod})\n"
             message += f"🪙 实际获得: {coins_reward}金币\n"
             message += f"⚡ 耐久消耗: -{durability_cost} ({remaining_durability}/100)\n"
@@ -129,23 +181,11 @@ class FishingSystem:
 
     def show_collection(self, player, page=1, search_term=""):
         """显示鱼类图鉴"""
-        # 读取玩家背包
-        inventory = player.inventory
-        
-        # 统计鱼的数量
-        from collections import Counter
-        fish_counts = Counter(inventory)
+        # 读取玩家背包,背包已按物品堆叠存放,直接作为鱼的数量使用
+        fish_counts = player.inventory
         
         # 读取所有鱼类信息
-        fish_data = {}
-        with open(self.item_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row['type'] == 'fish':  # 只获取鱼类物品
-                    fish_data[row['name']] = {
-                        'rarity': int(row['rarity']),
-                        'price': int(row['price'])
-                    }
+        fish_data = self.item_system.get_items_by_type('fish')
         
         # 按稀有度排序
         sorted_fish = sorted(fish_data.items(), key=lambda x: (-x[1]['rarity'], x[0]))
@@ -185,3 +225,64 @@ class FishingSystem:
         collection += "• 图鉴 [鱼名] - 搜索特定鱼类"
         
         return collection
+
+    def go_fishing_batch(self, player, rod, casts: int) -> dict:
+        """连续钓鱼 casts 次,鱼竿耐久耗尽时提前结束
+
+        先一次性抽取全部成功判定和耐久消耗,确定实际钓鱼次数后再批量抽取鱼,
+        返回汇总结果,由调用方一次性更新玩家数据。
+        """
+        rod_attributes = self.ROD_ATTRIBUTES[rod]
+        base_chance = rod_attributes['base_chance']
+        durability_bonus = rod_attributes['durability_bonus']
+        rod_bonus = self.ROD_REWARD_BONUS[rod]
+        current_durability = player.rod_durability.get(rod, 100)
+        
+        # 批量抽取每次的成功判定和耐久消耗(钓到鱼消耗5-15,未钓到消耗1-5)
+        successes = [random.random() < base_chance for _ in range(casts)]
+        costs = [
+            max(1, int(random.randint(5, 15) / durability_bonus)) if success
+            else max(1, int(random.randint(1, 5) / durability_bonus))
+            for success in successes
+        ]
+        
+        # 累计耐久消耗,耐久耗尽的那一次仍然有效,之后不再继续
+        used = 0
+        durability_cost = 0
+        for cost in costs:
+            used += 1
+            durability_cost += cost
+            if durability_cost >= current_durability:
+                break
+        
+        # 批量抽取钓到的鱼并汇总
+        sampler = self._get_fish_sampler()
+        caught = {}
+        coins_reward = 0
+        for _ in range(sum(successes[:used])):
+            fish = sampler.sample()
+            caught[fish['name']] = caught.get(fish['name'], 0) + 1
+            coins_reward += max(1, int(fish['price'] * 0.3 * rod_bonus))
+        
+        remaining_durability = max(0, current_durability - durability_cost)
+        message = f"🎣 连续钓鱼 {used} 次\n"
+        message += f"━━━━━━━━━━━━━━━\n"
+        if caught:
+            message += f"🐟 钓到 {sum(caught.values())} 条鱼:\n"
+            for fish_name, count in sorted(caught.items(), key=lambda x: -x[1]):
+                message += f"  {fish_name} x{count}\n"
+            message += f"🎯 鱼竿加成: x{rod_bonus} ({rod})\n"
+            message += f"🪙 实际获得: {coins_reward}金币\n"
+        else:
+            message += "🌊 一条鱼都没钓到...\n"
+        message += f"⚡ 耐久消耗: -{durability_cost} ({remaining_durability}/100)\n"
+        message += f"🎲 当前幸运值: {base_chance*100:.0f}%\n"
+        message += f"━━━━━━━━━━━━━━━"
+        
+        return {
+            'casts': used,
+            'caught': caught,
+            'durability_cost': durability_cost,
+            'coins_reward': coins_reward,
+            'message': message
+        }
@@ -8,8 +8,12 @@ from bridge.reply import Reply, ReplyType
 from channel.chat_message import ChatMessage
 import plugins
 import time
-from typing import Optional
+import atexit
+import threading
+from functools import partial
+from typing import Dict, List, Optional
 from .player import Player
+from .player_store import PlayerStore
 from .fishing_system import FishingSystem
 import datetime
 from .shop import Shop
@@ -17,6 +21,14 @@ from .item import Item
 from .equipment import Equipment
 import json
 from .monopoly import MonopolySystem
+from .storage import SqliteStorage
+from .leaderboard import RollingEarnings
+from .reminder_board import ReminderBoard
+from .scheduler import TaskScheduler
+from .game_config import ConfigService
+from .command_router import CommandRouter
+from .player_lock import PlayerLockBusy, PlayerLockManager
+from .command_pool import CommandPool
 
 @plugins.register(
     name="Game",
@@ -38,7 +50,11 @@ class Game(Plugin):
     # 添加开关机状态和进程锁相关变量
     PROCESS_LOCK_FILE = "game_process.lock"
     game_status = True  # 游戏系统状态
-    scheduled_tasks = {}  # 定时任务字典
+    MAX_FISHING_CASTS = 10  # 一条"钓鱼 N"命令最多连续钓鱼的次数
+    # 耗时较长的命令,配置了 worker_threads 时在线程池中执行
+    HEAVY_COMMANDS = frozenset(("攻击", "排行榜", "地图", "外出"))
+    # 只读取数据的命令,执行时不锁玩家
+    READ_ONLY_COMMANDS = frozenset(("排行榜", "地图"))
 
     # 添加新的类变量
     REMINDER_COST = 50  # 每条提醒消息的费用
@@ -55,6 +71,8 @@ class Game(Plugin):
             
             # 初始化进程锁文件路径
             self.process_lock_file = os.path.join(self.data_dir, self.PROCESS_LOCK_FILE)
+            # 调度线程和命令线程都会保存游戏状态,写文件时加锁
+            self._state_lock = threading.Lock()
             
             # 恢复游戏状态和定时任务
             self._restore_game_state()
@@ -93,6 +111,47 @@ class Game(Plugin):
                     writer = csv.writer(f)
                     writer.writerow(self.STANDARD_FIELDS)
             
+            # 初始化配置: 只在加载时读取和校验一次,文件修改后自动重新加载
+            self.config_service = ConfigService(os.path.join(self.data_dir, "config.json"))
+            config = self.config_service.config
+            
+            # 初始化存储后端: 默认使用 CSV/JSON 文件,配置 "storage": "sqlite" 时使用 SQLite
+            self.storage = None
+            if config.storage == "sqlite":
+                self.storage = SqliteStorage(os.path.join(self.data_dir, "game.db"), self.STANDARD_FIELDS)
+                self.storage.import_legacy_files(
+                    self.player_file,
+                    os.path.join(self.data_dir, "properties.json"),
+                    os.path.join(self.data_dir, "reminders.json")
+                )
+            
+            # 初始化玩家数据存储(内存索引),开启 write_behind 后由后台线程批量写入
+            self.player_store = PlayerStore(
+                self.player_file,
+                self.STANDARD_FIELDS,
+                storage=self.storage,
+                write_behind=config.write_behind,
+                flush_interval=config.flush_interval,
+                flush_threshold=config.flush_threshold
+            )
+            # 按玩家分段加锁,不同玩家的命令可以并行执行
+            self.player_locks = PlayerLockManager()
+            # 排行榜索引随金币、等级、经验的变化增量更新
+            self.player_store.add_ranking('gold', lambda r: r['gold'], ('gold',))
+            self.player_store.add_ranking('level', lambda r: (r['level'], r['exp']), ('level', 'exp'))
+            # 群成员关系,用于本群排行榜
+            self.groups_file = os.path.join(self.data_dir, "groups.json")
+            # 不同玩家的命令并行执行,写群成员文件时加锁
+            self._groups_lock = threading.Lock()
+            self._load_groups()
+            # 今日/本周收益排行的滚动计数器
+            self.earnings_file = os.path.join(self.data_dir, "earnings.json")
+            self._earnings_lock = threading.Lock()
+            self._load_earnings()
+            self.player_store.add_flush_hook(self._save_earnings)
+            # 进程退出时同步写入尚未落盘的数据
+            atexit.register(self.unload)
+            
             # 初始化钓鱼系统
             self.fishing_system = FishingSystem(self.data_dir)
             self.shop = Shop(self)
@@ -102,24 +161,47 @@ class Game(Plugin):
             
             # 初始化提醒系统
             self.reminders = {}  # 格式: {user_id: {'content': str, 'expire_time': int}}
+            # 保存提醒时加锁,保证后写入的总是最新的提醒
+            self._reminders_lock = threading.Lock()
             self._load_reminders()  # 从文件加载提醒
             
-            # 初始化配置文件
-            config_file = os.path.join(self.data_dir, "config.json")
-            if not os.path.exists(config_file):
-                default_config = {
-                    "admins": ["xxx"]  # 默认管理员列表
-                }
-                with open(config_file, 'w', encoding='utf-8') as f:
-                    json.dump(default_config, f, ensure_ascii=False, indent=2)
-            
             # 初始化大富翁系统
-            self.monopoly = MonopolySystem(self.data_dir)
+            self.monopoly = MonopolySystem(self.data_dir, storage=self.storage)
+            self._map_cache = None  # (地图版本, 各行文本, 位置所在行号, 地块标签)
+            
+            # 命令路由表只建立一次
+            self.router = self._build_router()
+            # 耗时命令线程池,线程数和队列长度在启动时确定
+            self.command_pool = None
+            if config.worker_threads > 0:
+                self.command_pool = CommandPool(config.worker_threads, config.worker_queue_size)
             
         except Exception as e:
             logger.error(f"初始化游戏系统出错: {e}")
+            # 停止已经启动的后台线程,避免初始化失败的实例一直残留
+            for name in ('scheduler', 'player_store'):
+                component = getattr(self, name, None)
+                if component is not None:
+                    component.close()
             raise
     
+    def unload(self):
+        """卸载插件: 停止后台写入线程并同步写入全部数据"""
+        # 热重载时旧实例已经卸载,取消退出钩子,避免旧实例一直被引用并在退出时再次卸载
+        atexit.unregister(self.unload)
+        try:
+            self.scheduler.close()
+            if self.command_pool is not None:
+                self.command_pool.close()
+                self.command_pool = None
+            self.player_store.close()
+            self._save_earnings()
+            if self.storage is not None:
+                self.storage.close()
+                self.storage = None
+        except Exception as e:
+            logger.error(f"卸载游戏系统出错: {e}")
+
     def _migrate_data_files(self):
         """数据文件迁移和兼容性检查"""
         # 标准字段列表
@@ -139,7 +221,7 @@ class Game(Plugin):
             'attack': '10',
             'defense': '5',
             'exp': '0',
-            'inventory': '[]',
+            'inventory': '{}',
             'rod_durability': '{}',
             'equipped_weapon': '',
             'equipped_armor': '',
@@ -204,13 +286,75 @@ class Game(Plugin):
                     import shutil
                     shutil.copy2(self.player_file, backup_file)
 
+    def _load_groups(self):
+        """从文件加载群成员关系"""
+        if not os.path.exists(self.groups_file):
+            return
+        try:
+            with open(self.groups_file, 'r', encoding='utf-8') as f:
+                self.player_store.load_groups(json.load(f))
+        except Exception as e:
+            logger.error(f"加载群成员数据出错: {e}")
+
+    def _join_group(self, group_id, user_id):
+        """记录玩家所属的群,出现新成员时保存到文件"""
+        if not self.player_store.add_group_member(group_id, user_id):
+            return
+        # 在锁内取快照再写入,并发加入新成员时文件中不会丢失后加入的成员
+        with self._groups_lock:
+            try:
+                with open(self.groups_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.player_store.groups(), f, ensure_ascii=False)
+            except Exception as e:
+                logger.error(f"保存群成员数据出错: {e}")
+
+    def _load_earnings(self):
+        """从文件加载今日/本周收益计数"""
+        data = {}
+        if os.path.exists(self.earnings_file):
+            try:
+                with open(self.earnings_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.error(f"加载收益数据出错: {e}")
+        self.earnings = RollingEarnings.from_dict(data)
+        self._earnings_saved_version = self.earnings.version
+
+    def _save_earnings(self):
+        """保存今日/本周收益计数到文件,计数没有变化时跳过
+
+        随玩家数据定期调用,写入临时文件后原子替换,进程被强制结束时最多丢失一个写入间隔的数据。
+        """
+        with self._earnings_lock:
+            version = self.earnings.version
+            if version == self._earnings_saved_version:
+                return
+            tmp_file = f"{self.earnings_file}.tmp"
+            try:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.earnings.to_dict(), f, ensure_ascii=False)
+                os.replace(tmp_file, self.earnings_file)
+                self._earnings_saved_version = version
+            except Exception as e:
+                logger.error(f"保存收益数据出错: {e}")
+
+    def _record_earnings(self, user_id, gold=0, exp=0):
+        """记录玩家获得的金币和经验,供今日/本周排行使用
+
+        在命令的工作单元提交后才计入,命令中途出错时不会统计没有实际发放的收益。
+        """
+        self.player_store.after_commit(partial(self.earnings.add, str(user_id), gold, exp))
+
     def _load_reminders(self):
         """从文件加载提醒数据"""
         reminder_file = os.path.join(self.data_dir, "reminders.json")
-        if os.path.exists(reminder_file):
+        if self.storage is not None or os.path.exists(reminder_file):
             try:
-                with open(reminder_file, 'r', encoding='utf-8') as f:
-                    self.reminders = json.load(f)
+                if self.storage is not None:
+                    self.reminders = self.storage.load_reminders()
+                else:
+                    with open(reminder_file, 'r', encoding='utf-8') as f:
+                        self.reminders = json.load(f)
                 # 清理过期提醒
                 current_time = int(time.time())
                 self.reminders = {
@@ -220,26 +364,48 @@ class Game(Plugin):
             except Exception as e:
                 logger.error(f"加载提醒数据出错: {e}")
                 self.reminders = {}
+        self.reminder_board = ReminderBoard(self.reminders, self._resolve_nicknames)
 
-    def _save_reminders(self):
-        """保存提醒数据到文件"""
-        reminder_file = os.path.join(self.data_dir, "reminders.json")
-        try:
-            with open(reminder_file, 'w', encoding='utf-8') as f:
-                json.dump(self.reminders, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"保存提醒数据出错: {e}")
+    def _resolve_nicknames(self, user_ids):
+        """批量把 user_id 解析为昵称"""
+        return {user_id: player.nickname for user_id, player in self.get_players(user_ids).items()}
+
+    def _save_reminders(self, user_id=None):
+        """保存提醒数据到文件
+        
+        Args:
+            user_id: 发生变更的玩家ID,使用数据库存储时只写入这一条
+        """
+        # 提醒字典可能正被其他线程修改,在锁内从公告板取副本后再写入
+        with self._reminders_lock:
+            if self.storage is not None and user_id is not None:
+                try:
+                    reminder = self.reminder_board.get(user_id)
+                    if reminder is not None:
+                        self.storage.save_reminder(user_id, reminder)
+                    else:
+                        self.storage.delete_reminder(user_id)
+                except Exception as e:
+                    logger.error(f"保存提醒数据出错: {e}")
+                return
+                
+            reminder_file = os.path.join(self.data_dir, "reminders.json")
+            try:
+                with open(reminder_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.reminder_board.snapshot(), f, ensure_ascii=False, indent=2)
+            except Exception as e:
+                logger.error(f"保存提醒数据出错: {e}")
 
-    def set_reminder(self, user_id, content):
+    def set_reminder(self, user_id, args):
         """设置提醒"""
         player = self.get_player(user_id)
         if not player:
             return "您还没有注册游戏"
             
-        if len(content.split()) < 2:
+        if not args:
             return "请使用正确的格式：提醒 内容"
             
-        reminder_content = ' '.join(content.split()[1:])
+        reminder_content = ' '.join(args)
         # 去除感叹号和加号
         reminder_content = reminder_content.replace('!', '').replace('！', '').replace('+', '')
         
@@ -255,35 +421,81 @@ class Game(Plugin):
         self._update_player_data(user_id, {'gold': str(new_gold)})
         
         # 保存提醒
-        self.reminders[user_id] = {
-            'content': reminder_content,
-            'expire_time': int(time.time()) + self.REMINDER_DURATION
-        }
-        self._save_reminders()
+        self.reminder_board.set(user_id, reminder_content, int(time.time()) + self.REMINDER_DURATION)
+        self._save_reminders(user_id)
         
         return f"提醒设置成功！消息将在24小时内显示在每条游戏回复后面\n花费: {self.REMINDER_COST}金币"
 
     def get_active_reminders(self):
-        """获取所有有效的提醒"""
-        current_time = int(time.time())
-        active_reminders = []
-        
-        for user_id, reminder in self.reminders.items():
-            if reminder['expire_time'] > current_time:
-                player = self.get_player(user_id)
-                if player:
-                    active_reminders.append(f"[{player.nickname}]: {reminder['content']}")
-                    
-        return "\n".join(active_reminders) if active_reminders else ""
+        """获取所有有效的提醒,提醒没有变化时直接返回缓存的文本"""
+        for user_id in self.reminder_board.expire():
+            self._save_reminders(user_id)
+        return self.reminder_board.banner()
+
+    def _build_router(self) -> CommandRouter:
+        """建立命令路由表: 命令 -> 处理函数和参数"""
+        router = CommandRouter()
+        commands = [
+            ("状态", self.get_player_status, ('user_id',)),
+            ("个人状态", self.get_player_status, ('user_id',)),
+            ("签到", self.daily_checkin, ('user_id',)),
+            ("商店", self.shop.show_shop, ('args',)),
+            ("购买", self.shop.buy_item, ('user_id', 'args')),
+            ("背包", self.show_inventory, ('user_id',)),
+            ("装备", self.equip_from_inventory, ('user_id', 'args')),
+            ("游戏菜单", self.game_help, ()),
+            ("赠送", self.give_item, ('user_id', 'args', 'msg')),
+            ("钓鱼", self.fishing, ('user_id', 'args')),
+            ("图鉴", self.show_fish_collection, ('user_id', 'args')),
+            ("出售", self.shop.sell_item, ('user_id', 'args')),
+            ("批量出售", partial(self.shop.sell_item, bulk=True), ('user_id', 'args')),
+            ("外出", self.go_out, ('user_id',)),
+            ("使用", self.use_item, ('user_id', 'args')),
+            ("排行榜", self.show_leaderboard, ('user_id', 'args', 'group_id')),
+            ("求婚", self.propose_marriage, ('user_id', 'args', 'msg')),
+            ("同意求婚", self.accept_marriage, ('user_id',)),
+            ("拒绝求婚", self.reject_marriage, ('user_id',)),
+            ("离婚", self.divorce, ('user_id',)),
+            ("攻击", self.attack_player, ('user_id', 'args', 'msg')),
+            ("提醒", self.set_reminder, ('user_id', 'args')),
+            ("删除提醒", self.delete_reminder, ('user_id',)),
+            ("购买地块", self.buy_property, ('user_id',)),
+            ("升级地块", self.upgrade_property, ('user_id',)),
+            ("我的地产", self.show_properties, ('user_id',)),
+            ("地图", self.show_map, ('user_id',)),
+        ]
+        for name, handler, params in commands:
+            router.register(name, handler, params, heavy=name in self.HEAVY_COMMANDS,
+                            read_only=name in self.READ_ONLY_COMMANDS)
+        
+        # 游戏系统关闭时仍可使用的注册和管理员命令
+        router.register("注册", self.register_player, ('user_id', 'nickname'), always_available=True)
+        admin_commands = [
+            ("开机", partial(self.toggle_game_system, action='start'), ('user_id',)),
+            ("关机", partial(self.toggle_game_system, action='stop'), ('user_id',)),
+            ("定时", self.schedule_game_system, ('user_id', 'args')),
+            ("查看定时", self.show_scheduled_tasks, ('user_id',)),
+            ("取消定时", self.cancel_scheduled_task, ('user_id', 'args')),
+            ("清空定时", self.clear_scheduled_tasks, ('user_id',)),
+            ("重载配置", self.reload_config, ('user_id',)),
+        ]
+        for name, handler, params in admin_commands:
+            router.register(name, handler, params, always_available=True)
+        return router
 
     def on_handle_context(self, e_context: EventContext):
         if e_context['context'].type != ContextType.TEXT:
             return
             
-        # 在处理任何命令前，先检查定时任务
-        self._check_scheduled_tasks()
+        content = e_context['context'].content
+        # 不是游戏命令的消息直接放行,不做其他处理
+        matched = self.router.match(content)
+        if matched is None:
+            e_context.action = EventAction.CONTINUE
+            return
+        command, args = matched
+        content = content.strip()
         
-        content = e_context['context'].content.strip()
         msg: ChatMessage = e_context['context']['msg']
         
         # 获取用户ID作为主要标识符
@@ -295,61 +507,84 @@ class Game(Plugin):
         if not current_id:
             return "无法获取您的ID，请确保ID已设置"
             
-        if not self.game_status and content not in ['注册', '开机', '关机', '定时', '查看定时', '取消定时', '清空定时']:
+        # 群聊中记录玩家所属的群,用于本群排行榜
+        group_id = msg.other_user_id if msg.is_group else None
+        if group_id:
+            self._join_group(group_id, current_id)
+            
+        if not self.game_status and not command.always_available:
             return "游戏系统当前已关闭"
             
         logger.debug(f"当前用户信息 - current_id: {current_id}")
         
-        # 修改这里：更新 lambda 函数定义，使其接受两个参数
-        cmd_handlers = {
-            "注册": lambda i, n: self.register_player(i, n),
-            "状态": lambda i, n: self.get_player_status(i),
-            "个人状态": lambda i, n: self.get_player_status(i),
-            "签到": lambda i, n: self.daily_checkin(i),
-            "商店": lambda i, n: self.shop.show_shop(content),
-            "购买": lambda i, n: self.shop.buy_item(i, content),
-            "背包": lambda i, n: self.show_inventory(i),
-            "装备": lambda i, n: self.equip_from_inventory(i, content),
-            "游戏菜单": lambda i, n: self.game_help(),
-            "赠送": lambda i, n: self.give_item(i, content, msg),
-            "钓鱼": lambda i, n: self.fishing(i),  
-            "图鉴": lambda i, n: self.show_fish_collection(i, content),
-            "出售": lambda i, n: self.shop.sell_item(i, content),
-            "批量出售": lambda i, n: self.shop.sell_item(i, content),
-            "外出": lambda i, n: self.go_out(i),
-            "使用": lambda i, n: self.use_item(i, content),
-            "排行榜": lambda i, n: self.show_leaderboard(i, content),
-            "求婚": lambda i, n: self.propose_marriage(i, content, msg),
-            "同意求婚": lambda i, n: self.accept_marriage(i),
-            "拒绝求婚": lambda i, n: self.reject_marriage(i),
-            "离婚": lambda i, n: self.divorce(i),
-            "攻击": lambda i, n: self.attack_player(i, content, msg),
-            "开机": lambda i, n: self.toggle_game_system(i, 'start'),
-            "关机": lambda i, n: self.toggle_game_system(i, 'stop'),
-            "定时": lambda i, n: self.schedule_game_system(i, content),
-            "查看定时": lambda i, n: self.show_scheduled_tasks(i),
-            "取消定时": lambda i, n: self.cancel_scheduled_task(i, content),
-            "清空定时": lambda i, n: self.clear_scheduled_tasks(i),
-            "提醒": lambda i, n: self.set_reminder(i, content),
-            "删除提醒": lambda i, n: self.delete_reminder(i),
-            "购买地块": lambda i, n: self.buy_property(i),
-            "升级地块": lambda i, n: self.upgrade_property(i),
-            "我的地产": lambda i, n: self.show_properties(i),
-            "地图": lambda i, n: self.show_map(i),
+        values = {
+            'user_id': current_id,
+            'nickname': nickname,
+            'content': content,
+            'args': args,
+            'msg': msg,
+            'group_id': group_id,
         }
         
-        cmd = content.split()[0]
-        if cmd in cmd_handlers:
-            reply = cmd_handlers[cmd](current_id, nickname)
-            # 添加活动提醒
-            reminders = self.get_active_reminders()
-            if reminders:
-                reply += f"\n\n📢 当前提醒:\n{reminders}"
-                reply += "\n📢 如何使用提醒:\n设置提醒: 提醒 内容"
-            e_context['reply'] = Reply(ReplyType.TEXT, reply)
+        if self.command_pool is None:
+            e_context['reply'] = Reply(ReplyType.TEXT, self._run_command(command, values))
             e_context.action = EventAction.BREAK_PASS
+            return
+        
+        # 耗时命令交给线程池执行,完成后通过通道单独发送回复
+        if command.heavy:
+            self._submit_command(e_context, command, values)
+            return
+        try:
+            # 接收消息的线程不等待玩家锁
+            reply = self._run_command(command, values, blocking=False)
+        except PlayerLockBusy:
+            # 玩家锁被后台执行的命令占用,转交线程池排队执行
+            self._submit_command(e_context, command, values)
+            return
+        e_context['reply'] = Reply(ReplyType.TEXT, reply)
+        e_context.action = EventAction.BREAK_PASS
+
+    def _submit_command(self, e_context, command, values):
+        """把命令交给线程池执行,队列已满时直接回复玩家稍后再试"""
+        channel = e_context['channel']
+        context = e_context['context']
+        task = lambda: self._run_pooled_command(channel, context, command, values)
+        if not self.command_pool.submit(task):
+            e_context['reply'] = Reply(ReplyType.TEXT, "当前请求较多，请稍后再试")
+        e_context.action = EventAction.BREAK_PASS
+
+    def _run_pooled_command(self, channel, context, command, values):
+        """在线程池中执行命令,回复和同步回复一样经过装饰后再发送"""
+        try:
+            reply = Reply(ReplyType.TEXT, self._run_command(command, values))
+        except Exception as e:
+            logger.error(f"执行命令 {command.name} 出错: {e}")
+            reply = Reply(ReplyType.TEXT, "处理命令时出错，请稍后再试")
+        # 与通道处理同步回复的流程一致: 触发 ON_DECORATE_REPLY 和 ON_SEND_REPLY 后发送
+        reply = channel._decorate_reply(context, reply)
+        channel._send_reply(context, reply)
+
+    def _run_command(self, command, values, blocking=True) -> str:
+        """执行命令并在回复后附加活动提醒
+
+        blocking 为 False 时玩家锁被占用会抛出 PlayerLockBusy,此时命令的玩家数据修改都没有写入,可以转交线程池重新执行。
+        """
+        def execute():
+            # 同一条命令内的玩家数据修改合并为一次写入
+            with self.player_store.unit_of_work():
+                return command(values)
+        if command.read_only:
+            reply = execute()
         else:
-            e_context.action = EventAction.CONTINUE
+            # 命令执行和写入期间锁住当前玩家,涉及的其他玩家由处理函数追加加锁
+            reply = self.player_locks.run((values['user_id'],), execute, blocking=blocking)
+        # 添加活动提醒
+        reminders = self.get_active_reminders()
+        if reminders:
+            reply += f"\n\n📢 当前提醒:\n{reminders}"
+            reply += "\n📢 如何使用提醒:\n设置提醒: 提醒 内容"
+        return reply
 
     def game_help(self):
         import time
@@ -378,7 +613,7 @@ class Game(Plugin):
 
 冒险相关
 ————————————
-🎣 钓鱼 - 进行钓鱼获取金币
+🎣 钓鱼 [次数] - 进行钓鱼获取金币,可连续钓多次
 📖 图鉴 - 查看鱼类图鉴
 🌄 外出 - 外出探险冒险
 👊 攻击 [@用户] - 攻击其他玩家
@@ -399,7 +634,7 @@ class Game(Plugin):
 
 其他功能
 ————————————
-🏆 排行榜 [类型] - 查看排行榜
+🏆 排行榜 [金币/等级/今日/本周] - 查看排行榜
 🔔 提醒 [内容] - 设置提醒
 🗑️ 删除提醒 - 删除提醒
 
@@ -411,6 +646,7 @@ class Game(Plugin):
 📋 查看定时 - 查看定时任务
 ❌ 取消定时 [开机/关机] [时间] - 取消定时任务
 🗑️ 清空定时 - 清空所有定时任务
+🔄 重载配置 - 重新加载配置文件
 
 系统时间: {}
 """.format(time.strftime('%Y-%m-%d %H:%M:%S', time.localtime()))
@@ -442,9 +678,7 @@ class Game(Plugin):
             player.standard_fields = self.STANDARD_FIELDS
             
             # 保存玩家数据
-            with open(self.player_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=self.STANDARD_FIELDS)
-                writer.writerow(player.to_dict())
+            self.player_store.add(player.to_record())
             
             return f"注册成功！"
         except Exception as e:
@@ -454,18 +688,43 @@ class Game(Plugin):
     def get_player(self, user_id) -> Optional[Player]:
         """获取玩家数据"""
         try:
-            player = Player.get_player(user_id, self.player_file)
-            if player:
-                # 设置必要的文件信息
-                player.player_file = self.player_file
-                player.standard_fields = self.STANDARD_FIELDS
-            return player
+            data = self.player_store.get(user_id)
+            if data is None:
+                logger.debug(f"未找到用户ID为 {user_id} 的玩家数据")
+                return None
+            return Player(data, self.player_file, self.STANDARD_FIELDS, store=self.player_store)
         except Exception as e:
             logger.error(f"获取玩家数据出错: {e}")
             raise
 
-    def fishing(self, user_id):
-        """钓鱼"""
+    def get_players(self, user_ids) -> Dict[str, Player]:
+        """批量获取玩家数据,返回 user_id -> Player,不存在的玩家不会出现在结果中"""
+        records = self.player_store.get_many(user_ids)
+        return {
+            user_id: Player(data, self.player_file, self.STANDARD_FIELDS, store=self.player_store)
+            for user_id, data in records.items()
+        }
+
+    def get_player_by_nickname(self, nickname) -> Optional[Player]:
+        """根据昵称获取玩家数据,昵称重复时返回最早注册的玩家"""
+        data = self.player_store.get_by_nickname(nickname)
+        if data is None:
+            logger.debug(f"未找到昵称为 {nickname} 的玩家数据")
+            return None
+        return Player(data, self.player_file, self.STANDARD_FIELDS, store=self.player_store)
+
+    def fishing(self, user_id, args=()):
+        """钓鱼,"钓鱼 N" 一次连续钓 N 次并按次数计算冷却"""
+        # 解析连续钓鱼次数
+        casts = 1
+        if args:
+            try:
+                casts = int(args[0])
+            except ValueError:
+                return f"请使用正确的格式：钓鱼 [次数(1-{self.MAX_FISHING_CASTS})]"
+            if casts < 1 or casts > self.MAX_FISHING_CASTS:
+                return f"连续钓鱼次数必须在1到{self.MAX_FISHING_CASTS}之间"
+                
         player = self.get_player(user_id)
         if not player:
             return "您还没注册,请先注册"
@@ -493,34 +752,41 @@ class Game(Plugin):
                 return f"钓鱼冷却中，还需等待 {remaining.seconds} 秒"
         
         # 调用钓鱼系统
-        result = self.fishing_system.go_fishing(player, rod)
+        if casts > 1:
+            result = self.fishing_system.go_fishing_batch(player, rod, casts)
+            caught = result['caught']
+            # 连续钓鱼按实际次数计算冷却: 把上次钓鱼时间推后 (次数-1) 个冷却周期
+            last_fishing = now + datetime.timedelta(minutes=3) * (result['casts'] - 1)
+        else:
+            result = self.fishing_system.go_fishing(player, rod)
+            caught = {result['fish']['name']: 1} if result['success'] else {}
+            last_fishing = now
         
         # 更新玩家数据
         updates = {
-            'last_fishing': now.strftime('%Y-%m-%d %H:%M:%S')
+            'last_fishing': last_fishing.strftime('%Y-%m-%d %H:%M:%S')
         }
         
         # 处理耐久度
         rod_durability = player.rod_durability
         new_durability = max(0, rod_durability.get(rod, 100) - result['durability_cost'])
         rod_durability[rod] = new_durability
-        updates['rod_durability'] = json.dumps(rod_durability)
+        updates['rod_durability'] = rod_durability
         
         # 如果钓到鱼
-        if result['success']:
-            new_inventory = inventory + [result['fish']['name']]
-            updates['inventory'] = json.dumps(new_inventory)
+        if caught:
+            for fish_name, count in caught.items():
+                inventory.add(fish_name, count)
+            updates['inventory'] = inventory
             # 添加金币奖励
-            new_gold = int(player.gold) + result['coins_reward']
-            updates['gold'] = str(new_gold)
-            message = result['message']  # 使用钓鱼系返回的完整消息
-        else:
-            message = result['message']
+            updates['gold'] = player.gold + result['coins_reward']
+            self._record_earnings(user_id, gold=result['coins_reward'])
+        message = result['message']  # 使用钓鱼系统返回的完整消息
             
         # 处理鱼竿损坏
         if new_durability <= 0:
             inventory.remove(rod)
-            updates['inventory'] = json.dumps(inventory)
+            updates['inventory'] = inventory
             durability_warning = f"\n💔 {rod}已损坏，已从背包移除"
         elif new_durability < 30:
             durability_warning = f"\n⚠️警告：{rod}耐久度不足30%"
@@ -530,22 +796,21 @@ class Game(Plugin):
         self._update_player_data(user_id, updates)
         return f"{message}{durability_warning}"
 
-    def show_fish_collection(self, user_id, content=""):
+    def show_fish_collection(self, user_id, args=()):
         """显示鱼类图鉴"""
         player = self.get_player(user_id)
         if not player:
             return "您还没有注册,请先注册 "
             
         # 解析命令参数
-        parts = content.split()
         page = 1
         search_term = ""
         
-        if len(parts) > 1:
-            if parts[1].isdigit():
-                page = int(parts[1])
+        if args:
+            if args[0].isdigit():
+                page = int(args[0])
             else:
-                search_term = parts[1]
+                search_term = args[0]
                 
         return self.fishing_system.show_collection(player, page, search_term)
 
@@ -569,8 +834,8 @@ class Game(Plugin):
             remaining = cooldown - (current_time - last_attack_time)
             return f"您刚刚进行过活动,请等待 {remaining} 秒后再次外出"
 
-        # 掷骰子
-        steps = self.monopoly.roll_dice()
+        # 掷骰子: 之后追加锁住地产主人时命令可能重新执行,沿用第一次掷出的点数
+        steps = self.player_locks.keep('dice', self.monopoly.roll_dice)
         
         # 获取当前位置
         current_position = int(player.position) if hasattr(player, 'position') else 0
@@ -595,6 +860,7 @@ class Game(Plugin):
             bonus = 200
             new_gold = int(player.gold) + bonus
             self._update_player_data(user_id, {'gold': str(new_gold)})
+            self._record_earnings(user_id, gold=bonus)
             result.append(f"经过起点获得 {bonus} 金币")
             
         elif block['type'] == '森林':
@@ -609,6 +875,7 @@ class Game(Plugin):
                     if key == 'gold':
                         new_gold = int(player.gold) + value
                         self._update_player_data(user_id, {'gold': str(new_gold)})
+                        self._record_earnings(user_id, gold=value)
                         # 添加金币变化提示
                         if value > 0:
                             result.append(f"💰 获得 {value} 金币")
@@ -632,6 +899,7 @@ class Game(Plugin):
                 owner = property_info['owner']
 
                 if user_id != owner:  # 不是自己的地产才需要付租金
+                    self.player_locks.acquire(owner)
                     owner_player = self.get_player(owner)
                     if owner_player:
                         rent = self.monopoly.calculate_rent(new_position)
@@ -643,6 +911,7 @@ class Game(Plugin):
                             # 增加房主金币
                             owner_new_gold = int(owner_player.gold) + rent
                             self._update_player_data(owner, {'gold': str(owner_new_gold)})
+                            self._record_earnings(owner, gold=rent)
                             
                             result.append(f"这是 {owner_player.nickname} 的地盘")
                             result.append(f"区域类型: {block['region']}")
@@ -895,7 +1164,7 @@ class Game(Plugin):
                            inventory.append(item['name'])
                            # 只在有掉落时更新背包
                            self._update_player_data(user_id, {
-                               'inventory': json.dumps(inventory)  # 使用json.dumps确保正确序列化
+                               'inventory': inventory
                            })
                        break
            
@@ -930,6 +1199,7 @@ class Game(Plugin):
                'exp': str(new_exp),
                'gold': str(new_gold)
            })
+           self._record_earnings(user_id, gold=gold_gain, exp=exp_gain)
            
            battle_log.append(f"\n🎉 战斗胜利")
            if drops:
@@ -956,18 +1226,17 @@ class Game(Plugin):
        
 
     
-    def use_item(self, user_id, content):
+    def use_item(self, user_id, args):
        """使用物品功能"""
        try:
            # 解析命令，格式为 "使用 物品名" 或 "使用 物品名 数量"
-           parts = content.split()
-           if len(parts) < 2:
+           if not args:
                return "使用格式错误！请使用: 使用 物品名 [数量]"
            
-           item_name = parts[1]
+           item_name = args[0]
            amount = 1  # 默认使用1个
-           if len(parts) > 2:
-               amount = int(parts[2])
+           if len(args) > 1:
+               amount = int(args[1])
                if amount <= 0:
                    return "使用数量必须大于0"
        except (IndexError, ValueError):
@@ -1015,8 +1284,7 @@ class Game(Plugin):
        new_hp = min(current_hp + heal_amount, total_max_hp)
        
        # 从背包中移除物品
-       for _ in range(amount):
-           inventory.remove(item_name)
+       inventory.remove(item_name, amount)
        
        # 添加物品使用冷却时间
        current_time = int(time.time())
@@ -1030,7 +1298,7 @@ class Game(Plugin):
        
        # 更新玩家数据
        updates = {
-           'inventory': json.dumps(inventory),
+           'inventory': inventory,
            'hp': str(new_hp),
            'last_item_use': str(current_time)
        }
@@ -1088,6 +1356,7 @@ class Game(Plugin):
             }
             
             self._update_player_data(user_id, updates)
+            self._record_earnings(user_id, gold=reward, exp=exp_reward)
             logger.info(f"用户 {user_id} 数据更新成功: {updates}")
             
             return f"签到成功 获得{reward}金币，经验{exp_reward}，当前金币: {player.gold + reward}"
@@ -1100,10 +1369,9 @@ class Game(Plugin):
         """获取商店物品列表"""
         return self.item_system.get_shop_items()
 
-    def give_item(self, user_id, content, msg: ChatMessage):
+    def give_item(self, user_id, args, msg: ChatMessage):
         # 解析命令参数
-        parts = content.split()
-        if len(parts) < 4:
+        if len(args) < 3:
             return "格式错误！请使用: 赠送 @用户 物品名 数量"
         
         # 获取被赠送者ID
@@ -1112,24 +1380,23 @@ class Game(Plugin):
         
         target_id = None
         # 解析@后面的用户名
-        for part in parts:
+        for part in args:
             if part.startswith('@'):
                 target_name = part[1:]  # 去掉@符号
-                # 遍历players.csv查找匹配的用户
-                with open(self.player_file, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        if row['nickname'] == target_name:
-                            target_id = row['user_id']
-                            break
+                # 通过昵称索引查找匹配的用户
+                target_ids = self.player_store.get_ids_by_nickname(target_name)
+                if target_ids:
+                    target_id = target_ids[0]
                 break  # 找到第一个@用户后就退出
 
         if not target_id:
             return "无法找到目标用户，请确保该用户已注册游戏"
+        # 锁住被赠送者,之后读取的双方数据都是最新的
+        self.player_locks.acquire(target_id)
 
         # 从消息内容中提取物品名和数量
         # 跳过第一个词"赠送"和@用户名
-        remaining_parts = [p for p in parts[1:] if not p.startswith('@')]
+        remaining_parts = [p for p in args if not p.startswith('@')]
         if len(remaining_parts) < 2:
             return "请指定物品名称和数量"
         
@@ -1168,11 +1435,10 @@ class Game(Plugin):
                 return f"背包中只有 {available_count} 个 {item_name}"
         
         # 更新双方的背包
-        for _ in range(amount):
-            sender_inventory.remove(item_name)
+        sender_inventory.remove(item_name, amount)
         
         receiver_inventory = receiver.inventory
-        receiver_inventory.extend([item_name] * amount)
+        receiver_inventory.add(item_name, amount)
         
         # 保存更新
         self._update_player_data(user_id, {
@@ -1184,64 +1450,51 @@ class Game(Plugin):
         
         return f"成功将 {amount} 个 {item_name} 赠送给了 {receiver.nickname}"
 
-    def show_leaderboard(self, user_id, content):
-        """显示排行榜"""
+    def show_leaderboard(self, user_id, args=(), group_id=None):
+        """显示排行榜,在群聊中只统计本群成员"""
         try:
             # 默认显示金币排行
             board_type = "金币"
-            if content and len(content.split()) > 1:
-                board_type = content.split()[1]
+            if args:
+                board_type = args[0]
             
-            if board_type not in ["金币", "等级"]:
-                return "目前支持的排行榜类型：金币、等级"
+            if board_type not in ["金币", "等级", "今日", "本周"]:
+                return "目前支持的排行榜类型：金币、等级、今日、本周"
             
-            # 读取所有玩家数据
-            players = []
-            with open(self.player_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                players = list(reader)
+            # 今日/本周排行统计窗口内获得的金币和经验
+            scope = "本群" if group_id else ""
+            if board_type == "今日":
+                return self._show_earnings_leaderboard(user_id, 'today', f"{scope}今日收益排行榜", group_id)
+            if board_type == "本周":
+                return self._show_earnings_leaderboard(user_id, 'week', f"{scope}本周收益排行榜(近7天)", group_id)
             
-            if not players:
-                return "暂无玩家数据"
-            
-            # 安全的数值转换函数
-            def safe_int(value, default=0):
-                try:
-                    # 先转换为浮点数，再转换为整数
-                    return int(float(str(value).replace(',', '')))
-                except (ValueError, TypeError):
-                    return default
-            
-            # 根据类型排序
+            # 根据类型选择排行榜索引
             if board_type == "金币":
-                players.sort(key=lambda x: safe_int(x.get('gold', 0)), reverse=True)
-                title = "金币排行榜"
+                ranking = 'gold'
+                title = f"{scope}金币排行榜"
                 value_key = 'gold'
                 suffix = "金币"
-            else:  # 等级排行榜
-                # 使用元组排序，先按等级后按经验
-                players.sort(
-                    key=lambda x: (
-                        safe_int(x.get('level', 1)), 
-                        safe_int(x.get('exp', 0))
-                    ), 
-                    reverse=True
-                )
-                title = "等级排行榜"
+            else:  # 等级排行榜,先按等级后按经验
+                ranking = 'level'
+                title = f"{scope}等级排行榜"
                 value_key = 'level'
                 suffix = "级"
             
+            players = self.player_store.top(ranking, 10, group_id)
+            if not players:
+                return "暂无玩家数据"
+            
             # 生成排行榜
             result = f"{title}:\n"
             result += "-" * 30 + "\n"
             
             # 只显示前10名
-            for i, player in enumerate(players[:10], 1):
+            for i, player in enumerate(players, 1):
                 nickname = player['nickname']
-                value = safe_int(player[value_key])
+                value = player[value_key]
                 
                 # 为等级排行榜添加经验值显示
-                exp_info = f" (经验: {safe_int(player.get('exp', '0'))})" if board_type == "等级" else ""
+                exp_info = f" (经验: {player['exp']})" if board_type == "等级" else ""
                 
                 # 添加排名
                 rank_mark = "👑" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
@@ -1249,14 +1502,13 @@ class Game(Plugin):
                 result += f"{rank_mark} {nickname}: {value}{suffix}{exp_info}\n"
             
             # 如果当前用户不在前10名，显示其排名
-            current_player = next((p for p in players if p['nickname'] == user_id), None)
-            if current_player:
-                current_rank = players.index(current_player) + 1
-                if current_rank > 10:
-                    result += "-" * 30 + "\n"
-                    value = current_player[value_key]
-                    exp_info = f" (经验: {safe_int(current_player.get('exp', '0'))})" if board_type == "等级" else ""
-                    result += f"你的排名: {current_rank}. {current_player['nickname']}: {value}{suffix}{exp_info}"
+            current_rank = self.player_store.rank(ranking, user_id, group_id)
+            if current_rank and current_rank > 10:
+                current_player = self.player_store.get(user_id)
+                result += "-" * 30 + "\n"
+                value = current_player[value_key]
+                exp_info = f" (经验: {current_player['exp']})" if board_type == "等级" else ""
+                result += f"你的排名: {current_rank}. {current_player['nickname']}: {value}{suffix}{exp_info}"
             
             return result
             
@@ -1264,7 +1516,37 @@ class Game(Plugin):
             logger.error(f"显示排行榜出错: {e}")
             return "显示排行榜时发生错误"
 
-    def propose_marriage(self, user_id, content, msg: ChatMessage):
+    def _show_earnings_leaderboard(self, user_id, window, title, group_id=None):
+        """显示时间窗口内的收益排行,先按获得的金币后按经验排序"""
+        user_id = str(user_id)
+        if group_id:
+            # 只在本群成员之间排序
+            ranking = self.earnings.ranking_among(window, self.player_store.group_members(group_id))
+            entries = ranking[:10]
+            current_rank = next((i for i, (uid, _) in enumerate(ranking, 1) if uid == user_id), None)
+        else:
+            entries = self.earnings.top(window, 10)
+            current_rank = self.earnings.rank(window, user_id)
+        if not entries:
+            return f"{title}:\n暂无数据"
+        
+        result = f"{title}:\n"
+        result += "-" * 30 + "\n"
+        for i, (player_id, (gold, exp)) in enumerate(entries, 1):
+            data = self.player_store.get(player_id)
+            nickname = data['nickname'] if data else player_id
+            rank_mark = "👑" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
+            result += f"{rank_mark} {nickname}: +{gold}金币 (经验: +{exp})\n"
+        
+        # 如果当前用户不在前10名，显示其排名
+        if current_rank and current_rank > 10:
+            gold, exp = self.earnings.score(window, user_id)
+            data = self.player_store.get(user_id)
+            result += "-" * 30 + "\n"
+            result += f"你的排名: {current_rank}. {data['nickname'] if data else user_id}: +{gold}金币 (经验: +{exp})"
+        return result
+
+    def propose_marriage(self, user_id, args, msg: ChatMessage):
         """求婚"""
         if not msg.is_group:
             return "只能在群聊中使用求婚功能"
@@ -1275,19 +1557,21 @@ class Game(Plugin):
             return "您还没有注册游戏"
         
         # 解析命令参数
-        parts = content.split()
-        logger.info(f"求婚命令参数: {parts}")
-        if len(parts) < 2 or not parts[1].startswith('@'):
+        logger.info(f"求婚命令参数: {args}")
+        if not args or not args[0].startswith('@'):
             return "请使用正确的格式：求婚 @用户名"
       
-        target_name = parts[1][1:]  # 去掉@符号
+        target_name = args[0][1:]  # 去掉@符号
         # 根据昵称获取玩家
-        target = Player.get_player_by_nickname(target_name, self.player_file)
+        target = self.get_player_by_nickname(target_name)
         if not target:
             return "找不到目标玩家，请确保输入了正确的用户名"
         
         if target.user_id == user_id:  # 使用user_id比较
             return "不能向自己求婚"
+        # 锁住对方后重新读取,确保求婚请求状态是最新的
+        self.player_locks.acquire(target.user_id)
+        target = self.get_player(target.user_id)
         
         # 检查是否已经是配偶
         proposer_spouses = proposer.spouse.split(',') if proposer.spouse else []
@@ -1315,6 +1599,7 @@ class Game(Plugin):
             return "您没有待处理的求婚请求"
         
         # 使用昵称获取求婚者信息
+        self.player_locks.acquire(proposal)
         proposer = self.get_player(proposal)
         if not proposer:
             # 清除无效的求婚请求
@@ -1375,9 +1660,11 @@ class Game(Plugin):
             return "您还没有结婚"
             
         # 解除与所有配偶的婚姻关系
+        self.player_locks.acquire(*[s for s in spouses if s])
+        spouse_players = self.get_players(s for s in spouses if s)
         for spouse_name in spouses:
             if spouse_name:
-                spouse = self.get_player(spouse_name)
+                spouse = spouse_players.get(spouse_name)
                 if spouse:
                     # 从配偶的婚姻列表中移除当前玩家
                     spouse_list = spouse.spouse.split(',')
@@ -1393,7 +1680,7 @@ class Game(Plugin):
         
         return f"您已经与所有配偶离婚"
 
-    def attack_player(self, user_id, content, msg: ChatMessage):
+    def attack_player(self, user_id, args, msg: ChatMessage):
         """强制攻击其他玩家"""
         if not msg.is_group:
             return "只能在群聊中使用攻击功能"
@@ -1402,15 +1689,17 @@ class Game(Plugin):
         items_info = self.item_system.get_all_items()  # 添加这行来获取物品信息
         
         # 解析命令参数
-        parts = content.split()
-        if len(parts) < 2 or not parts[1].startswith('@'):
+        if not args or not args[0].startswith('@'):
             return "请使用正确的格式：攻击 @用户名"
         
-        target_name = parts[1][1:]  # 去掉@符号
+        target_name = args[0][1:]  # 去掉@符号
         # 根据昵称获取玩家
-        target = Player.get_player_by_nickname(target_name, self.player_file)
+        target = self.get_player_by_nickname(target_name)
         if not target:
             return "找不到目标玩家，请确保输入了正确的用户名"
+        # 锁住目标后重新读取,战斗结算使用最新数据
+        self.player_locks.acquire(target.user_id)
+        target = self.get_player(target.user_id)
             
         # 获取攻击者信息
         attacker = self.get_player(user_id)
@@ -1440,22 +1729,12 @@ class Game(Plugin):
         target_attack = int(target.attack)
         target_defense = int(target.defense)
         
-        # 获取双方配偶信息
-        attacker_spouses = []
-        if attacker.spouse:
-            for spouse_name in attacker.spouse.split(','):
-                if spouse_name:
-                    spouse = self.get_player(spouse_name)
-                    if spouse:
-                        attacker_spouses.append(spouse)
-                        
-        target_spouses = []
-        if target.spouse:
-            for spouse_name in target.spouse.split(','):
-                if spouse_name:
-                    spouse = self.get_player(spouse_name)
-                    if spouse:
-                        target_spouses.append(spouse)
+        # 获取双方配偶信息,双方所有配偶一次批量取出
+        attacker_spouse_names = [s for s in attacker.spouse.split(',') if s] if attacker.spouse else []
+        target_spouse_names = [s for s in target.spouse.split(',') if s] if target.spouse else []
+        spouse_players = self.get_players(attacker_spouse_names + target_spouse_names)
+        attacker_spouses = [spouse_players[name] for name in attacker_spouse_names if name in spouse_players]
+        target_spouses = [spouse_players[name] for name in target_spouse_names if name in spouse_players]
         
         # 获取装备加成
         attacker_weapon_bonus = self.equipment_system.get_weapon_bonus(attacker)
@@ -1542,23 +1821,23 @@ class Game(Plugin):
             new_target_gold = int(target.gold) + penalty_gold
             
             # 随机丢失物品
-            attacker_items = attacker.inventory  # 直接使用inventory列表
+            attacker_items = attacker.inventory  # 直接使用背包对象
             lost_item = None
             if attacker_items:
-                lost_item = random.choice(attacker_items)
+                lost_item = attacker_items.random_item()
                 attacker_items.remove(lost_item)
             
             # 更新数据
             self._update_player_data(user_id, {
                 'hp': str(attacker_hp),
                 'gold': str(new_attacker_gold),
-                'inventory': attacker_items,  # _update_player_data会处理列表到JSON的转换
+                'inventory': attacker_items,  # Player 类会自动处理编码
                 'last_attack': str(current_time)
             })
             self._update_player_data(target.user_id, {  # 这里改为使用user_id
                 'hp': str(target_hp),
                 'gold': str(new_target_gold),
-                'inventory': target.inventory,  # _update_player_data会处理列表到JSON的转换
+                'inventory': target.inventory,  # Player 类会自动处理编码
             })
             
             result = f"{target.nickname} 获胜!\n{attacker.nickname} 赔偿 {penalty_gold} 金币"
@@ -1573,17 +1852,17 @@ class Game(Plugin):
             new_attacker_gold = int(attacker.gold) + penalty_gold
             
             # 随机丢失物品
-            target_items = target.inventory  # 直接使用inventory列表
+            target_items = target.inventory  # 直接使用背包对象
             lost_item = None
             if target_items:
-                lost_item = random.choice(target_items)
+                lost_item = target_items.random_item()
                 target_items.remove(lost_item)
             
             # 更新数据
             self._update_player_data(target.user_id, {  # 使用target_id而不是nickname
                 'hp': str(target_hp),
                 'gold': str(new_target_gold),
-                'inventory': target_items,  # _update_player_data会处理列表到JSON的转换
+                'inventory': target_items,  # Player 类会自动处理编码
             })
             self._update_player_data(user_id, {
                 'hp': str(attacker_hp),
@@ -1616,14 +1895,7 @@ class Game(Plugin):
             player.player_file = self.player_file
             player.standard_fields = self.STANDARD_FIELDS
             
-            # 数据类型转换和验证
-            for key, value in updates.items():
-                if isinstance(value, (int, float)):
-                    updates[key] = str(value)
-                elif isinstance(value, (list, dict)):
-                    updates[key] = json.dumps(value)
-                    
-            # 使用Player类的update_data方法
+            # 使用Player类的update_data方法,字段类型在赋值时统一转换
             player.update_data(updates)
             
         except Exception as e:
@@ -1646,23 +1918,22 @@ class Game(Plugin):
         """卸下装备的包装方法"""
         return self.equipment_system.unequip_item(user_id, item_type)
 
-    def equip_from_inventory(self, user_id: str, content: str) -> str:
+    def equip_from_inventory(self, user_id: str, args: List[str]) -> str:
         """从背包装备物品
         
         Args:
             user_id: 玩家ID
-            content: 完整的命令内容
+            args: 命令后的参数
             
         Returns:
             str: 装备结果提示
         """
         try:
             # 解析命令
-            parts = content.split()
-            if len(parts) < 2:
+            if not args:
                 return "装备格式错误！请使用: 装备 物品名"
                 
-            item_name = parts[1]
+            item_name = args[0]
             
             # 调用装备系统的装备方法
             return self.equipment_system.equip_item(user_id, item_name)
@@ -1672,52 +1943,52 @@ class Game(Plugin):
             return "装备物品时发生错误"
 
     def _restore_game_state(self):
-        """从进程锁文件恢复游戏状态"""
+        """从进程锁文件恢复游戏状态,并启动定时任务调度线程"""
+        tasks = {}
         try:
             if os.path.exists(self.process_lock_file):
                 with open(self.process_lock_file, 'r') as f:
                     data = json.load(f)
                     self.game_status = data.get('game_status', True)
-                    self.scheduled_tasks = data.get('scheduled_tasks', {})
-                    
-                    # 恢复定时任务
-                    current_time = time.time()
-                    for task_id, task in list(self.scheduled_tasks.items()):
-                        if task['time'] <= current_time:
-                            # 执行过期的定时任务
-                            if task['action'] == 'start':
-                                self.game_status = True
-                            elif task['action'] == 'stop':
-                                self.game_status = False
-                            # 删除已执行的任务
-                            del self.scheduled_tasks[task_id]
-                    
-                    # 保存更新后的状态
-                    self._save_game_state()
+                    # 清理任务ID中的receiver信息
+                    for task_id, task in data.get('scheduled_tasks', {}).items():
+                        tasks.setdefault(task_id.split(',')[0], task)  # 避免重复任务
         except Exception as e:
             logger.error(f"恢复游戏状态出错: {e}")
             self.game_status = True
-            self.scheduled_tasks = {}
+            tasks = {}
+        
+        self.scheduler = TaskScheduler(tasks, self._run_scheduled_task, self._save_game_state)
+        # 停机期间到期的任务先同步执行,之后由后台线程按时执行
+        self.scheduler.run_due()
+        self.scheduler.start()
+
+    def _run_scheduled_task(self, task):
+        """执行到期的定时任务"""
+        time_str = datetime.datetime.fromtimestamp(task['time']).strftime('%Y-%m-%d %H:%M')
+        if task['action'] == 'start':
+            self.game_status = True
+            logger.info(f"定时任务执行：开机 - {time_str}")
+        elif task['action'] == 'stop':
+            self.game_status = False
+            logger.info(f"定时任务执行：关机 - {time_str}")
 
     def _save_game_state(self):
-        """保存游戏状态到进程锁文件"""
-        try:
-            # 清理任务ID中的receiver信息
-            cleaned_tasks = {}
-            for task_id, task in self.scheduled_tasks.items():
-                clean_task_id = task_id.split(',')[0]
-                if clean_task_id not in cleaned_tasks:  # 避免重复任务
-                    cleaned_tasks[clean_task_id] = task
-            
-            self.scheduled_tasks = cleaned_tasks
-            
-            with open(self.process_lock_file, 'w') as f:
-                json.dump({
-                    'game_status': self.game_status,
-                    'scheduled_tasks': self.scheduled_tasks
-                }, f)
-        except Exception as e:
-            logger.error(f"保存游戏状态出错: {e}")
+        """保存游戏状态到进程锁文件
+
+        调度线程和命令线程都会调用,加锁后写入临时文件再原子替换,避免并发写入交错或写出半个文件。
+        """
+        with self._state_lock:
+            tmp_file = f"{self.process_lock_file}.tmp"
+            try:
+                with open(tmp_file, 'w') as f:
+                    json.dump({
+                        'game_status': self.game_status,
+                        'scheduled_tasks': self.scheduler.tasks()
+                    }, f)
+                os.replace(tmp_file, self.process_lock_file)
+            except Exception as e:
+                logger.error(f"保存游戏状态出错: {e}")
 
     def toggle_game_system(self, user_id, action='toggle'):
         """切换游戏系统状态"""
@@ -1725,13 +1996,7 @@ class Game(Plugin):
             player = self.get_player(user_id)
             if not player:
                 # 检查是否是默认管理员
-                config_file = os.path.join(self.data_dir, "config.json")
-                if os.path.exists(config_file):
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        config = json.load(f)
-                        if user_id not in config.get("admins", []):
-                            return "您还没有注册游戏"
-                else:
+                if not self.config_service.is_admin(user_id):
                     return "您还没有注册游戏"
             elif not self._is_admin(player):
                 return "只有管理员才能操作游戏系统开关"
@@ -1749,7 +2014,7 @@ class Game(Plugin):
             logger.error(f"切换游戏系统状态出错: {e}")
             return "操作失败，请检查系统状态"
 
-    def schedule_game_system(self, user_id, content):
+    def schedule_game_system(self, user_id, args):
         """设置定时开关机"""
         player = self.get_player(user_id)
         if not player:
@@ -1761,24 +2026,23 @@ class Game(Plugin):
         
         try:
             # 解析命令格式: 定时 开机/关机 HH:MM [每天]
-            parts = content.split()
-            if len(parts) < 3:
+            if len(args) < 2:
                 return "格式错误！请使用: 定时 开机/关机 HH:MM [每天]"
                 
-            action = '开机' if parts[1] == '开机' else '关机' if parts[1] == '关机' else None
+            action = '开机' if args[0] == '开机' else '关机' if args[0] == '关机' else None
             if not action:
                 return "请指定正确的操作(开机/关机)"
                 
             # 解析时间
             try:
-                hour, minute = map(int, parts[2].split(':'))
+                hour, minute = map(int, args[1].split(':'))
                 if not (0 <= hour <= 23 and 0 <= minute <= 59):
                     raise ValueError
             except ValueError:
                 return "请输入正确的时间格式(HH:MM)"
                 
             # 检查是否是每天执行
-            is_daily = len(parts) > 3 and parts[3] == '每天'
+            is_daily = len(args) > 2 and args[2] == '每天'
             
             # 计算执行时间
             now = datetime.datetime.now()
@@ -1789,14 +2053,12 @@ class Game(Plugin):
             # 生成任务ID，每天任务添加daily标记
             task_id = f"{'daily' if is_daily else ''}{action}_{target_time.strftime('%H%M')}"
             
-            # 添加定时任务
-            self.scheduled_tasks[task_id] = {
+            # 添加定时任务,调度器会保存任务列表
+            self.scheduler.add(task_id, {
                 'action': 'start' if action == '开机' else 'stop',
                 'time': target_time.timestamp(),
                 'is_daily': is_daily
-            }
-            
-            self._save_game_state()
+            })
             daily_text = "每天 " if is_daily else ""
             return f"已设置{daily_text}{action}定时任务: {target_time.strftime('%H:%M')}"
             
@@ -1806,24 +2068,21 @@ class Game(Plugin):
 
     def _is_admin(self, player):
         """检查玩家是否是管理员"""
-        try:
-            config_file = os.path.join(self.data_dir, "config.json")
-            if not os.path.exists(config_file):
-                # 创建默认配置文件
-                default_config = {
-                    "admins": ["xxx"]  # 默认管理员列表
-                }
-                with open(config_file, 'w', encoding='utf-8') as f:
-                    json.dump(default_config, f, ensure_ascii=False, indent=2)
-            
-            # 读取配置文件
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            
-            return player.nickname in config.get("admins", [])
-        except Exception as e:
-            logger.error(f"读取管理员配置出错: {e}")
-            return False
+        return self.config_service.is_admin(player.nickname)
+
+    def reload_config(self, user_id):
+        """重新加载配置文件"""
+        player = self.get_player(user_id)
+        if not player:
+            if not self.config_service.is_admin(user_id):
+                return "您还没有注册游戏"
+        elif not self._is_admin(player):
+            return "只有管理员才能重载配置"
+        
+        if not self.config_service.reload():
+            return "配置文件有误，已继续使用原配置，请检查日志"
+        # 存储后端和写入方式在启动时确定,修改后需要重启才生效
+        return "配置已重新加载"
 
     def show_scheduled_tasks(self, user_id):
         """显示所有定时任务"""
@@ -1834,14 +2093,15 @@ class Game(Plugin):
         if not self._is_admin(player):
             return "只有管理员才能查看定时任务"
         
-        if not self.scheduled_tasks:
+        scheduled_tasks = self.scheduler.tasks()
+        if not scheduled_tasks:
             return "当前没有定时任务"
         
         # 用于去重和整理任务的字典
         unique_tasks = {}
         
         result = "定时任务列表:\n" + "-" * 20 + "\n"
-        for task_id, task in self.scheduled_tasks.items():
+        for task_id, task in scheduled_tasks.items():
             # 清理掉可能包含的receiver信息
             clean_task_id = task_id.split(',')[0]
             
@@ -1864,7 +2124,7 @@ class Game(Plugin):
         
         return result
 
-    def cancel_scheduled_task(self, user_id, content):
+    def cancel_scheduled_task(self, user_id, args):
         """取消定时任务"""
         player = self.get_player(user_id)
         if not player:
@@ -1875,17 +2135,16 @@ class Game(Plugin):
         
         try:
             # 解析命令格式: 取消定时 开机/关机 HH:MM
-            parts = content.split()
-            if len(parts) != 3:
+            if len(args) != 2:
                 return "格式错误！请使用: 取消定时 开机/关机 HH:MM"
                 
-            action = '开机' if parts[1] == '开机' else '关机' if parts[1] == '关机' else None
+            action = '开机' if args[0] == '开机' else '关机' if args[0] == '关机' else None
             if not action:
                 return "请指定正确的操作(开机/���机)"
                 
             # 解析时间
             try:
-                hour, minute = map(int, parts[2].split(':'))
+                hour, minute = map(int, args[1].split(':'))
                 if not (0 <= hour <= 23 and 0 <= minute <= 59):
                     raise ValueError
             except ValueError:
@@ -1900,9 +2159,7 @@ class Game(Plugin):
             task_id = f"{action}_{target_time.strftime('%Y%m%d%H%M')}"
             
             # 检查并删除任务
-            if task_id in self.scheduled_tasks:
-                del self.scheduled_tasks[task_id]
-                self._save_game_state()
+            if self.scheduler.remove(task_id):
                 return f"已取消{action}定时任务: {target_time.strftime('%Y-%m-%d %H:%M')}"
             else:
                 return f"未找到指定的定时任务"
@@ -1911,41 +2168,6 @@ class Game(Plugin):
             logger.error(f"取消定时任务出错: {e}")
             return "取消定时任务失败"
 
-    def _check_scheduled_tasks(self):
-        """检查并执行到期的定时任务"""
-        try:
-            current_time = time.time()
-            tasks_to_remove = []
-            
-            for task_id, task in self.scheduled_tasks.items():
-                if task['time'] <= current_time:
-                    # 执行定时任务
-                    if task['action'] == 'start':
-                        self.game_status = True
-                        logger.info(f"定时任务执行：开机 - {datetime.datetime.fromtimestamp(task['time']).strftime('%Y-%m-%d %H:%M')}")
-                    elif task['action'] == 'stop':
-                        self.game_status = False
-                        logger.info(f"定时任务执行：关机 - {datetime.datetime.fromtimestamp(task['time']).strftime('%Y-%m-%d %H:%M')}")
-                    
-                    if task.get('is_daily'):
-                        # 更新每日任务的下一次执行时间
-                        next_time = datetime.datetime.fromtimestamp(task['time']) + datetime.timedelta(days=1)
-                        task['time'] = next_time.timestamp()
-                    else:
-                        # 将非每日任务添加到待删除列表
-                        tasks_to_remove.append(task_id)
-            
-            # 删除已执行的非每日任务
-            for task_id in tasks_to_remove:
-                del self.scheduled_tasks[task_id]
-                
-            # 如果有任务被执行或更新，保存状态
-            if tasks_to_remove or any(task.get('is_daily') for task in self.scheduled_tasks.values()):
-                self._save_game_state()
-            
-        except Exception as e:
-            logger.error(f"检查定时任务出错: {e}")
-
     def clear_scheduled_tasks(self, user_id):
         """清空所有定时任务"""
         player = self.get_player(user_id)
@@ -1956,12 +2178,10 @@ class Game(Plugin):
             return "只有管理员才能清空定时任务"
         
         try:
-            task_count = len(self.scheduled_tasks)
+            task_count = self.scheduler.clear()
             if task_count == 0:
                 return "当前没有定时任务"
                 
-            self.scheduled_tasks.clear()
-            self._save_game_state()
             return f"已清空 {task_count} 个定时任务"
             
         except Exception as e:
@@ -1974,12 +2194,10 @@ class Game(Plugin):
         if not player:
             return "您还没有注册游戏"
             
-        if user_id not in self.reminders:
+        # 删除提醒,判断和删除在公告板的锁内一次完成
+        if not self.reminder_board.remove(user_id):
             return "您没有设置任何提醒"
-            
-        # 删除提醒
-        del self.reminders[user_id]
-        self._save_reminders()
+        self._save_reminders(user_id)
         
         return "提醒已删除"
 
@@ -2002,18 +2220,8 @@ class Game(Plugin):
         if self.monopoly.get_property_owner(current_position):
             return "这块地已经被购买了"
             
-        # 计算地块价格
-        base_prices = {
-            '直辖市': 2000,
-            '省会': 1500,
-            '地级市': 1000,
-            '县城': 500,
-            '乡村': 300,
-            '空地': 200
-        }
-        base_price = base_prices.get(block['type'], 500)
-        distance_factor = 1 + (current_position // 10) * 0.2  # 每10格增加20%价格
-        price = int(base_price * distance_factor)
+        # 按地块类型和位置计算的购买价格,预先计算在地图编译结果中,租金可以直接查表
+        price = self.monopoly.get_purchase_price(current_position)
         
         # 检查玩家金币是否足够
         if int(player.gold) < price:
@@ -2029,7 +2237,8 @@ class Game(Plugin):
 花费: {price} 金币
 当前金币: {new_gold}"""
         else:
-            return "购买失败，请稍后再试"
+            # 其他玩家抢先买下了这块地
+            return "这块地已经被购买了"
 
     def upgrade_property(self, user_id):
         """升级当前位置的地块"""
@@ -2091,31 +2300,30 @@ class Game(Plugin):
                 
         return "\n".join(result)
 
-    def show_map(self, user_id):
-        """显示地图状态"""
-        player = self.get_player(user_id)
-        if not player:
-            return "您还没有注册游戏"
-            
-        # 获取玩家当前位置
-        current_position = int(getattr(player, 'position', 0))
+    def _render_map(self):
+        """生成不含玩家位置的地图文本
+
+        Returns:
+            tuple: (各行文本, 每个位置所在的行号, 每个位置的地块标签)
+        """
+        total_blocks = self.monopoly.total_blocks
+        # 取副本遍历,其他玩家同时购买地产时不会改变字典
+        properties = self.monopoly.properties_snapshot()
         
-        # 获取地图总格子数
-        total_blocks = self.monopoly.map_data["total_blocks"]
+        # 一次批量获取全部地产所有者
+        owner_ids = {data['owner'] for data in properties.values() if data.get('owner')}
+        owners = self.player_store.get_many(owner_ids)
         
-        result = ["🗺️ 大富翁地图"]
-        result.append("————————————")
-
-        # 生成地图显示
+        lines = ["🗺️ 大富翁地图", "————————————"]
+        line_index = []
+        labels = []
         for pos in range(total_blocks):
             block = self.monopoly.get_block_info(pos)
-            property_data = self.monopoly.properties_data.get(str(pos), {})
+            property_data = properties.get(str(pos), {})
             owner_id = property_data.get('owner')
             
             # 获取地块显示符号
-            if pos == current_position:
-                symbol = "👤"  # 玩家当前位置
-            elif block['type'] == '起点':
+            if block['type'] == '起点':
                 symbol = "🏁"
             elif owner_id:
                 # 如果有主人，显示房屋等级
@@ -2135,21 +2343,34 @@ class Game(Plugin):
                 symbol = type_symbols.get(block['type'], "⬜")
                 
             # 添加地块信息
-            block_info = f"{symbol} {pos}:{block['name']}"
+            label = f"{pos}:{block['name']}"
             if owner_id:
-                owner_player = self.get_player(owner_id)
-                if owner_player:
-                    block_info += f"({owner_player.nickname})"
-                else:
-                    block_info += f"(未知)"
-                
-            if pos == current_position:
-                block_info += " ← 当前位置"
-                
-            result.append(block_info)
+                owner = owners.get(str(owner_id))
+                label += f"({owner['nickname']})" if owner else "(未知)"
+            labels.append(label)
+            line_index.append(len(lines))
+            lines.append(f"{symbol} {label}")
             
             # 每5个地块换行
             if (pos + 1) % 5 == 0:
-                result.append("————————————")
-                
+                lines.append("————————————")
+        return lines, line_index, labels
+
+    def show_map(self, user_id):
+        """显示地图状态"""
+        player = self.get_player(user_id)
+        if not player:
+            return "您还没有注册游戏"
+            
+        # 获取玩家当前位置
+        current_position = int(getattr(player, 'position', 0))
+        
+        # 静态地图文本只在地图或地产变化时重新生成,每次请求只叠加玩家位置
+        if self._map_cache is None or self._map_cache[0] != self.monopoly.version:
+            self._map_cache = (self.monopoly.version,) + self._render_map()
+        _, lines, line_index, labels = self._map_cache
+        
+        result = list(lines)
+        pos = current_position % len(line_index)
+        result[line_index[pos]] = f"👤 {labels[pos]} ← 当前位置"
         return "\n".join(result)
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from common.log import logger
+
+
+class GameConfig:
+    """config.json 的只读快照,字段在加载时校验一次"""
+
+    __slots__ = ('admins', 'storage', 'write_behind', 'flush_interval', 'flush_threshold',
+                 'worker_threads', 'worker_queue_size', 'raw')
+
+    # 字段 -> (允许的类型, 默认值)
+    SCHEMA = {
+        'admins': (list, ["xxx"]),
+        'storage': (str, "csv"),
+        'write_behind': (bool, False),
+        'flush_interval': ((int, float), 1.0),
+        'flush_threshold': (int, 200),
+        'worker_threads': (int, 0),  # 执行耗时命令的线程数,0 表示在接收消息的线程中直接执行
+        'worker_queue_size': (int, 100),
+    }
+    STORAGE_BACKENDS = ('csv', 'sqlite')
+
+    def __init__(self, data: Mapping[str, Any]):
+        """校验配置内容,不合法时抛出 ValueError"""
+        if not isinstance(data, dict):
+            raise ValueError("配置文件内容必须是 JSON 对象")
+        values = {}
+        for field, (field_type, default) in self.SCHEMA.items():
+            value = data.get(field, default)
+            # bool 是 int 的子类,数值字段不接受 true/false
+            if not isinstance(value, field_type) or (field_type is not bool and isinstance(value, bool)):
+                raise ValueError(f"配置项 {field} 类型错误: {value!r}")
+            values[field] = value
+        if not all(isinstance(admin, str) for admin in values['admins']):
+            raise ValueError("配置项 admins 必须是字符串列表")
+        if values['storage'] not in self.STORAGE_BACKENDS:
+            raise ValueError(f"配置项 storage 只能是 {'/'.join(self.STORAGE_BACKENDS)}")
+        if values['flush_interval'] <= 0 or values['flush_threshold'] <= 0:
+            raise ValueError("配置项 flush_interval 和 flush_threshold 必须大于0")
+        if values['worker_threads'] < 0 or values['worker_queue_size'] < 0:
+            raise ValueError("配置项 worker_threads 和 worker_queue_size 不能小于0")
+
+        object.__setattr__(self, 'admins', frozenset(values['admins']))
+        object.__setattr__(self, 'storage', values['storage'])
+        object.__setattr__(self, 'write_behind', values['write_behind'])
+        object.__setattr__(self, 'flush_interval', float(values['flush_interval']))
+        object.__setattr__(self, 'flush_threshold', values['flush_threshold'])
+        object.__setattr__(self, 'worker_threads', values['worker_threads'])
+        object.__setattr__(self, 'worker_queue_size', values['worker_queue_size'])
+        object.__setattr__(self, 'raw', MappingProxyType(dict(data)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameConfig 是只读的")
+
+    def is_admin(self, *names: str) -> bool:
+        """任意一个名字(昵称或用户ID)在管理员列表中即为管理员"""
+        return any(name in self.admins for name in names)
+
+
+class ConfigService:
+    """加载并缓存 config.json
+
+    文件不存在时写入默认配置。读取时按 CHECK_INTERVAL 检查文件修改时间,
+    变化后重新加载;重新加载失败时保留上一次的配置,启动时加载失败则使用默认配置。
+    """
+
+    CHECK_INTERVAL = 1.0
+    DEFAULT_CONFIG = {
+        "admins": ["xxx"]  # 默认管理员列表
+    }
+
+    def __init__(self, config_file: str):
+        self.config_file = config_file
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        if not os.path.exists(config_file):
+            with open(config_file, 'w', encoding='utf-8') as f:
+                json.dump(self.DEFAULT_CONFIG, f, ensure_ascii=False, indent=2)
+        self._stat = self._file_stat()
+        try:
+            self._config = self._read()
+        except (OSError, ValueError) as e:
+            # 配置文件有误时插件照常加载,修正文件后会自动重新加载
+            logger.error(f"加载配置文件出错,使用默认配置: {e}")
+            self._config = GameConfig(self.DEFAULT_CONFIG)
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read(self) -> GameConfig:
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            return GameConfig(json.load(f))
+
+    @property
+    def config(self) -> GameConfig:
+        """当前配置快照,文件变化时自动重新加载"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.CHECK_INTERVAL:
+            self._checked_at = now
+            if self._file_stat() != self._stat:
+                self.reload()
+        return self._config
+
+    def reload(self) -> bool:
+        """重新读取配置文件,返回是否成功"""
+        with self._lock:
+            self._stat = self._file_stat()
+            try:
+                self._config = self._read()
+            except (OSError, ValueError) as e:
+                logger.error(f"加载配置文件出错,继续使用原配置: {e}")
+                return False
+            logger.info("配置文件已重新加载")
+            return True
+
+    def is_admin(self, *names: str) -> bool:
+        """检查昵称或用户ID是否在管理员列表中"""
+        return self.config.is_admin(*names)
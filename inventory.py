@@ -0,0 +1,78 @@
+import json
+import random
+from collections import Counter
+from typing import Iterable, Optional
+
+
+class Inventory(Counter):
+    """玩家背包,以 物品名 -> 数量 的形式堆叠存放
+
+    增加和移除物品都是 O(1);保留 append/remove/count/extend 这些列表风格的方法,
+    方便逐个操作物品的旧代码直接使用。数量为0的物品会被立即删除。
+    """
+
+    def add(self, item_name: str, amount: int = 1) -> None:
+        """放入指定数量的物品,数量必须大于0,否则抛出 ValueError"""
+        if amount <= 0:
+            raise ValueError(f"物品数量必须大于0: {amount}")
+        self[item_name] += amount
+
+    def remove(self, item_name: str, amount: int = 1) -> None:
+        """取出指定数量的物品,数量不是正数或数量不足时抛出 ValueError 且背包不变"""
+        if amount <= 0:
+            raise ValueError(f"物品数量必须大于0: {amount}")
+        count = self.get(item_name, 0)
+        if count < amount:
+            raise ValueError(f"背包中只有 {count} 个 {item_name}")
+        if count == amount:
+            del self[item_name]
+        else:
+            self[item_name] = count - amount
+
+    def append(self, item_name: str) -> None:
+        """放入一个物品"""
+        self.add(item_name)
+
+    def extend(self, item_names: Iterable[str]) -> None:
+        """逐个放入物品"""
+        self.update(item_names)
+
+    def count(self, item_name: str) -> int:
+        """物品数量"""
+        return self.get(item_name, 0)
+
+    def random_item(self) -> Optional[str]:
+        """按数量加权随机选出一个物品,背包为空时返回 None"""
+        if not self:
+            return None
+        return random.choices(list(self.keys()), weights=list(self.values()))[0]
+
+    def total(self) -> int:
+        """物品总数"""
+        return sum(self.values())
+
+    def encode(self) -> str:
+        """编码为存储使用的 JSON 对象字符串"""
+        return json.dumps(dict(self), ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def decode(cls, value) -> 'Inventory':
+        """从存储中的取值解码背包
+
+        兼容旧版的物品名列表格式 ["面包", "面包"],读取后会在下次保存时转为新格式。
+        """
+        if isinstance(value, str):
+            try:
+                value = json.loads(value) if value else {}
+            except ValueError:
+                value = {}
+        inventory = cls()
+        if isinstance(value, dict):
+            for item_name, count in value.items():
+                try:
+                    inventory.add(str(item_name), int(count))
+                except (ValueError, TypeError):
+                    continue
+        elif isinstance(value, list):
+            inventory.update(str(item_name) for item_name in value if item_name)
+        return inventory
@@ -1,29 +1,126 @@
 import csv
 import json
+import threading
 from typing import Dict, Any, Optional
 from common.log import logger
 import os
 
+
+class ItemCatalog:
+    """物品目录缓存,同一个物品文件在进程内只解析一次
+
+    文件的修改时间或大小变化时才重新解析。除了与文件一致的字符串行之外,
+    还预先生成数值字段已转为 int 的物品记录以及按类型划分的视图。
+    缓存中的字典供所有调用方共享,只能读取不能修改。
+    """
+
+    # 需要转换为整数的字段
+    INT_FIELDS = ('hp', 'attack', 'defense', 'price', 'rarity')
+
+    _catalogs: Dict[str, 'ItemCatalog'] = {}
+    _lock = threading.Lock()
+    _next_version = 0
+
+    def __init__(self, item_file: str, stat_key: Optional[tuple], rows: list):
+        self.item_file = item_file
+        self.stat_key = stat_key
+        # 每次重新解析都会得到新的版本号,依赖目录的缓存可据此判断是否失效
+        ItemCatalog._next_version += 1
+        self.version = ItemCatalog._next_version
+        self.items: Dict[str, Dict[str, str]] = {}
+        self.typed: Dict[str, Dict[str, Any]] = {}
+        self.by_type: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for row in rows:
+            self.items[row['name']] = row
+            record = dict(row)
+            for field in self.INT_FIELDS:
+                record[field] = self._to_int(row.get(field))
+            self.typed[row['name']] = record
+            self.by_type.setdefault(row.get('type', ''), {})[row['name']] = record
+        # 商店出售除鱼类以外的全部物品
+        self.shop_items = {name: row for name, row in self.items.items() if row.get('type') != 'fish'}
+
+    @staticmethod
+    def _to_int(value) -> int:
+        try:
+            return int(float(value))
+        except (ValueError, TypeError):
+            return 0
+
+    @staticmethod
+    def _stat(item_file: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(item_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @classmethod
+    def load(cls, item_file: str) -> 'ItemCatalog':
+        """获取物品文件对应的目录,文件未变化时直接返回缓存"""
+        item_file = os.path.abspath(item_file)
+        stat_key = cls._stat(item_file)
+        catalog = cls._catalogs.get(item_file)
+        if catalog is not None and catalog.stat_key == stat_key:
+            return catalog
+        with cls._lock:
+            catalog = cls._catalogs.get(item_file)
+            if catalog is not None and catalog.stat_key == stat_key:
+                return catalog
+            rows = []
+            try:
+                with open(item_file, 'r', encoding='utf-8') as f:
+                    rows = list(csv.DictReader(f))
+            except Exception as e:
+                logger.error(f"读取物品数据出错: {e}")
+            catalog = cls(item_file, stat_key, rows)
+            cls._catalogs[item_file] = catalog
+            logger.debug(f"已加载物品目录 {item_file}, 共 {len(rows)} 种物品, 版本 {catalog.version}")
+            return catalog
+
+    @property
+    def weapons(self) -> Dict[str, Dict[str, Any]]:
+        return self.by_type.get('weapon', {})
+
+    @property
+    def armors(self) -> Dict[str, Dict[str, Any]]:
+        return self.by_type.get('armor', {})
+
+    @property
+    def consumables(self) -> Dict[str, Dict[str, Any]]:
+        return self.by_type.get('consumable', {})
+
+    @property
+    def fish(self) -> Dict[str, Dict[str, Any]]:
+        return self.by_type.get('fish', {})
+
+    @property
+    def rods(self) -> Dict[str, Dict[str, Any]]:
+        return self.by_type.get('fishing_rod', {})
+
+
 class Item:
     """物品类,用于管理物品属性和操作"""
     
     def __init__(self, data_dir: str):
         self.data_dir = data_dir
         self.item_file = f"{data_dir}/items.csv"
+
+    def catalog(self) -> ItemCatalog:
+        """获取当前的物品目录(文件变化时自动重新加载)"""
+        return ItemCatalog.load(self.item_file)
         
     def get_all_items(self) -> Dict[str, Dict[str, Any]]:
-        """获取所有物品信息"""
-        items_info = {}
-        try:
-            # 读取物品数据
-            with open(self.item_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    items_info[row['name']] = row
-            return items_info
-        except Exception as e:
-            logger.error(f"读取物品数据出错: {e}")
-            return {}
+        """获取所有物品信息(字段为文件中的字符串,只读)"""
+        return self.catalog().items
+
+    def get_item(self, item_name: str) -> Optional[Dict[str, Any]]:
+        """获取单个物品信息,数值字段已转换为整数"""
+        return self.catalog().typed.get(item_name)
+
+    def get_items_by_type(self, item_type: str) -> Dict[str, Dict[str, Any]]:
+        """获取指定类型的全部物品,数值字段已转换为整数"""
+        return self.catalog().by_type.get(item_type, {})
             
     def init_default_items(self):
         """初始化默认物品数据"""
@@ -66,17 +163,5 @@ class Item:
                 writer.writerows(fish_data)
             
     def get_shop_items(self) -> Dict[str, Dict[str, Any]]:
-        """获取商店物品信息"""
-        items = {}
-        try:
-            # 读取物品数据
-            with open(self.item_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # 只返回非鱼类物品
-                    if row.get('type') != 'fish':
-                        items[row['name']] = row
-            return items
-        except Exception as e:
-            logger.error(f"读取商店物品数据出错: {e}")
-            return {}
\ No newline at end of file
+        """获取商店物品信息(只包含非鱼类物品,只读)"""
+        return self.catalog().shop_items
\ No newline at end of file
@@ -0,0 +1,184 @@
+import datetime
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RankIndex:
+    """按分数从高到低排列的有序索引
+
+    内部是按 (取反后的分数, user_id) 升序排列的列表,前 k 名直接切片得到,
+    查询名次用二分查找 O(log n)。分数可以是整数,也可以是整数元组(如 (等级, 经验))。
+    分数相同时按 user_id 排序,保证结果稳定。
+    """
+
+    def __init__(self):
+        self._keys: List[tuple] = []
+        self._scores: Dict[str, Any] = {}
+
+    @staticmethod
+    def _sort_key(user_id: str, score) -> tuple:
+        if isinstance(score, tuple):
+            return (tuple(-value for value in score), user_id)
+        return ((-score,), user_id)
+
+    def update(self, user_id: str, score) -> None:
+        """设置玩家分数,分数未变化时不做任何操作"""
+        old = self._scores.get(user_id)
+        if old is not None:
+            if old == score:
+                return
+            self._remove_key(self._sort_key(user_id, old))
+        self._scores[user_id] = score
+        insort(self._keys, self._sort_key(user_id, score))
+
+    def remove(self, user_id: str) -> None:
+        """从索引中移除玩家"""
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._remove_key(self._sort_key(user_id, old))
+
+    def _remove_key(self, key: tuple) -> None:
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def top(self, k: int) -> List[Tuple[str, Any]]:
+        """前 k 名的 (user_id, 分数)"""
+        return [(user_id, self._scores[user_id]) for _, user_id in self._keys[:k]]
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """玩家名次(从1开始),不在索引中时返回 None"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._keys, self._sort_key(user_id, score)) + 1
+
+    def score(self, user_id: str):
+        """玩家当前分数"""
+        return self._scores.get(user_id)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._scores
+
+
+class RollingEarnings:
+    """按天分桶的滚动收益计数器,用于今日/本周收益排行
+
+    环形数组中每个桶保存一天内各玩家获得的 [金币, 经验],本周统计为最近 days 天的累计值。
+    进入新的一天时只清理过期的桶并从累计值中减去,不需要重新扫描历史数据。
+    """
+
+    def __init__(self, days: int = 7):
+        self.days = days
+        self._buckets: List[Dict[str, List[int]]] = [{} for _ in range(days)]
+        self._bucket_days: List[Optional[int]] = [None] * days
+        self._current_day: Optional[int] = None
+        self._week: Dict[str, List[int]] = {}
+        self._indexes = {'today': RankIndex(), 'week': RankIndex()}
+        self._lock = threading.Lock()
+        # 计数每次变化时加一,保存时据此跳过没有变化的数据
+        self.version = 0
+
+    @staticmethod
+    def _today() -> int:
+        return datetime.date.today().toordinal()
+
+    def _advance(self, day: int) -> int:
+        """切换到指定日期,清理窗口外的桶,返回实际使用的日期"""
+        if self._current_day is not None and day <= self._current_day:
+            return self._current_day
+        oldest = day - self.days + 1
+        for slot, bucket_day in enumerate(self._bucket_days):
+            if bucket_day is not None and bucket_day < oldest:
+                self._expire(slot)
+        self._current_day = day
+        self._bucket_days[day % self.days] = day
+        # 新的一天今日排行从空开始
+        self._indexes['today'] = RankIndex()
+        return day
+
+    def _expire(self, slot: int):
+        """从本周累计中减去一个过期的桶"""
+        week_index = self._indexes['week']
+        for user_id, (gold, exp) in self._buckets[slot].items():
+            total = self._week[user_id]
+            total[0] -= gold
+            total[1] -= exp
+            if total[0] <= 0 and total[1] <= 0:
+                del self._week[user_id]
+                week_index.remove(user_id)
+            else:
+                week_index.update(user_id, tuple(total))
+        self._buckets[slot] = {}
+        self._bucket_days[slot] = None
+        self.version += 1
+
+    def add(self, user_id: str, gold: int = 0, exp: int = 0, day: int = None) -> None:
+        """记录玩家获得的金币和经验,只统计收入,负数会被忽略"""
+        gold = max(0, int(gold))
+        exp = max(0, int(exp))
+        if not gold and not exp:
+            return
+        with self._lock:
+            day = self._advance(self._today() if day is None else day)
+            entry = self._buckets[day % self.days].setdefault(user_id, [0, 0])
+            entry[0] += gold
+            entry[1] += exp
+            self._indexes['today'].update(user_id, tuple(entry))
+            total = self._week.setdefault(user_id, [0, 0])
+            total[0] += gold
+            total[1] += exp
+            self._indexes['week'].update(user_id, tuple(total))
+            self.version += 1
+
+    def top(self, window: str, k: int = 10, day: int = None) -> List[Tuple[str, Tuple[int, int]]]:
+        """窗口内收益前 k 名的 (user_id, (金币, 经验))"""
+        with self._lock:
+            self._advance(self._today() if day is None else day)
+            return self._indexes[window].top(k)
+
+    def rank(self, window: str, user_id: str, day: int = None) -> Optional[int]:
+        """玩家在窗口内的名次,没有收益时返回 None"""
+        with self._lock:
+            self._advance(self._today() if day is None else day)
+            return self._indexes[window].rank(user_id)
+
+    def ranking_among(self, window: str, user_ids, day: int = None) -> List[Tuple[str, Tuple[int, int]]]:
+        """只在给定玩家之间排序,返回有收益玩家的 (user_id, (金币, 经验)) 完整排名"""
+        with self._lock:
+            self._advance(self._today() if day is None else day)
+            index = self._indexes[window]
+            entries = [(user_id, index.score(user_id)) for user_id in user_ids if user_id in index]
+        entries.sort(key=lambda entry: RankIndex._sort_key(*entry))
+        return entries
+
+    def score(self, window: str, user_id: str) -> Optional[Tuple[int, int]]:
+        """玩家在窗口内的 (金币, 经验)"""
+        with self._lock:
+            return self._indexes[window].score(user_id)
+
+    def to_dict(self) -> dict:
+        """导出为可以保存到 JSON 的字典: {日期序号: {user_id: [金币, 经验]}}"""
+        with self._lock:
+            return {
+                str(bucket_day): {user_id: list(entry) for user_id, entry in bucket.items()}
+                for bucket_day, bucket in zip(self._bucket_days, self._buckets)
+                if bucket_day is not None and bucket
+            }
+
+    @classmethod
+    def from_dict(cls, data: dict, days: int = 7) -> 'RollingEarnings':
+        """从 to_dict 导出的数据恢复,窗口外的数据会被丢弃"""
+        counter = cls(days)
+        today = cls._today()
+        for bucket_day, bucket in sorted(data.items(), key=lambda x: int(x[0])):
+            bucket_day = int(bucket_day)
+            if bucket_day <= today - days or bucket_day > today:
+                continue
+            for user_id, (gold, exp) in bucket.items():
+                counter.add(user_id, gold, exp, day=bucket_day)
+        return counter
@@ -1,11 +1,49 @@
 import json
 import random
 import os
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import Dict, List, Optional, Set
+from common.log import logger
+from .storage import JsonPropertyStorage
 
 class MonopolySystem:
-    def __init__(self, data_dir: str):
+    # 地价的地区倍率
+    PRICE_MULTIPLIERS = {
+        "直辖市": 5.0,
+        "省会": 3.0,
+        "地级市": 2.0,
+        "县城": 1.5,
+        "乡村": 1.0,
+        "其他": 1.0
+    }
+    
+    # 租金的地区倍率
+    RENT_MULTIPLIERS = {
+        "直辖市": 2.0,
+        "省会": 1.5,
+        "地级市": 1.3,
+        "县城": 1.2,
+        "乡村": 1.0,
+        "其他": 1.0
+    }
+    
+    # 购买地块时按地块类型收取的基础价格
+    PURCHASE_BASE_PRICES = {
+        '直辖市': 2000,
+        '省会': 1500,
+        '地级市': 1000,
+        '县城': 500,
+        '乡村': 300,
+        '空地': 200
+    }
+    
+    MAX_PROPERTY_LEVEL = 3  # 地产最高等级
+    MAP_CHECK_INTERVAL = 1.0  # 检查地图配置文件是否变化的最短间隔(秒)
+
+    def __init__(self, data_dir: str, storage=None):
         self.data_dir = data_dir
+        self.storage = storage  # 可选的 SqliteStorage,设置后地产数据存入数据库
         self.map_file = os.path.join(data_dir, "map_config.json")
         self.events_file = os.path.join(data_dir, "events_config.json")
         self.properties_file = os.path.join(data_dir, "properties.json")
@@ -15,10 +53,25 @@ class MonopolySystem:
         self._init_events_config()
         self._init_properties()
         
-        # 加载数据
-        self.map_data = self._load_json(self.map_file)
+        # 地图或地产(归属、等级)每次变化都会递增,用于判断渲染缓存是否失效
+        self._version = 0
+        # 购买、升级地产,读取全部地产和重新编译地图时加锁,不同玩家的命令会并行执行
+        self._lock = threading.RLock()
+        
+        # 加载数据并编译地图
+        self._map = None
+        self._map_stat = None
+        self._map_checked_at = 0.0
+        self._load_map()
         self.events_data = self._load_json(self.events_file)
-        self.properties_data = self._load_json(self.properties_file)
+        # 地产数据按地块增量保存: 数据库中逐行更新,或在 properties.json 之外追加日志
+        self.property_storage = self.storage if self.storage is not None else JsonPropertyStorage(self.properties_file)
+        self.properties_data = self.property_storage.load_properties()
+        
+        # 所有者 -> 地块位置集合
+        self._owner_index: Dict[str, Set[int]] = {}
+        for position, data in self.properties_data.items():
+            self._owner_index.setdefault(data["owner"], set()).add(int(position))
         
     def _init_map_config(self):
         """初始化地图配置"""
@@ -133,53 +186,161 @@ class MonopolySystem:
         except Exception as e:
             print(f"保存{file_path}失败: {e}")
 
+    def _save_property(self, position: int):
+        """保存单块地产的变更"""
+        self._version += 1
+        self.property_storage.save_property(position, self.properties_data[str(position)])
+
+    def _load_map(self):
+        """加载地图配置并预先计算每个位置的地块、地价、购买价格和各等级租金
+
+        各张表先在局部变量中建好,再在锁内一次性替换,
+        其他线程查表时看到的总是同一份完整的地图,不会读到编译到一半的表。
+        """
+        with self._lock:
+            self._map_stat = self._stat(self.map_file)
+            map_data = self._load_json(self.map_file)
+            try:
+                total = map_data["total_blocks"]
+                blocks = map_data["blocks"]
+                default_block = map_data["default_block"]
+            except KeyError as e:
+                if self._map is None:
+                    raise
+                # 配置文件正在编辑或内容不完整时继续使用原来的地图
+                logger.warning(f"地图配置缺少字段 {e},继续使用原地图")
+                return
+            
+            board: List[dict] = []
+            price_table: List[int] = []
+            purchase_price_table: List[int] = []
+            rent_table: List[List[int]] = []
+            for position in range(total):
+                block = blocks.get(str(position), default_block)
+                board.append(block)
+                price_table.append(self._compute_price(position, block))
+                # 租金按购买时实际支付的价格计算
+                purchase_price = self._compute_purchase_price(position, block)
+                purchase_price_table.append(purchase_price)
+                rent_table.append([
+                    self._compute_rent(purchase_price, block, level) for level in range(self.MAX_PROPERTY_LEVEL + 1)
+                ])
+            
+            self._map = (map_data, total, board, price_table, purchase_price_table, rent_table)
+            self._version += 1
+
+    @property
+    def map_data(self) -> dict:
+        return self._map[0]
+
+    @property
+    def total_blocks(self) -> int:
+        return self._map[1]
+
+    @property
+    def board(self) -> List[dict]:
+        return self._map[2]
+
+    @property
+    def price_table(self) -> List[int]:
+        return self._map[3]
+
+    @property
+    def purchase_price_table(self) -> List[int]:
+        return self._map[4]
+
+    @property
+    def rent_table(self) -> List[List[int]]:
+        return self._map[5]
+
+    @property
+    def version(self) -> int:
+        """地图和地产状态的版本号,地图配置文件变化时先重新编译"""
+        self._refresh_map()
+        return self._version
+
+    def _refresh_map(self):
+        """地图配置文件变化时重新编译,检查频率受 MAP_CHECK_INTERVAL 限制"""
+        if time.monotonic() - self._map_checked_at < self.MAP_CHECK_INTERVAL:
+            return
+        with self._lock:
+            now = time.monotonic()
+            # 等锁期间其他线程可能已经检查过
+            if now - self._map_checked_at < self.MAP_CHECK_INTERVAL:
+                return
+            self._map_checked_at = now
+            if self._stat(self.map_file) != self._map_stat:
+                self._load_map()
+
+    @staticmethod
+    def _stat(path: str):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _compute_price(self, position: int, block: dict) -> int:
+        """按地区和距离起点的远近计算地价"""
+        multiplier = self.PRICE_MULTIPLIERS.get(block["region"], self.PRICE_MULTIPLIERS["其他"])
+        # 根据距离起点的远近调整价格
+        distance_factor = 1 + (position % 10) * 0.1
+        return int(500 * multiplier * distance_factor)
+
+    def _compute_purchase_price(self, position: int, block: dict) -> int:
+        """按地块类型和距离起点的远近计算购买价格"""
+        base_price = self.PURCHASE_BASE_PRICES.get(block["type"], 500)
+        distance_factor = 1 + (position // 10) * 0.2  # 每10格增加20%价格
+        return int(base_price * distance_factor)
+
+    def _compute_rent(self, price: int, block: dict, level: int) -> int:
+        """按地价、地区和地产等级计算租金"""
+        base_rent = price * 0.1
+        multiplier = self.RENT_MULTIPLIERS.get(block["region"], self.RENT_MULTIPLIERS["其他"])
+        # 根据地产等级增加租金
+        level_multiplier = level * 0.5
+        return int(base_rent * multiplier * (1 + level_multiplier))
+
     def roll_dice(self) -> int:
         """掷骰子"""
         return random.randint(1, 6)
 
     def get_block_info(self, position: int) -> dict:
         """获取指定位置的地块信息"""
-        position = position % self.map_data["total_blocks"]
-        return self.map_data["blocks"].get(str(position), self.map_data["default_block"])
+        self._refresh_map()
+        _, total, board, _, _, _ = self._map
+        return board[position % total]
 
     def get_property_owner(self, position: int) -> Optional[str]:
         """获取地块所有者"""
         return self.properties_data.get(str(position))
 
     def buy_property(self, position: int, player_id: str, price: int) -> bool:
-        """购买地块"""
-        if str(position) in self.properties_data:
-            return False
-        
-        self.properties_data[str(position)] = {
-            "owner": player_id,
-            "level": 1,
-            "price": price
-        }
-        self._save_json(self.properties_file, self.properties_data)
-        return True
+        """购买地块,地块已有主人时返回 False"""
+        with self._lock:
+            if str(position) in self.properties_data:
+                return False
+            
+            self.properties_data[str(position)] = {
+                "owner": player_id,
+                "level": 1,
+                "price": price
+            }
+            self._owner_index.setdefault(player_id, set()).add(int(position))
+            self._save_property(position)
+            return True
 
     def calculate_property_price(self, position: int) -> int:
         """计算地块价格"""
-        block = self.get_block_info(position)
-        base_price = 500
-        
-        # 根据地区类型设置基础价格
-        region_multipliers = {
-            "直辖市": 5.0,
-            "省会": 3.0,
-            "地级市": 2.0,
-            "县城": 1.5,
-            "乡村": 1.0,
-            "其他": 1.0
-        }
-        
-        # 根据距离起点的远近调整价格
-        distance_factor = 1 + (position % 10) * 0.1
-        
-        # 计算最终价格
-        final_price = int(base_price * region_multipliers[block["region"]] * distance_factor)
-        return final_price
+        self._refresh_map()
+        _, total, _, price_table, _, _ = self._map
+        return price_table[position % total]
+
+    def get_purchase_price(self, position: int) -> int:
+        """购买地块时实际收取的价格"""
+        self._refresh_map()
+        _, total, _, _, purchase_price_table, _ = self._map
+        return purchase_price_table[position % total]
 
     def calculate_rent(self, position: int) -> int:
         """计算租金"""
@@ -187,25 +348,16 @@ class MonopolySystem:
         if not property_data:
             return 0
         
-        block = self.get_block_info(position)
-        base_rent = property_data["price"] * 0.1
-        
-        # 根据地区类型设置租金倍率
-        region_multipliers = {
-            "直辖市": 2.0,
-            "省会": 1.5,
-            "地级市": 1.3,
-            "县城": 1.2,
-            "乡村": 1.0,
-            "其他": 1.0
-        }
-        
-        # 根据地产等级增加租金
-        level_multiplier = property_data["level"] * 0.5
-        
-        # 计算最终租金
-        final_rent = int(base_rent * region_multipliers[block["region"]] * (1 + level_multiplier))
-        return final_rent
+        self._refresh_map()
+        # 只读取一次地图,查表期间重新编译也不会混用新旧两份表
+        _, total, board, _, purchase_price_table, rent_table = self._map
+        index = position % total
+        price = property_data["price"]
+        level = property_data["level"]
+        # 按当前购买价格买下的地产直接查表,价格不同(如地图调整前购买)时按公式计算
+        if price == purchase_price_table[index] and 0 <= level <= self.MAX_PROPERTY_LEVEL:
+            return rent_table[index][level]
+        return self._compute_rent(price, board[index], level)
 
     def get_property_info(self, position: int) -> dict:
         """获取地产详细信息"""
@@ -232,20 +384,25 @@ class MonopolySystem:
 
     def upgrade_property(self, position: int) -> bool:
         """升级地产"""
-        if str(position) not in self.properties_data:
-            return False
-            
-        property_data = self.properties_data[str(position)]
-        if property_data["level"] >= 3:  # 最高3级
-            return False
-            
-        property_data["level"] += 1
-        self._save_json(self.properties_file, self.properties_data)
-        return True
+        with self._lock:
+            if str(position) not in self.properties_data:
+                return False
+                
+            property_data = self.properties_data[str(position)]
+            if property_data["level"] >= self.MAX_PROPERTY_LEVEL:  # 最高3级
+                return False
+                
+            property_data["level"] += 1
+            self._save_property(position)
+            return True
 
     def get_player_properties(self, player_id: str) -> List[int]:
         """获取玩家的所有地产"""
-        return [
-            int(pos) for pos, data in self.properties_data.items()
-            if data["owner"] == player_id
-        ] 
+        with self._lock:
+            return sorted(self._owner_index.get(player_id, ()))
+
+    def properties_snapshot(self) -> Dict[str, dict]:
+        """全部地产数据的副本,可以在其他玩家购买地产时安全遍历"""
+        with self._lock:
+            return {position: dict(data) for position, data in self.properties_data.items()}
+
@@ -1,244 +1,184 @@
 import json
 from typing import Dict, Any, Optional
-import csv
 import logging
 import os
 import shutil
 from datetime import datetime
+from .inventory import Inventory
 
 logger = logging.getLogger(__name__)
 
+def _to_int(value, default: int) -> int:
+    """将字符串或数字转换为整数,兼容 "12.0" 这类旧数据"""
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        try:
+            return int(float(str(value).replace(',', '')))
+        except (ValueError, TypeError):
+            return default
+
+
+def _to_json(value, default_type: type):
+    """将 JSON 字符串解码为列表或字典,已是目标类型时直接返回"""
+    if isinstance(value, default_type):
+        return value
+    if not value:
+        return default_type()
+    try:
+        decoded = json.loads(value)
+    except (ValueError, TypeError):
+        return default_type()
+    return decoded if isinstance(decoded, default_type) else default_type()
+
+
 class Player:
-    """玩家类,用于管理玩家属性和状态"""
-    def __init__(self, data: Dict[str, Any], player_file: str = None, standard_fields: list = None):
+    """玩家类,用于管理玩家属性和状态
+
+    字段在构造时一次性解码为原生类型(int/Inventory/dict),保存时才编码回字符串。
+    通过属性赋值或 update_data 修改的字段会被记录为脏字段,保存时只写入这些字段。
+    """
+
+    # 持久化字段: 字段名 -> (类型, 默认值),顺序与 Game.STANDARD_FIELDS 一致
+    FIELDS = {
+        'user_id': (str, ''),
+        'nickname': (str, ''),
+        'gold': (int, 0),
+        'level': (int, 1),
+        'last_checkin': (str, ''),
+        'inventory': (Inventory, None),
+        'hp': (int, 100),
+        'max_hp': (int, 100),
+        'attack': (int, 10),
+        'defense': (int, 5),
+        'exp': (int, 0),
+        'last_fishing': (str, ''),
+        'rod_durability': (dict, None),
+        'equipped_weapon': (str, ''),
+        'equipped_armor': (str, ''),
+        'last_item_use': (int, 0),
+        'spouse': (str, ''),
+        'marriage_proposal': (str, ''),
+        'last_attack': (int, 0),
+        'position': (int, 0),
+    }
+
+    __slots__ = tuple(FIELDS) + ('equipped_fishing_rod', 'player_file', 'standard_fields', 'store', '_dirty')
+
+    def __init__(self, data: Dict[str, Any], player_file: str = None, standard_fields: list = None, store=None):
         if not isinstance(data, dict):
             raise TypeError("data must be a dictionary")
-        self.data = data
+        object.__setattr__(self, '_dirty', set())
+        for field, spec in self.FIELDS.items():
+            value = self._coerce(spec, data.get(field, spec[1]))
+            # 可变字段复制一份,避免与存储中的缓存共享
+            if spec[0] is Inventory:
+                value = value.copy()
+            elif spec[0] is dict:
+                value = dict(value)
+            object.__setattr__(self, field, value)
+        object.__setattr__(self, 'equipped_fishing_rod', str(data.get('equipped_fishing_rod', '') or ''))
         self.player_file = player_file
         self.standard_fields = standard_fields
+        self.store = store  # PlayerStore 实例,设置后读写都走内存索引
         
         # 清理耐久度为0的记录
-        if 'rod_durability' in self.data:
-            rod_durability = json.loads(self.data['rod_durability'])
-            cleaned_durability = {rod: durability for rod, durability in rod_durability.items() if int(durability) > 0}
-            self.data['rod_durability'] = json.dumps(cleaned_durability)
-    @property
-    def user_id(self) -> str:
-        return str(self.data.get('user_id', ''))
-        
-    @property
-    def nickname(self) -> str:
-        return self.data.get('nickname', '')
-        
-    @property
-    def gold(self) -> int:
-        return int(self.data.get('gold', 0))
-        
-    @gold.setter 
-    def gold(self, value: int):
-        self.data['gold'] = str(value)
-        
-    @property
-    def level(self) -> int:
-        return int(self.data.get('level', 1))
-        
-    @level.setter
-    def level(self, value: int):
-        self.data['level'] = str(value)
-        
-    @property
-    def hp(self) -> int:
-        return int(self.data.get('hp', 100))
-        
-    @hp.setter
-    def hp(self, value: int):
-        self.data['hp'] = str(value)
-        
-    @property
-    def max_hp(self) -> int:
-        return int(self.data.get('max_hp', 100))
-        
-    @max_hp.setter
-    def max_hp(self, value: int):
-        self.data['max_hp'] = str(value)
-        
-    @property
-    def attack(self) -> int:
-        return int(self.data.get('attack', 10))
-        
-    @attack.setter
-    def attack(self, value: int):
-        self.data['attack'] = str(value)
-        
-    @property
-    def defense(self) -> int:
-        return int(self.data.get('defense', 5))
-        
-    @defense.setter
-    def defense(self, value: int):
-        self.data['defense'] = str(value)
-        
-    @property
-    def exp(self) -> int:
-        """获取经验值，确保返回整数"""
-        try:
-            # 先转换为浮点数，再转换为整数
-            return int(float(self.data.get('exp', '0')))
-        except (ValueError, TypeError):
-            # 如果转换失败，返回默认值0
-            return 0
-        
-    @exp.setter
-    def exp(self, value: int):
-        """设置经验值，确保存储为整数字符串"""
-        try:
-            # 确保value被转换为整数
-            self.data['exp'] = str(int(value))
-        except (ValueError, TypeError):
-            # 如果转换失败，设置为0
-            self.data['exp'] = '0'
-        
-    @property
-    def inventory(self) -> list:
-        return json.loads(self.data.get('inventory', '[]'))
-        
-    @inventory.setter
-    def inventory(self, value: list):
-        self.data['inventory'] = json.dumps(value)
-        
-    @property
-    def equipped_weapon(self) -> str:
-        return self.data.get('equipped_weapon', '')
-        
-    @equipped_weapon.setter
-    def equipped_weapon(self, value: str):
-        self.data['equipped_weapon'] = value
-        
-    @property
-    def equipped_armor(self) -> str:
-        return self.data.get('equipped_armor', '')
-        
-    @equipped_armor.setter
-    def equipped_armor(self, value: str):
-        self.data['equipped_armor'] = value
-        
-    @property
-    def spouse(self) -> str:
-        return self.data.get('spouse', '')
-        
-    @spouse.setter
-    def spouse(self, value: str):
-        self.data['spouse'] = value
-        
-    @property
-    def marriage_proposal(self) -> str:
-        return self.data.get('marriage_proposal', '')
-        
-    @marriage_proposal.setter
-    def marriage_proposal(self, value: str):
-        self.data['marriage_proposal'] = value
-        
-    @property
-    def last_attack(self) -> int:
-        return int(self.data.get('last_attack', 0))
-        
-    @last_attack.setter
-    def last_attack(self, value: int):
-        self.data['last_attack'] = str(value)
-        
-    @property
-    def last_checkin(self) -> str:
-        return self.data.get('last_checkin', '')
-        
-    @last_checkin.setter
-    def last_checkin(self, value: str):
-        self.data['last_checkin'] = value
-        
-    @property
-    def last_fishing(self) -> str:
-        return self.data.get('last_fishing', '')
-        
-    @last_fishing.setter
-    def last_fishing(self, value: str):
-        self.data['last_fishing'] = value
-        
-    @property
-    def rod_durability(self) -> Dict:
-        return json.loads(self.data.get('rod_durability', '{}'))
-        
-    @rod_durability.setter
-    def rod_durability(self, value: Dict):
-        self.data['rod_durability'] = json.dumps(value)
-        
-    @property
-    def equipped_fishing_rod(self) -> str:
-        return self.data.get('equipped_fishing_rod', '')
-        
-    @equipped_fishing_rod.setter
-    def equipped_fishing_rod(self, value: str):
-        self.data['equipped_fishing_rod'] = value
-        
+        object.__setattr__(self, 'rod_durability', {
+            rod: durability for rod, durability in self.rod_durability.items() if _to_int(durability, 0) > 0
+        })
+
+    @staticmethod
+    def _coerce(spec: tuple, value):
+        """按字段类型转换取值"""
+        field_type, default = spec
+        if field_type is int:
+            return _to_int(value, default)
+        if field_type is Inventory:
+            return value if isinstance(value, Inventory) else Inventory.decode(value)
+        if field_type is dict:
+            return _to_json(value, field_type)
+        return '' if value is None else str(value)
+
+    @classmethod
+    def coerce_field(cls, field: str, value):
+        """将取值转换为字段对应的原生类型"""
+        return cls._coerce(cls.FIELDS[field], value)
+
+    def __setattr__(self, name, value):
+        spec = self.FIELDS.get(name)
+        if spec is not None:
+            value = self._coerce(spec, value)
+            self._dirty.add(name)
+        object.__setattr__(self, name, value)
+
+    @staticmethod
+    def encode_field(field: str, value) -> str:
+        """将字段值编码为存储使用的字符串"""
+        field_type = Player.FIELDS[field][0]
+        if field_type is Inventory:
+            return value.encode()
+        if field_type is dict:
+            return json.dumps(value)
+        return str(value)
+
+    @classmethod
+    def decode_record(cls, raw: Dict[str, Any]) -> Dict[str, Any]:
+        """将存储中的字符串记录解码为原生类型"""
+        return {field: cls._coerce(spec, raw.get(field, spec[1])) for field, spec in cls.FIELDS.items()}
+
+    @classmethod
+    def encode_record(cls, record: Dict[str, Any]) -> Dict[str, str]:
+        """将原生类型的记录编码为存储使用的字符串记录"""
+        return {field: cls.encode_field(field, record[field]) for field in cls.FIELDS}
+
     @property
-    def last_item_use(self):
-        """获取上次使用物品的时间"""
-        try:
-            return int(self.data.get('last_item_use', '0'))
-        except (ValueError, TypeError):
-            # 如果转换失败，返回0作为默认值
-            return 0
-        
-    @last_item_use.setter
-    def last_item_use(self, value: int):
-        """设置上次使用物品的时间"""
-        self.data['last_item_use'] = str(value)
+    def dirty_fields(self) -> set:
+        """自上次保存以来被修改过的字段"""
+        return set(self._dirty)
+
+    def to_record(self) -> Dict[str, Any]:
+        """转换为原生类型的记录(可变字段为副本)"""
+        record = {field: getattr(self, field) for field in self.FIELDS}
+        record['inventory'] = record['inventory'].copy()
+        record['rod_durability'] = dict(record['rod_durability'])
+        return record
 
     @property
-    def position(self) -> int:
-        """获取玩家位置"""
-        return int(self.data.get('position', '0'))
-        
-    @position.setter
-    def position(self, value: int):
-        """设置玩家位置"""
-        self.data['position'] = str(value)
+    def data(self) -> Dict[str, str]:
+        """兼容旧代码的字符串字典视图"""
+        return self.to_dict()
 
     def update_data(self, updates: Dict[str, Any]) -> None:
         """更新玩家数据并保存到文件"""
         if not self.player_file or not self.standard_fields:
             raise ValueError("player_file and standard_fields must be set")
             
-        # 更新内存中的数据
-        self.data.update(updates)
+        # 更新内存中的数据,赋值时自动转换类型并记录脏字段
+        for key, value in updates.items():
+            if key in self.FIELDS:
+                setattr(self, key, value)
         
         # 验证数据
         if not self.validate_data():
             raise ValueError("Invalid player data after update")
             
-        try:
-            # 读取所有玩家数据
-            players_data = []
-            with open(self.player_file, 'r', encoding='utf-8', newline='') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['user_id'] != self.user_id:
-                        players_data.append(row)
-            
-            # 添加更新后的玩家数据
-            players_data.append(self.data)
-            
-            # 写回文件
-            with open(self.player_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=self.standard_fields, quoting=csv.QUOTE_ALL)
-                writer.writeheader()
-                writer.writerows(players_data)
-                
-        except Exception as e:
-            logger.error(f"更新玩家数据出错: {e}")
-            raise
+        self._save(self.player_file, self.standard_fields)
+
+    def _save(self, player_file: str, standard_fields: list) -> None:
+        """通过 PlayerStore 保存脏字段
+
+        players.csv 只是快照,最新数据在日志中,不能绕过 PlayerStore 直接改写文件。
+        """
+        if self.store is None:
+            raise ValueError("store must be set")
+        self.store.save(self.to_record(), self._dirty)
+        self._dirty.clear()
 
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典格式"""
-        return self.data
+        """转换为字符串字典格式"""
+        return self.encode_record(self.to_record())
         
     @classmethod
     def create_new(cls, user_id: str, nickname: str) -> 'Player':
@@ -246,24 +186,24 @@ class Player:
         data = {
             'user_id': user_id,
             'nickname': nickname,
-            'gold': '2000',
-            'level': '1', 
+            'gold': 2000,
+            'level': 1, 
             'last_checkin': '',
-            'inventory': '[]',
-            'hp': '100',
-            'max_hp': '100',
-            'attack': '10',
-            'defense': '5',
-            'exp': '0',
+            'inventory': Inventory(),
+            'hp': 100,
+            'max_hp': 100,
+            'attack': 10,
+            'defense': 5,
+            'exp': 0,
             'last_fishing': '',
-            'rod_durability': '{}',
+            'rod_durability': {},
             'equipped_weapon': '',
             'equipped_armor': '',
-            'last_item_use': '0',
+            'last_item_use': 0,
             'spouse': '',
             'marriage_proposal': '',
-            'last_attack': '0',
-            'position': '0'
+            'last_attack': 0,
+            'position': 0
         }
         return cls(data) 
 
@@ -272,9 +212,8 @@ class Player:
         if not self.inventory:
             return "背包是空的"
             
-        # 统计物品数量
-        from collections import Counter
-        item_counts = Counter(self.inventory)
+        # 背包本身按物品堆叠存放,直接使用其中的数量
+        item_counts = self.inventory
         
         # 按类型分类物品
         weapons = []
@@ -366,33 +305,6 @@ class Player:
         """检查是否拥有指定物品"""
         return item_name in self.inventory
 
-    @classmethod
-    def get_player(cls, user_id: str, player_file: str) -> Optional['Player']:
-        """从文件中获取玩家数据
-        
-        Args:
-            user_id: 用户ID
-            player_file: 玩家数据文件路径
-            
-        Returns:
-            Optional[Player]: 玩家实例,如果未找到则返回 None
-        """
-        try:
-            with open(player_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['user_id'] == str(user_id):
-                        logger.info(f"找到用户ID为 {user_id} 的玩家数据")
-                        return cls(row)
-            logger.warning(f"未找到用户ID为 {user_id} 的玩家数据")
-            return None
-        except FileNotFoundError:
-            logger.error(f"玩家数据文件 {player_file} 未找到")
-            return None
-        except Exception as e:
-            logger.error(f"获取玩家数据出错: {e}")
-            return None
-
     def save_player_data(self, player_file: str, standard_fields: list) -> None:
         """保存玩家数据到CSV文件
         
@@ -400,66 +312,14 @@ class Player:
             player_file: 玩家数据文件路径
             standard_fields: 标准字段列表
         """
-        try:
-            # 读取所有玩家数据
-            players_data = []
-            with open(player_file, 'r', encoding='utf-8', newline='') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['user_id'] != self.user_id:
-                        players_data.append(row)
-            
-            # 添加更新后的玩家数据
-            players_data.append(self.to_dict())
-            
-            # 写回文件
-            with open(player_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=standard_fields, quoting=csv.QUOTE_ALL)
-                writer.writeheader()
-                writer.writerows(players_data)
-                
-        except Exception as e:
-            logger.error(f"保存玩家数据出错: {e}")
-            raise
+        self._save(player_file, standard_fields)
 
     def validate_data(self) -> bool:
-        """验证玩家数据的完整性"""
-        required_fields = {
-            'user_id': str,
-            'nickname': str,
-            'gold': (str, int),
-            'level': (str, int),
-            'hp': (str, int),
-            'max_hp': (str, int),
-            'attack': (str, int),
-            'defense': (str, int),
-            'exp': (str, int),
-            'position': (str, int)
-        }
-        
-        try:
-            for field, types in required_fields.items():
-                if field not in self.data:
-                    logger.error(f"Missing required field: {field}")
-                    return False
-                
-                value = self.data[field]
-                if isinstance(types, tuple):
-                    if not isinstance(value, types):
-                        try:
-                            # 尝试转换为字符串
-                            self.data[field] = str(value)
-                        except:
-                            logger.error(f"Invalid type for field {field}: {type(value)}")
-                            return False
-                else:
-                    if not isinstance(value, types):
-                        logger.error(f"Invalid type for field {field}: {type(value)}")
-                        return False
-            return True
-        except Exception as e:
-            logger.error(f"Data validation error: {e}")
+        """验证玩家数据的完整性,字段类型已在赋值时统一转换"""
+        if not self.user_id:
+            logger.error("Missing required field: user_id")
             return False
+        return True
 
     def _backup_data(self):
         """创建数据文件的备份"""
@@ -588,10 +448,9 @@ class Player:
            
        if self.marriage_proposal:
            # 获取求婚者的昵称
-           proposer = self.get_player(self.marriage_proposal, self.player_file)
-           if proposer:
-               proposer_name = proposer.nickname
-           else:
+           proposer_data = self.store.get(self.marriage_proposal) if self.store is not None else None
+           proposer_name = proposer_data['nickname'] if proposer_data else None
+           if not proposer_name:
                proposer_name = f"@{self.marriage_proposal}"
            marriage_status += f"\n💝 收到来自 {proposer_name} 的求婚"
        
@@ -618,30 +477,3 @@ class Player:
            status.append(f"🎣 装备鱼竿: {equipped_fishing_rod} [耐久度:{rod_durability}%]")
        
        return "\n".join(status)
-
-    @classmethod
-    def get_player_by_nickname(cls, nickname: str, player_file: str) -> Optional['Player']:
-        """根据昵称查找玩家
-        
-        Args:
-            nickname: 玩家昵称
-            player_file: 玩家数据文件路径
-            
-        Returns:
-            Optional[Player]: 玩家实例,如果未找到则返回 None
-        """
-        try:
-            with open(player_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['nickname'] == nickname:
-                        logger.info(f"找到昵称为 {nickname} 的玩家数据")
-                        return cls(row)
-            logger.warning(f"未找到昵称为 {nickname} 的玩家数据")
-            return None
-        except FileNotFoundError:
-            logger.error(f"玩家数据文件 {player_file} 未找到")
-            return None
-        except Exception as e:
-            logger.error(f"根据昵称获取玩家数据出错: {e}")
-            return None
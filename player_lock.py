@@ -0,0 +1,123 @@
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Set, TypeVar
+
+T = TypeVar('T')
+
+
+class LockOrderRetry(BaseException):
+    """持有锁期间需要按乱序加锁时抛出,由 PlayerLockManager.run 释放全部锁后重试
+
+    继承 BaseException,避免被命令处理函数中的 except Exception 吞掉。
+    """
+
+
+class PlayerLockBusy(Exception):
+    """不等待加锁时,需要的玩家锁正被其他命令占用"""
+
+
+class PlayerLockManager:
+    """按 user_id 分段加锁的锁管理器
+
+    所有 user_id 散列到固定数量的锁上,不同玩家的命令大多落在不同的锁上可以并行执行。
+    同时涉及多个玩家的命令按锁的编号顺序加锁,避免死锁。
+
+    一条命令开始时通过 run 锁住已知的玩家;执行中途才确定的其他玩家(如地产主人)用 acquire 追加。
+    追加的锁编号都比已持有的大时直接等待;否则只尝试加锁,失败时抛出 LockOrderRetry,
+    run 释放全部锁后按顺序锁住所有玩家并重新执行命令。
+    因此追加加锁应放在产生文件写入之外的副作用之前,命令内的玩家数据修改会随工作单元一起丢弃。
+    重试前已经确定的随机结果(如掷骰子)用 keep 保存,重试时沿用,重试不会改变命令的结果。
+
+    run 和 hold 传入 blocking=False 时不等待: 锁被占用就抛出 PlayerLockBusy,
+    供接收消息的线程把命令转交给线程池,而不是阻塞在锁上。
+    run 范围内追加加锁同样不等待,按顺序的锁被占用时也抛出 PlayerLockBusy。
+    """
+
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._local = threading.local()
+
+    def _stripe(self, key) -> int:
+        return hash(str(key)) % len(self._locks)
+
+    def _held(self) -> List[int]:
+        held = getattr(self._local, 'held', None)
+        if held is None:
+            held = self._local.held = []
+        return held
+
+    @contextmanager
+    def hold(self, *keys, blocking: bool = True):
+        """按顺序锁住给定玩家,嵌套使用时由最外层统一释放"""
+        held = self._held()
+        if held:
+            self.acquire(*keys)
+            yield
+            return
+        try:
+            for stripe in sorted({self._stripe(key) for key in keys}):
+                if not self._locks[stripe].acquire(blocking=blocking):
+                    raise PlayerLockBusy()
+                held.append(stripe)
+            yield
+        finally:
+            for stripe in reversed(held):
+                self._locks[stripe].release()
+            held.clear()
+
+    def acquire(self, *keys) -> None:
+        """在 hold/run 范围内追加锁住玩家,锁会一直持有到最外层范围结束"""
+        held = self._held()
+        if not held:
+            raise RuntimeError("acquire 只能在 hold 或 run 范围内使用")
+        held_set = set(held)
+        needed = sorted({self._stripe(key) for key in keys} - held_set)
+        if not needed:
+            return
+        in_order = needed[0] > max(held)
+        blocking = getattr(self._local, 'blocking', True)
+        for stripe in needed:
+            if in_order:
+                if not self._locks[stripe].acquire(blocking=blocking):
+                    raise PlayerLockBusy()
+            elif not self._locks[stripe].acquire(blocking=False):
+                # 乱序加锁可能死锁: 记录需要的锁,交给 run 重新按顺序加锁
+                self._local.retry_keys = set(keys)
+                raise LockOrderRetry()
+            held.append(stripe)
+
+    def run(self, keys: Iterable, func: Callable[[], T], blocking: bool = True) -> T:
+        """锁住给定玩家后执行 func,执行中追加加锁失败时锁住全部玩家重新执行
+
+        blocking 为 False 时锁被占用直接抛出 PlayerLockBusy(重试和 func 中追加加锁时同样不等待)。
+        """
+        wanted: Set = set(keys)
+        previous = getattr(self._local, 'blocking', True), getattr(self._local, 'kept', None)
+        self._local.blocking = blocking
+        self._local.kept = {}
+        try:
+            while True:
+                self._local.retry_keys = None
+                try:
+                    with self.hold(*wanted, blocking=blocking):
+                        return func()
+                except LockOrderRetry:
+                    retry_keys = self._local.retry_keys
+                    self._local.retry_keys = None
+                    if not retry_keys or retry_keys <= wanted:
+                        raise
+                    wanted |= retry_keys
+        finally:
+            self._local.blocking, self._local.kept = previous
+
+    def keep(self, name: str, factory: Callable[[], T]) -> T:
+        """在 run 范围内只调用一次 factory,重新执行命令时返回第一次的结果
+
+        不在 run 范围内时直接调用 factory。
+        """
+        kept = getattr(self._local, 'kept', None)
+        if kept is None:
+            return factory()
+        if name not in kept:
+            kept[name] = factory()
+        return kept[name]
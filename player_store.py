@@ -0,0 +1,423 @@
+import threading
+import time
+from contextlib import contextmanager
+from copy import copy
+from typing import Dict, Any, Optional, List, Set
+from common.log import logger
+from .leaderboard import RankIndex
+from .player import Player
+from .storage import CsvPlayerStorage
+
+
+class PlayerStore:
+    """玩家数据存储类,一次性加载玩家文件并在内存中维护 user_id 索引
+
+    内存中同时保存解码后的记录(原生类型)和编码后的字符串记录,
+    前者供业务读取,后者交给存储后端写入,每个字段只在变化时编码一次。
+    """
+
+    def __init__(self, player_file: str, standard_fields: list, storage=None,
+                 write_behind: bool = False, flush_interval: float = 1.0, flush_threshold: int = 200):
+        self.player_file = player_file
+        self.standard_fields = standard_fields
+        self._records: Dict[str, Dict[str, Any]] = {}
+        # user_id -> 编码后的字符串记录,与 _records 保持同步
+        self._raw: Dict[str, Dict[str, str]] = {}
+        # 昵称 -> 按注册顺序排列的 user_id 列表,允许昵称重复
+        self._nicknames: Dict[str, List[str]] = {}
+        # 排行榜索引: 名称 -> (RankIndex, 计算分数的函数, 影响分数的字段)
+        self._rankings: Dict[str, tuple] = {}
+        # 群成员: 群ID -> user_id 集合,以及反向的 user_id -> 群ID 集合
+        self._group_members: Dict[str, Set[str]] = {}
+        self._player_groups: Dict[str, Set[str]] = {}
+        # 按群划分的排行榜索引: (排行榜名称, 群ID) -> RankIndex,首次查询时建立
+        self._group_rankings: Dict[tuple, RankIndex] = {}
+        # 存储后端,默认使用 players.csv,也可以传入 SqliteStorage
+        self._owns_storage = storage is None
+        self._storage = storage or CsvPlayerStorage(player_file, standard_fields)
+        self._signature = None
+        self._lock = threading.RLock()
+        # 每个线程当前工作单元中尚未写入的玩家记录
+        self._local = threading.local()
+        # 延迟写入: user_id -> 待写入的字段集合, None 表示新玩家需要完整写入
+        self._dirty: Dict[str, Optional[Set[str]]] = {}
+        self._flush_interval = flush_interval
+        self._flush_threshold = flush_threshold
+        self._flush_event = threading.Event()
+        # 定期执行的保存函数,开启 write_behind 时由后台写入线程调用,否则在提交工作单元时按间隔调用
+        self._flush_hooks: List = []
+        self._hooks_ran_at = time.monotonic()
+        self._closed = False
+        self._flusher = None
+        self._load()
+        
+        if write_behind:
+            self._flusher = threading.Thread(target=self._flush_loop, name="PlayerStoreFlusher", daemon=True)
+            self._flusher.start()
+
+    def _load(self):
+        """从文件加载全部玩家数据并建立索引"""
+        raw = self._storage.load()
+        self._raw = raw
+        self._records = {user_id: Player.decode_record(row) for user_id, row in raw.items()}
+        # 旧版背包是物品名列表,编码缓存统一转为堆叠格式,随下次写入或压缩落盘
+        for user_id, row in raw.items():
+            if row.get('inventory', '').startswith('['):
+                row['inventory'] = Player.encode_field('inventory', self._records[user_id]['inventory'])
+        self._nicknames = {}
+        for user_id, record in self._records.items():
+            self._index_nickname(user_id, record['nickname'])
+        for name in self._rankings:
+            self._rebuild_ranking(name)
+        self._group_rankings = {}
+        self._signature = self._storage.signature()
+        logger.info(f"已加载 {len(raw)} 条玩家数据")
+
+    def _index_nickname(self, user_id: str, nickname: str):
+        """将玩家加入昵称索引"""
+        if nickname:
+            user_ids = self._nicknames.setdefault(nickname, [])
+            if user_id not in user_ids:
+                user_ids.append(user_id)
+
+    def _unindex_nickname(self, user_id: str, nickname: str):
+        """将玩家从昵称索引中移除"""
+        user_ids = self._nicknames.get(nickname)
+        if user_ids and user_id in user_ids:
+            user_ids.remove(user_id)
+            if not user_ids:
+                del self._nicknames[nickname]
+
+    def _put(self, user_id: str, changes: Dict[str, Any]) -> Dict[str, str]:
+        """将变化的字段写入内存记录并维护昵称索引,返回这些字段的编码结果"""
+        record = self._records.setdefault(user_id, {})
+        raw = self._raw.setdefault(user_id, {})
+        if 'nickname' in changes and record.get('nickname') is not None:
+            self._unindex_nickname(user_id, record['nickname'])
+        encoded = {}
+        for field, value in changes.items():
+            record[field] = copy(value)
+            encoded[field] = raw[field] = Player.encode_field(field, value)
+        self._index_nickname(user_id, record['nickname'])
+        for name, (index, score, fields) in self._rankings.items():
+            if not fields.isdisjoint(changes):
+                value = score(record)
+                index.update(user_id, value)
+                for group_id in self._player_groups.get(user_id, ()):
+                    group_index = self._group_rankings.get((name, group_id))
+                    if group_index is not None:
+                        group_index.update(user_id, value)
+        return encoded
+
+    def _rebuild_ranking(self, name: str):
+        """根据全部玩家记录重建排行榜索引"""
+        _, score, fields = self._rankings[name]
+        index = RankIndex()
+        for user_id, record in self._records.items():
+            index.update(user_id, score(record))
+        self._rankings[name] = (index, score, fields)
+
+    def _check_reload(self):
+        """文件被外部修改时重新加载"""
+        if self._storage.signature() != self._signature:
+            logger.info(f"检测到玩家数据文件 {self.player_file} 已变更,重新加载")
+            # 先写入尚未落盘的修改,避免重新加载时丢失
+            self._flush_dirty()
+            self._load()
+
+    def _pending(self) -> Optional[Dict[str, tuple]]:
+        """当前线程工作单元中的待写入记录,不在工作单元中时返回 None"""
+        return getattr(self._local, 'pending', None)
+
+    def _lookup(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """查找玩家记录,优先返回工作单元中尚未写入的版本"""
+        pending = self._pending()
+        if pending is not None and user_id in pending:
+            return pending[user_id][0]
+        return self._records.get(user_id)
+
+    def _write(self, entries: List[tuple]):
+        """将一批 (记录, 脏字段) 写入内存索引和存储后端
+
+        脏字段为 None 时比较全部字段;只有取值确实变化的字段会被编码和写入,
+        没有任何变化的记录会被跳过。
+        """
+        batch = []
+        for data, fields in entries:
+            user_id = str(data['user_id'])
+            old = self._records.get(user_id)
+            if old is None:
+                record = Player.decode_record(data)
+                self._put(user_id, record)
+                batch.append((self._raw[user_id], None))
+                continue
+            changes = {}
+            for field in (Player.FIELDS if fields is None else fields):
+                if field not in Player.FIELDS or field not in data:
+                    continue
+                value = Player.coerce_field(field, data[field])
+                if old.get(field) != value:
+                    changes[field] = value
+            if changes:
+                batch.append((self._raw[user_id], self._put(user_id, changes)))
+        if not batch:
+            return
+        if self._flusher is None:
+            self._persist(batch)
+            return
+            
+        # 延迟写入模式下只记录脏数据,由后台线程批量写入
+        for data, changes in batch:
+            user_id = str(data['user_id'])
+            if changes is None:
+                self._dirty[user_id] = None
+            elif user_id not in self._dirty:
+                self._dirty[user_id] = set(changes)
+            elif self._dirty[user_id] is not None:
+                self._dirty[user_id].update(changes)
+        if len(self._dirty) >= self._flush_threshold:
+            self._flush_event.set()
+
+    def _persist(self, batch: list):
+        """写入存储后端,失效记录过多时压缩,并记录新的文件签名"""
+        self._storage.write_batch(batch)
+        if self._storage.needs_compaction(len(self._raw)):
+            self._storage.compact(self._raw.values())
+        self._signature = self._storage.signature()
+
+    def _flush_dirty(self):
+        """将全部脏数据作为一个批次写入存储后端"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        batch = []
+        for user_id, fields in dirty.items():
+            record = self._raw.get(user_id)
+            if record is None:
+                continue
+            changes = None if fields is None else {field: record[field] for field in fields}
+            batch.append((record, changes))
+        try:
+            self._persist(batch)
+        except Exception:
+            # 写入失败时保留脏数据,等待下次重试
+            for user_id, fields in dirty.items():
+                self._dirty.setdefault(user_id, fields)
+            raise
+
+    def _flush_loop(self):
+        """后台写入线程: 按时间间隔或脏数据数量触发批量写入"""
+        while not self._closed:
+            self._flush_event.wait(self._flush_interval)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"批量写入玩家数据出错: {e}")
+            self._run_flush_hooks()
+
+    def add_flush_hook(self, hook) -> None:
+        """注册随玩家数据定期执行的保存函数,用于保存其他内存数据(如收益计数)"""
+        self._flush_hooks.append(hook)
+
+    def _run_flush_hooks(self):
+        self._hooks_ran_at = time.monotonic()
+        for hook in list(self._flush_hooks):
+            try:
+                hook()
+            except Exception as e:
+                logger.error(f"定期保存数据出错: {e}")
+
+    def flush(self) -> None:
+        """立即写入全部尚未落盘的修改"""
+        with self._lock:
+            self._flush_dirty()
+
+    def close(self) -> None:
+        """停止后台写入线程并同步写入剩余数据"""
+        self._closed = True
+        if self._flusher is not None:
+            self._flush_event.set()
+            self._flusher.join(timeout=10)
+            self._flusher = None
+        self.flush()
+        if self._owns_storage:
+            self._storage.close()
+
+    @contextmanager
+    def unit_of_work(self):
+        """在一次命令处理期间缓存所有玩家修改,结束时一次性写入
+
+        工作单元内的读取会看到本单元已做的修改;执行过程中抛出异常时丢弃全部修改,
+        通过 after_commit 登记的回调也不会执行。嵌套使用时由最外层统一提交。
+        """
+        if self._pending() is not None:
+            yield
+            return
+        self._local.pending = {}
+        self._local.callbacks = []
+        try:
+            yield
+            pending = self._local.pending
+            if pending:
+                with self._lock:
+                    self._check_reload()
+                    self._write(list(pending.values()))
+            callbacks = self._local.callbacks
+        finally:
+            self._local.pending = None
+            self._local.callbacks = None
+        for callback in callbacks:
+            callback()
+        if self._flusher is None and time.monotonic() - self._hooks_ran_at >= self._flush_interval:
+            self._run_flush_hooks()
+
+    def after_commit(self, callback) -> None:
+        """在当前工作单元提交成功后执行 callback,不在工作单元中时立即执行"""
+        if self._pending() is None:
+            callback()
+            return
+        self._local.callbacks.append(callback)
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """根据用户ID获取玩家记录的副本"""
+        with self._lock:
+            self._check_reload()
+            record = self._lookup(str(user_id))
+            return dict(record) if record is not None else None
+
+    def get_many(self, user_ids) -> Dict[str, Dict[str, Any]]:
+        """批量获取玩家记录的副本,只包含存在的玩家"""
+        with self._lock:
+            self._check_reload()
+            records = {}
+            for user_id in user_ids:
+                user_id = str(user_id)
+                record = self._lookup(user_id)
+                if record is not None:
+                    records[user_id] = dict(record)
+            return records
+
+    def get_ids_by_nickname(self, nickname: str) -> List[str]:
+        """根据昵称获取所有匹配的用户ID(按注册顺序)"""
+        with self._lock:
+            self._check_reload()
+            return list(self._nicknames.get(nickname, []))
+
+    def get_by_nickname(self, nickname: str) -> Optional[Dict[str, Any]]:
+        """根据昵称获取玩家记录,昵称重复时返回最早注册的玩家"""
+        with self._lock:
+            self._check_reload()
+            user_ids = self._nicknames.get(nickname)
+            if not user_ids:
+                return None
+            if len(user_ids) > 1:
+                logger.warning(f"昵称 {nickname} 对应多个玩家: {user_ids}")
+            return dict(self._lookup(user_ids[0]))
+
+    def add(self, data: Dict[str, Any]) -> None:
+        """追加新玩家记录"""
+        self.save(data)
+
+    def save(self, data: Dict[str, Any], fields: Optional[Set[str]] = None) -> None:
+        """保存玩家记录(覆盖同ID的旧记录),在工作单元中时延迟到提交时写入
+
+        Args:
+            data: 玩家记录,字段可以是原生类型或编码后的字符串
+            fields: 修改过的字段,为 None 时比较全部字段
+        """
+        fields = None if fields is None else set(fields)
+        pending = self._pending()
+        if pending is not None:
+            user_id = str(data['user_id'])
+            if fields is None:
+                merged = dict(data)
+            else:
+                # 只合并修改过的字段: 同一命令中较早读取的玩家对象不会覆盖之后对其他字段的修改
+                with self._lock:
+                    base = self._lookup(user_id)
+                merged = dict(base) if base is not None else dict(data)
+                merged.update((field, data[field]) for field in fields if field in data)
+            if user_id in pending:
+                old_fields = pending[user_id][1]
+                fields = None if fields is None or old_fields is None else fields | old_fields
+            pending[user_id] = (merged, fields)
+            return
+        with self._lock:
+            self._check_reload()
+            self._write([(data, fields)])
+
+    def add_ranking(self, name: str, score, fields) -> None:
+        """注册排行榜索引,之后 fields 中的字段变化时自动更新该玩家的名次
+
+        Args:
+            name: 排行榜名称
+            score: 根据玩家记录计算分数的函数,分数越大排名越靠前
+            fields: 影响分数的字段
+        """
+        with self._lock:
+            self._rankings[name] = (None, score, frozenset(fields))
+            self._rebuild_ranking(name)
+
+    def _ranking_index(self, name: str, group_id: Optional[str]) -> RankIndex:
+        """获取全局或某个群的排行榜索引,群索引只用该群成员建立"""
+        if group_id is None:
+            return self._rankings[name][0]
+        key = (name, group_id)
+        index = self._group_rankings.get(key)
+        if index is None:
+            score = self._rankings[name][1]
+            index = RankIndex()
+            for user_id in self._group_members.get(group_id, ()):
+                record = self._records.get(user_id)
+                if record is not None:
+                    index.update(user_id, score(record))
+            self._group_rankings[key] = index
+        return index
+
+    def top(self, name: str, k: int = 10, group_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """获取排行榜前 k 名的玩家记录,指定 group_id 时只统计该群成员"""
+        with self._lock:
+            self._check_reload()
+            index = self._ranking_index(name, group_id)
+            return [dict(self._records[user_id]) for user_id, _ in index.top(k)]
+
+    def rank(self, name: str, user_id: str, group_id: Optional[str] = None) -> Optional[int]:
+        """获取玩家在排行榜中的名次(从1开始),玩家不存在时返回 None"""
+        with self._lock:
+            self._check_reload()
+            return self._ranking_index(name, group_id).rank(str(user_id))
+
+    def add_group_member(self, group_id: str, user_id: str) -> bool:
+        """记录玩家属于某个群,返回是否为新成员"""
+        group_id, user_id = str(group_id), str(user_id)
+        with self._lock:
+            members = self._group_members.setdefault(group_id, set())
+            if user_id in members:
+                return False
+            members.add(user_id)
+            self._player_groups.setdefault(user_id, set()).add(group_id)
+            # 已建立的群排行索引直接加入新成员
+            record = self._records.get(user_id)
+            if record is not None:
+                for name, (_, score, _) in self._rankings.items():
+                    group_index = self._group_rankings.get((name, group_id))
+                    if group_index is not None:
+                        group_index.update(user_id, score(record))
+            return True
+
+    def load_groups(self, groups: Dict[str, List[str]]) -> None:
+        """批量加载群成员关系"""
+        for group_id, user_ids in groups.items():
+            for user_id in user_ids:
+                self.add_group_member(group_id, user_id)
+
+    def group_members(self, group_id: str) -> Set[str]:
+        """获取群成员的 user_id 集合"""
+        with self._lock:
+            return set(self._group_members.get(str(group_id), ()))
+
+    def groups(self) -> Dict[str, List[str]]:
+        """导出全部群成员关系"""
+        with self._lock:
+            return {group_id: sorted(members) for group_id, members in self._group_members.items()}
@@ -0,0 +1,86 @@
+import heapq
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class ReminderBoard:
+    """玩家提醒公告板
+
+    缓存拼接好的提醒文本和版本号,只有提醒被添加、删除或过期时才重新生成。
+    过期时间放在最小堆中,每次读取只需查看堆顶,不用遍历全部提醒。
+    """
+
+    def __init__(self, reminders: Dict[str, dict],
+                 resolve_names: Callable[[Iterable[str]], Dict[str, str]]):
+        """
+        Args:
+            reminders: {user_id: {'content': str, 'expire_time': int}},公告板直接持有并修改这个字典
+            resolve_names: 批量把 user_id 解析为昵称的函数,找不到的玩家不出现在结果中
+        """
+        self.reminders = reminders
+        self._resolve_names = resolve_names
+        self._heap = [(reminder['expire_time'], user_id) for user_id, reminder in reminders.items()]
+        heapq.heapify(self._heap)
+        self.version = 0
+        self._banner = ""
+        self._banner_version = -1
+        self._lock = threading.Lock()
+
+    def set(self, user_id: str, content: str, expire_time: int) -> None:
+        """添加或覆盖玩家的提醒"""
+        with self._lock:
+            self.reminders[user_id] = {'content': content, 'expire_time': expire_time}
+            # 旧的堆元素留在堆中,弹出时与当前过期时间不一致就会被忽略
+            heapq.heappush(self._heap, (expire_time, user_id))
+            self.version += 1
+
+    def remove(self, user_id: str) -> bool:
+        """删除玩家的提醒,返回是否存在"""
+        with self._lock:
+            if self.reminders.pop(user_id, None) is None:
+                return False
+            self.version += 1
+            return True
+
+    def get(self, user_id: str) -> Optional[dict]:
+        """玩家当前的提醒,没有时返回 None"""
+        with self._lock:
+            reminder = self.reminders.get(user_id)
+            return dict(reminder) if reminder is not None else None
+
+    def snapshot(self) -> Dict[str, dict]:
+        """全部提醒的副本,用于在其他线程修改提醒时写入文件"""
+        with self._lock:
+            return {user_id: dict(reminder) for user_id, reminder in self.reminders.items()}
+
+    def expire(self, now: Optional[int] = None) -> List[str]:
+        """移除已过期的提醒,返回被移除提醒的 user_id"""
+        now = int(time.time()) if now is None else now
+        with self._lock:
+            return self._expire(now)
+
+    def _expire(self, now: int) -> List[str]:
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            expire_time, user_id = heapq.heappop(self._heap)
+            reminder = self.reminders.get(user_id)
+            if reminder is not None and reminder['expire_time'] == expire_time:
+                del self.reminders[user_id]
+                expired.append(user_id)
+        if expired:
+            self.version += 1
+        return expired
+
+    def banner(self) -> str:
+        """所有有效提醒拼接成的文本,没有提醒时为空字符串"""
+        with self._lock:
+            if self._banner_version != self.version:
+                names = self._resolve_names(list(self.reminders))
+                self._banner = "\n".join(
+                    f"[{names[user_id]}]: {reminder['content']}"
+                    for user_id, reminder in self.reminders.items()
+                    if user_id in names
+                )
+                self._banner_version = self.version
+            return self._banner
@@ -0,0 +1,129 @@
+import datetime
+import heapq
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from common.log import logger
+
+
+class TaskScheduler:
+    """定时开关机任务调度器
+
+    任务按执行时间放在最小堆中,后台线程睡眠到堆顶任务到期时再执行,
+    处理消息时不需要轮询任务。每天执行的任务执行后顺延到下一次执行时间,
+    一次性任务执行后删除。任务集合发生变化时调用 on_change 保存。
+    """
+
+    def __init__(self, tasks: Dict[str, dict], on_fire: Callable[[dict], None],
+                 on_change: Callable[[], None]):
+        """
+        Args:
+            tasks: {task_id: {'action': 'start'|'stop', 'time': 时间戳, 'is_daily': bool}}
+            on_fire: 任务到期时调用,参数为任务内容
+            on_change: 任务集合变化后调用,用于持久化
+        """
+        self._tasks = {task_id: dict(task) for task_id, task in tasks.items()}
+        self._heap = [(task['time'], task_id) for task_id, task in self._tasks.items()]
+        heapq.heapify(self._heap)
+        self._on_fire = on_fire
+        self._on_change = on_change
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    def start(self) -> None:
+        """启动后台调度线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="GameScheduler", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """停止后台调度线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def add(self, task_id: str, task: dict) -> None:
+        """添加或覆盖定时任务"""
+        with self._cond:
+            self._tasks[task_id] = dict(task)
+            # 覆盖时旧的堆元素留在堆中,弹出时与当前任务时间不一致就会被忽略
+            heapq.heappush(self._heap, (task['time'], task_id))
+            self._cond.notify()
+        self._on_change()
+
+    def remove(self, task_id: str) -> bool:
+        """删除定时任务,返回是否存在"""
+        with self._cond:
+            if self._tasks.pop(task_id, None) is None:
+                return False
+        self._on_change()
+        return True
+
+    def clear(self) -> int:
+        """删除全部定时任务,返回删除的数量"""
+        with self._cond:
+            count = len(self._tasks)
+            self._tasks.clear()
+            self._heap.clear()
+        if count:
+            self._on_change()
+        return count
+
+    def tasks(self) -> Dict[str, dict]:
+        """全部定时任务的副本"""
+        with self._cond:
+            return {task_id: dict(task) for task_id, task in self._tasks.items()}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """按时间顺序执行所有已到期的任务,返回执行的任务数"""
+        now = time.time() if now is None else now
+        with self._cond:
+            due = self._pop_due(now)
+        for task in due:
+            try:
+                self._on_fire(task)
+            except Exception as e:
+                logger.error(f"执行定时任务出错: {e}")
+        if due:
+            self._on_change()
+        return len(due)
+
+    def _pop_due(self, now: float) -> List[dict]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            task_time, task_id = heapq.heappop(self._heap)
+            task = self._tasks.get(task_id)
+            if task is None or task['time'] != task_time:
+                continue
+            due.append(dict(task))
+            if task.get('is_daily'):
+                # 顺延到下一次执行时间,停机期间错过的多次执行只补执行一次
+                next_time = datetime.datetime.fromtimestamp(task_time)
+                while next_time.timestamp() <= now:
+                    next_time += datetime.timedelta(days=1)
+                task['time'] = next_time.timestamp()
+                heapq.heappush(self._heap, (task['time'], task_id))
+            else:
+                del self._tasks[task_id]
+        return due
+
+    def _run(self):
+        """后台调度线程: 睡眠到最早的任务到期,添加新任务时被唤醒重新计算"""
+        while True:
+            with self._cond:
+                while not self._closed:
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+            self.run_due()
@@ -1,21 +1,26 @@
 import json
 from common.log import logger
 import csv
-from collections import Counter
 
 class Shop:
     def __init__(self, game):
         self.game = game
         
-    def sell_item(self, user_id, content):
-        """出售物品功能"""
+    def sell_item(self, user_id, args, bulk=False):
+        """出售物品功能
+
+        Args:
+            user_id: 玩家ID
+            args: 命令后的参数,单个出售为 [物品名, 数量],批量出售为 [物品类型]
+            bulk: 是否为批量出售
+        """
         # 检查玩家是否存在
         player = self.game.get_player(user_id)
         if not player:
             return "您还没注册,请先注册"
             
         # 批量出售
-        if content.startswith("批量出售"):
+        if bulk:
             inventory = player.inventory
             if not inventory:
                 return "背包是空的,没有可以出售的物品"
@@ -30,8 +35,7 @@ class Shop:
             equipped_armor = player.equipped_armor
             
             # 解析要出售的物品类型
-            parts = content.split()
-            target_type = parts[1] if len(parts) > 1 else None
+            target_type = args[0] if args else None
             
             # 中文类型映射
             type_mapping = {
@@ -45,10 +49,8 @@ class Shop:
             # 将中文类型转换为系统类型
             system_type = type_mapping.get(target_type) if target_type else None
             
-            # 统计每种物品的数量并计算总价值
-            item_counts = Counter(inventory)
-            
-            for item_name, count in item_counts.items():
+            # 背包按物品堆叠存放,直接遍历每种物品的数量并计算总价值
+            for item_name, count in inventory.items():
                 if item_name in items:
                     # 如果指定了物品类型,则只出售该类型
                     if target_type:
@@ -67,8 +69,7 @@ class Shop:
                         total_gold += sell_price * sellable_count
                         
                         # 从背包中移除指定数量的物品
-                        for _ in range(sellable_count):
-                            new_inventory.remove(item_name)
+                        new_inventory.remove(item_name, sellable_count)
                         
             if not sold_items:
                 if target_type:
@@ -90,13 +91,14 @@ class Shop:
             return report
             
         # 单个出售
-        elif content.startswith("出售"):
+        else:
             try:
-                parts = content.split()
-                item_name = parts[1]
-                amount = int(parts[2]) if len(parts) > 2 else 1
+                item_name = args[0]
+                amount = int(args[1]) if len(args) > 1 else 1
             except (IndexError, ValueError):
                 return "出售格式错误！请使用: 出售 物品名 [数量]"
+            if amount <= 0:
+                return "出售数量必须大于0"
             
             # 获取商店物品信息
             items = self.game.item_system.get_all_items()
@@ -128,8 +130,7 @@ class Shop:
             
             # 更新背包和金币
             new_inventory = inventory.copy()
-            for _ in range(amount):
-                new_inventory.remove(item_name)
+            new_inventory.remove(item_name, amount)
                 
             player.gold = player.gold + total_sell_price
             player.inventory = new_inventory
@@ -138,21 +139,18 @@ class Shop:
             player.save_player_data(self.game.player_file, self.game.STANDARD_FIELDS)
             
             return f"成功出售 {amount} 个 {item_name}，获得 {total_sell_price} 金币"
-            
-        return "无效的出售命令"
 
-    def buy_item(self, user_id, content):
+    def buy_item(self, user_id, args):
         """购买物品功能"""
-        parts = content.split()
-        if len(parts) < 2:
+        if not args:
             return "请指定要购买的物品名称"
             
-        item_name = parts[1]
+        item_name = args[0]
         # 获取购买数量,默认为1
         amount = 1
-        if len(parts) > 2:
+        if len(args) > 1:
             try:
-                amount = int(parts[2])
+                amount = int(args[1])
                 if amount <= 0:
                     return "购买数量必须大于0"
             except ValueError:
@@ -179,8 +177,7 @@ class Shop:
         # 更新玩家金币和背包
         player.gold -= total_price
         inventory = player.inventory
-        for _ in range(amount):
-            inventory.append(item_name)
+        inventory.add(item_name, amount)
         player.inventory = inventory
         
         # 保存更新后的玩家数据
@@ -195,14 +192,13 @@ class Shop:
         
         return f"购买成功 {amount} 个 {item_name}, 剩余金币: {player.gold}{equip_hint}"
 
-    def show_shop(self, content=""):
+    def show_shop(self, args=()):
         """显示商店物品列表"""
         # 获取页码,默认第一页
         page = 1
-        parts = content.split()
-        if len(parts) > 1:
+        if args:
             try:
-                page = int(parts[1])
+                page = int(args[0])
                 if page < 1:
                     page = 1
             except:
@@ -0,0 +1,599 @@
+import csv
+import filecmp
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from common.log import logger
+
+
+class CsvPlayerStorage:
+    """基于 players.csv 的玩家存储引擎
+
+    players.csv 作为快照,每次修改只把变更字段连同递增序号追加到 players.journal。
+    启动时先加载快照,再重放序号大于快照的日志。日志足够长时轮换出旧日志,
+    由后台线程写出新快照(临时文件 + 原子替换),写入过程中进程退出也不会破坏已有数据。
+
+    注意最新数据在 players.journal 中,players.csv 只是上次压缩时的快照,
+    可能远远落后于实际数据,不能直接从中读取玩家数据。
+    每次写出快照时同时保存一份副本 players.snapshot.csv。发现 players.csv 被手动修改后,
+    与副本逐行逐字段比较,只把修改过的字段(以及新增、删除的行)应用到重放日志后的数据上,
+    然后立即写出新快照,其他玩家在快照之后的修改不受影响。
+    """
+
+    # 日志条目至少达到该值才触发压缩,避免小文件频繁重写快照
+    COMPACT_MIN_ENTRIES = 1000
+
+    def __init__(self, player_file: str, standard_fields: list):
+        self.player_file = player_file
+        self.standard_fields = standard_fields
+        base = os.path.splitext(player_file)[0]
+        self.journal_file = f"{base}.journal"
+        self.old_journal_file = f"{base}.journal.old"  # 正在压缩进快照的旧日志
+        self.meta_file = f"{base}.snapshot.json"  # 记录快照包含的最大序号和快照文件的状态
+        self.base_file = f"{base}.snapshot.csv"  # 上次写出的快照副本,用于找出手动修改的内容
+        self._seq = 0
+        self._journal_entries = 0
+        self._snapshot_stat = None
+        self._lock = threading.Lock()
+        self._compactor = None
+
+    @staticmethod
+    def _stat(path: str):
+        """获取文件的修改时间和大小"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def signature(self):
+        """快照被外部修改或日志变化时签名改变,后台压缩写出的快照不算外部修改"""
+        with self._lock:
+            return (self._stat(self.player_file) == self._snapshot_stat, self._stat(self.journal_file))
+
+    @staticmethod
+    def _read_rows(path: str) -> Tuple[Optional[Dict[str, Dict[str, Any]]], Optional[list]]:
+        """读取 CSV 快照,返回 (user_id -> 记录, 表头),文件不存在时返回 (None, None)"""
+        records = {}
+        try:
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    # 旧版数据文件中同一玩家可能有多行,以最后一行为准
+                    user_id = row.get('user_id')
+                    if user_id:
+                        records[user_id] = row
+                return records, reader.fieldnames
+        except FileNotFoundError:
+            return None, None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """加载快照并重放日志,快照被手动修改时把修改合并到重放结果上"""
+        records, fieldnames = self._read_rows(self.player_file)
+        if records is None:
+            records = {}
+            logger.error(f"玩家数据文件 {self.player_file} 未找到")
+
+        meta = self._read_meta()
+        snapshot_seq = meta.get('seq', 0)
+        self._seq = snapshot_seq
+        edits = None
+        edited = self._snapshot_edited(meta)
+        if edited:
+            base, _ = self._read_rows(self.base_file)
+            if base is None:
+                # 没有上次写出的副本,无法区分修改了哪些字段: 在修改后的文件上重放日志,冲突的字段以日志为准
+                logger.warning(f"玩家数据文件 {self.player_file} 已被手动修改,但缺少快照副本,与日志冲突的修改不会生效")
+            else:
+                edits = self._diff_rows(base, records)
+                records = base
+
+        self._replay(self.old_journal_file, records, snapshot_seq)
+        self._journal_entries, complete = self._replay(self.journal_file, records, snapshot_seq)
+        if edits is not None:
+            self._apply_edits(records, edits)
+
+        # 表头过期、快照被手动修改、上次压缩未完成或日志末尾不完整时,立即写出新快照并清空日志
+        if fieldnames != self.standard_fields or edited or os.path.exists(self.old_journal_file) or not complete:
+            self._write_snapshot(list(records.values()), self._seq)
+            for path in (self.old_journal_file, self.journal_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._journal_entries = 0
+        else:
+            with self._lock:
+                self._snapshot_stat = self._stat(self.player_file)
+            if not self._base_matches():
+                # 补写快照副本(旧版本没有副本,或写出新快照时中途退出),之后才能找出手动修改的内容
+                self._write_base(self.player_file)
+            if meta.get('stat') is None:
+                # 补写快照文件状态,之后启动时才能发现停机期间的手动修改
+                self._write_meta(snapshot_seq)
+        return records
+
+    def read_records(self) -> Dict[str, Dict[str, Any]]:
+        """只读地加载快照并重放日志,不写出快照、快照信息和副本,用于导入到其他存储后端"""
+        records, _ = self._read_rows(self.player_file)
+        records = records or {}
+        snapshot_seq = self._read_meta().get('seq', 0)
+        self._replay(self.old_journal_file, records, snapshot_seq)
+        self._replay(self.journal_file, records, snapshot_seq)
+        return records
+
+    def _read_meta(self) -> Dict[str, Any]:
+        """读取快照信息: 包含的最大日志序号 seq 和写出时的文件状态 stat"""
+        try:
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            meta['seq'] = int(meta.get('seq', 0))
+            return meta
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"读取快照信息出错: {e}")
+            return {}
+
+    def _snapshot_edited(self, meta: Dict[str, Any]) -> bool:
+        """快照文件的状态与写出时记录的不一致,说明被手动修改过
+
+        运行中以上次加载或写出快照时记录的状态为准,启动时以快照信息中的 stat 为准。
+        旧日志存在时说明压缩进行到一半(快照已替换、快照信息还未写出),不算手动修改。
+        """
+        if os.path.exists(self.old_journal_file):
+            return False
+        with self._lock:
+            expected = self._snapshot_stat
+        if expected is None:
+            # 旧版本写出的快照信息没有 stat,无法判断,按未修改处理
+            expected = meta.get('stat')
+            if expected is None:
+                return False
+        stat = self._stat(self.player_file)
+        return stat is not None and list(stat) != list(expected)
+
+    @staticmethod
+    def _diff_rows(base: Dict[str, Dict[str, Any]], edited: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """比较快照副本和手动修改后的快照
+
+        Returns:
+            Dict[str, Optional[Dict[str, Any]]]: user_id -> 修改过的字段(新增的行为整行),被删除的行为 None
+        """
+        edits = {}
+        for user_id, row in edited.items():
+            old = base.get(user_id)
+            if old is None:
+                edits[user_id] = dict(row)
+                continue
+            changes = {
+                field: value for field, value in row.items()
+                if field and value is not None and old.get(field) != value
+            }
+            if changes:
+                edits[user_id] = changes
+        for user_id in base.keys() - edited.keys():
+            edits[user_id] = None
+        return edits
+
+    def _apply_edits(self, records: Dict[str, Dict[str, Any]], edits: Dict[str, Optional[Dict[str, Any]]]):
+        """把手动修改应用到重放日志后的数据上"""
+        for user_id, changes in edits.items():
+            if changes is None:
+                records.pop(user_id, None)
+            else:
+                records.setdefault(user_id, {}).update(changes)
+        logger.warning(f"玩家数据文件 {self.player_file} 已被手动修改,已合并 {len(edits)} 名玩家的修改")
+
+    def _replay(self, journal_file: str, records: Dict[str, Dict[str, Any]], after_seq: int) -> Tuple[int, bool]:
+        """重放日志中序号大于 after_seq 的条目
+
+        Returns:
+            Tuple[int, bool]: (日志条目数, 日志是否完整)
+        """
+        entries = 0
+        try:
+            with open(journal_file, 'r', encoding='utf-8') as f:
+                for line_no, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 进程在追加过程中退出会留下半行,之后的内容不可信
+                        logger.warning(f"玩家日志 {journal_file} 第{line_no}行不完整,已忽略之后的内容")
+                        return entries, False
+                    entries += 1
+                    if entry['seq'] <= after_seq:
+                        continue
+                    records.setdefault(entry['user_id'], {}).update(entry['updates'])
+                    self._seq = max(self._seq, entry['seq'])
+        except FileNotFoundError:
+            pass
+        return entries, True
+
+    def write_batch(self, batch: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]) -> None:
+        """将一批 (记录, 变更字段) 追加到日志,整批一次写入、一次 fsync
+
+        变更字段为 None 表示新玩家,写入完整记录。
+        """
+        lines = []
+        for record, changes in batch:
+            self._seq += 1
+            entry = {
+                'seq': self._seq,
+                'user_id': str(record['user_id']),
+                'updates': dict(record) if changes is None else changes
+            }
+            lines.append(json.dumps(entry, ensure_ascii=False))
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_entries += len(lines)
+
+    def needs_compaction(self, live_rows: int) -> bool:
+        """判断日志是否已经长到需要压缩进快照"""
+        if self._compactor is not None:
+            return False
+        return self._journal_entries >= max(live_rows, self.COMPACT_MIN_ENTRIES)
+
+    def compact(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """轮换日志并在后台线程中写出新快照
+
+        调用方需保证 rows 与日志在同一时刻一致(持有 PlayerStore 的锁)。
+        """
+        rows = [dict(row) for row in rows]
+        if os.path.exists(self.journal_file):
+            if os.path.exists(self.old_journal_file):
+                # 上次压缩失败留下的旧日志还未写入快照,合并后一起处理
+                with open(self.journal_file, 'rb') as src, open(self.old_journal_file, 'ab') as dst:
+                    shutil.copyfileobj(src, dst)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(self.journal_file)
+            else:
+                os.replace(self.journal_file, self.old_journal_file)
+        self._journal_entries = 0
+        self._compactor = threading.Thread(
+            target=self._compact_worker, args=(rows, self._seq), name="PlayerSnapshotWriter", daemon=True
+        )
+        self._compactor.start()
+
+    def _compact_worker(self, rows: List[Dict[str, Any]], seq: int):
+        """后台写出快照,成功后删除旧日志"""
+        try:
+            self._write_snapshot(rows, seq)
+            if os.path.exists(self.old_journal_file):
+                os.remove(self.old_journal_file)
+            logger.info(f"玩家数据快照已更新,共 {len(rows)} 条记录,序号 {seq}")
+        except Exception as e:
+            logger.error(f"写入玩家数据快照出错: {e}")
+        finally:
+            self._compactor = None
+
+    def _write_snapshot(self, rows: List[Dict[str, Any]], seq: int):
+        """原子写出快照文件和对应的日志序号"""
+        tmp_file = f"{self.player_file}.tmp"
+        with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.standard_fields, quoting=csv.QUOTE_ALL)
+            writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        # 先替换副本再替换快照: 两者之间退出时快照仍与快照信息一致,不会被误认为手动修改
+        self._write_base(tmp_file)
+        with self._lock:
+            os.replace(tmp_file, self.player_file)
+            self._snapshot_stat = self._stat(self.player_file)
+        self._write_meta(seq)
+
+    def _base_matches(self) -> bool:
+        """快照副本存在且与快照内容一致"""
+        try:
+            return filecmp.cmp(self.base_file, self.player_file, shallow=False)
+        except FileNotFoundError:
+            return False
+
+    def _write_base(self, source: str):
+        """原子写出快照副本"""
+        tmp_base = f"{self.base_file}.tmp"
+        shutil.copyfile(source, tmp_base)
+        with open(tmp_base, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_base, self.base_file)
+
+    def _write_meta(self, seq: int):
+        """原子写出快照包含的最大序号和快照文件当前的状态"""
+        with self._lock:
+            stat = self._snapshot_stat
+        tmp_meta = f"{self.meta_file}.tmp"
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump({'seq': seq, 'stat': list(stat) if stat else None}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_meta, self.meta_file)
+
+    def close(self) -> None:
+        """等待后台快照写入完成"""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+
+class JsonPropertyStorage:
+    """基于 properties.json 的地产存储
+
+    properties.json 作为快照,每次修改只把该地块的完整数据追加到 properties.journal。
+    加载时在快照上重放日志;日志条目足够多时写出新快照(临时文件 + 原子替换)并清空日志。
+    日志条目是完整的地块数据,替换快照后、删除日志前退出也只会重复应用相同的数据。
+    """
+
+    # 日志条目至少达到该值才重写快照
+    COMPACT_MIN_ENTRIES = 200
+
+    def __init__(self, properties_file: str):
+        self.properties_file = properties_file
+        self.journal_file = f"{os.path.splitext(properties_file)[0]}.journal"
+        self._properties: Dict[str, Dict[str, Any]] = {}
+        self._journal_entries = 0
+        self._lock = threading.Lock()
+
+    def load_properties(self) -> Dict[str, Dict[str, Any]]:
+        """加载快照并重放日志,格式与 properties.json 一致"""
+        with self._lock:
+            properties = {}
+            try:
+                with open(self.properties_file, 'r', encoding='utf-8') as f:
+                    properties = json.load(f)
+            except FileNotFoundError:
+                pass
+            except ValueError as e:
+                logger.error(f"加载{self.properties_file}失败: {e}")
+
+            entries, complete = 0, True
+            try:
+                with open(self.journal_file, 'r', encoding='utf-8') as f:
+                    for line_no, line in enumerate(f, 1):
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            logger.warning(f"地产日志 {self.journal_file} 第{line_no}行不完整,已忽略之后的内容")
+                            complete = False
+                            break
+                        properties[str(entry['position'])] = entry['data']
+                        entries += 1
+            except FileNotFoundError:
+                pass
+
+            self._properties = properties
+            self._journal_entries = entries
+            if not complete:
+                self._compact()
+            return {position: dict(data) for position, data in properties.items()}
+
+    def save_property(self, position: int, data: Dict[str, Any]) -> None:
+        """追加单块地产的变更,日志过长时重写快照"""
+        with self._lock:
+            self._properties[str(position)] = dict(data)
+            line = json.dumps({'position': int(position), 'data': data}, ensure_ascii=False)
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_entries += 1
+            if self._journal_entries >= max(len(self._properties), self.COMPACT_MIN_ENTRIES):
+                self._compact()
+
+    def _compact(self):
+        """原子写出新快照并清空日志,调用方需持有锁"""
+        tmp_file = f"{self.properties_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._properties, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.properties_file)
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self._journal_entries = 0
+
+
+class SqliteStorage:
+    """SQLite 存储后端(WAL 模式),保存玩家、地产和提醒数据
+
+    玩家表的接口与 CsvPlayerStorage 一致,可直接传给 PlayerStore;
+    修改玩家时只更新发生变化的列。UPDATE 语句按列组合缓存,
+    由 sqlite3 的语句缓存复用预编译结果。
+    """
+
+    def __init__(self, db_file: str, standard_fields: list):
+        self.db_file = db_file
+        self.standard_fields = standard_fields
+        self._lock = threading.RLock()
+        self._update_sql: Dict[tuple, str] = {}
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        """建表并补齐缺失的玩家字段"""
+        with self._lock:
+            columns = ", ".join(
+                f"{field} TEXT PRIMARY KEY" if field == 'user_id' else f"{field} TEXT NOT NULL DEFAULT ''"
+                for field in self.standard_fields
+            )
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS players ({columns})")
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(players)")}
+            for field in self.standard_fields:
+                if field not in existing:
+                    self._conn.execute(f"ALTER TABLE players ADD COLUMN {field} TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_players_nickname ON players (nickname)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS properties ("
+                "position INTEGER PRIMARY KEY, owner TEXT NOT NULL, level INTEGER NOT NULL, price INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_properties_owner ON properties (owner)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS reminders ("
+                "user_id TEXT PRIMARY KEY, content TEXT NOT NULL, expire_time INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    # ---------- 玩家数据 ----------
+
+    def signature(self):
+        """其他连接提交修改后 data_version 会变化,用于判断数据是否被外部修改"""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """加载全部玩家数据"""
+        fields = ", ".join(self.standard_fields)
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT {fields} FROM players ORDER BY rowid")
+            return {row[0]: dict(zip(self.standard_fields, row)) for row in cursor}
+
+    def insert(self, record: Dict[str, Any]) -> None:
+        """保存新玩家"""
+        fields = ", ".join(self.standard_fields)
+        placeholders = ", ".join("?" for _ in self.standard_fields)
+        values = [str(record.get(field, '')) for field in self.standard_fields]
+        with self._lock:
+            self._conn.execute(f"INSERT OR REPLACE INTO players ({fields}) VALUES ({placeholders})", values)
+
+    def update(self, record: Dict[str, Any], changes: Dict[str, Any]) -> None:
+        """只更新发生变化的列"""
+        columns = tuple(sorted(field for field in changes if field in self.standard_fields and field != 'user_id'))
+        if not columns:
+            return
+        sql = self._update_sql.get(columns)
+        if sql is None:
+            assignments = ", ".join(f"{field} = ?" for field in columns)
+            sql = f"UPDATE players SET {assignments} WHERE user_id = ?"
+            self._update_sql[columns] = sql
+        values = [str(changes[field]) for field in columns]
+        values.append(str(record['user_id']))
+        with self._lock:
+            self._conn.execute(sql, values)
+
+    def write_batch(self, batch: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]) -> None:
+        """在一个事务中写入一批 (记录, 变更字段),变更字段为 None 表示新玩家"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for record, changes in batch:
+                    if changes is None:
+                        self.insert(record)
+                    else:
+                        self.update(record, changes)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def needs_compaction(self, live_rows: int) -> bool:
+        """SQLite 原地更新,不需要压缩"""
+        return False
+
+    def compact(self, rows: Iterable[Dict[str, Any]]) -> None:
+        pass
+
+    # ---------- 地产数据 ----------
+
+    def load_properties(self) -> Dict[str, Dict[str, Any]]:
+        """加载全部地产,格式与 properties.json 一致"""
+        with self._lock:
+            cursor = self._conn.execute("SELECT position, owner, level, price FROM properties")
+            return {
+                str(position): {"owner": owner, "level": level, "price": price}
+                for position, owner, level, price in cursor
+            }
+
+    def save_property(self, position: int, data: Dict[str, Any]) -> None:
+        """保存单块地产"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO properties (position, owner, level, price) VALUES (?, ?, ?, ?)",
+                (int(position), data["owner"], int(data["level"]), int(data["price"]))
+            )
+
+    # ---------- 提醒数据 ----------
+
+    def load_reminders(self) -> Dict[str, Dict[str, Any]]:
+        """加载全部提醒,格式与 reminders.json 一致"""
+        with self._lock:
+            cursor = self._conn.execute("SELECT user_id, content, expire_time FROM reminders")
+            return {
+                user_id: {'content': content, 'expire_time': expire_time}
+                for user_id, content, expire_time in cursor
+            }
+
+    def save_reminder(self, user_id: str, reminder: Dict[str, Any]) -> None:
+        """保存单条提醒"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reminders (user_id, content, expire_time) VALUES (?, ?, ?)",
+                (user_id, reminder['content'], int(reminder['expire_time']))
+            )
+
+    def delete_reminder(self, user_id: str) -> None:
+        """删除单条提醒"""
+        with self._lock:
+            self._conn.execute("DELETE FROM reminders WHERE user_id = ?", (user_id,))
+
+    # ---------- 数据导入 ----------
+
+    def import_legacy_files(self, player_file: str, properties_file: str, reminders_file: str) -> bool:
+        """从 players.csv / properties.json / reminders.json 一次性导入数据
+
+        导入完成后在 meta 表中记录标记,之后不再重复导入。
+
+        Returns:
+            bool: 本次是否执行了导入
+        """
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+                return False
+
+            # 只读取玩家数据,不在 players.csv 旁边生成快照信息等文件
+            players = CsvPlayerStorage(player_file, self.standard_fields).read_records()
+            properties = JsonPropertyStorage(properties_file).load_properties()
+            reminders = self._read_json(reminders_file)
+
+            self._conn.execute("BEGIN")
+            try:
+                for record in players.values():
+                    self.insert(record)
+                for position, data in properties.items():
+                    self.save_property(int(position), data)
+                for user_id, reminder in reminders.items():
+                    self.save_reminder(user_id, reminder)
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', '1')")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            logger.info(
+                f"已导入旧数据: {len(players)} 名玩家, {len(properties)} 块地产, {len(reminders)} 条提醒"
+            )
+            return True
+
+    @staticmethod
+    def _read_json(file_path: str) -> dict:
+        """读取旧的 JSON 数据文件,不存在时返回空字典"""
+        if not os.path.exists(file_path):
+            return {}
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
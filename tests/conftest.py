@@ -0,0 +1,69 @@
+"""测试公共工具
+
+插件目录本身是一个包,缺少 chatgpt-on-wechat 框架时只导入不依赖框架的模块,
+在插件目录或 tests 目录下运行 python -m pytest 均可。
+"""
+import importlib.util
+import itertools
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_counter = itertools.count()
+
+
+def load_module(name):
+    """直接按文件加载不依赖 chatgpt-on-wechat 框架的模块"""
+    spec = importlib.util.spec_from_file_location(f"game_{name}", os.path.join(ROOT, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def game(tmp_path):
+    """在临时目录中加载插件并创建 Game,数据文件写在临时目录下
+
+    需要在 chatgpt-on-wechat 环境中运行,缺少框架模块时跳过。
+    """
+    for module in ('common.log', 'plugins', 'bridge.context', 'bridge.reply', 'channel.chat_message'):
+        pytest.importorskip(module)
+    package = f"game_plugin_{next(_counter)}"
+    package_dir = tmp_path / package
+    package_dir.mkdir()
+    for filename in os.listdir(ROOT):
+        if filename.endswith('.py'):
+            shutil.copy(os.path.join(ROOT, filename), package_dir)
+    sys.path.insert(0, str(tmp_path))
+    try:
+        module = importlib.import_module(package)
+        instance = module.Game()
+        yield instance
+        instance.unload()
+    finally:
+        sys.path.remove(str(tmp_path))
+
+
+@pytest.fixture
+def say(game):
+    """以群聊消息的形式向插件发送命令,返回回复文本"""
+    from bridge.context import Context, ContextType
+    from channel.chat_message import ChatMessage
+    from plugins import EventContext
+
+    def send(user_id, nickname, text, room='room1'):
+        msg = ChatMessage(None)
+        msg.is_group = True
+        msg.actual_user_id = msg.from_user_id = user_id
+        msg.actual_user_nickname = msg.from_user_nickname = nickname
+        msg.other_user_id = room
+        context = Context(ContextType.TEXT, text, {'msg': msg})
+        e_context = EventContext(None, {'channel': None, 'context': context, 'reply': None})
+        game.on_handle_context(e_context)
+        reply = e_context['reply']
+        return reply.content if reply else None
+
+    return send
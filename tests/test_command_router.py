@@ -0,0 +1,25 @@
+from conftest import load_module
+
+CommandRouter = load_module('command_router').CommandRouter
+
+
+def _router():
+    router = CommandRouter()
+    router.register('购买', lambda user_id, args: (user_id, args), ('user_id', 'args'))
+    return router
+
+
+def test_match_splits_arguments_after_command():
+    command, args = _router().match('  购买  木制鱼竿 2 ')
+    assert command.name == '购买'
+    assert args == ['木制鱼竿', '2']
+    assert command({'user_id': 'u1', 'args': args}) == ('u1', ['木制鱼竿', '2'])
+    assert _router().match('购买')[1] == []
+
+
+def test_match_ignores_chatter():
+    router = _router()
+    assert router.match('') is None
+    assert router.match('   ') is None
+    assert router.match('今天 购买 了什么') is None
+    assert router.match('购买鱼竿') is None
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from conftest import load_module
+
+RollingEarnings = load_module('leaderboard').RollingEarnings
+
+
+def test_earnings_counted_only_after_commit(game, say):
+    say('u1', 'alice', '注册')
+    store = game.player_store
+
+    with pytest.raises(RuntimeError):
+        with store.unit_of_work():
+            game._record_earnings('u1', gold=100)
+            raise RuntimeError("命令中途出错")
+    assert game.earnings.score('today', 'u1') is None
+
+    with store.unit_of_work():
+        game._record_earnings('u1', gold=100, exp=5)
+        # 提交之前不计入
+        assert game.earnings.score('today', 'u1') is None
+    assert game.earnings.score('today', 'u1') == (100, 5)
+
+
+def test_earnings_saved_periodically(game, say):
+    say('u1', 'alice', '注册')
+    # 每次提交后都执行定期保存
+    game.player_store._flush_interval = 0
+    say('u1', 'alice', '签到')
+    with open(game.earnings_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    assert any('u1' in bucket for bucket in data.values())
+
+
+def test_rolling_earnings_rotate_by_day():
+    earnings = RollingEarnings(days=3)
+    earnings.add('u1', gold=100, day=10)
+    earnings.add('u2', gold=50, exp=5, day=11)
+    earnings.add('u1', gold=30, day=11)
+
+    assert earnings.top('today', day=11) == [('u2', (50, 5)), ('u1', (30, 0))]
+    assert earnings.score('today', 'u1') == (30, 0)
+    assert earnings.score('week', 'u1') == (130, 0)
+    assert earnings.rank('week', 'u2', day=11) == 2
+
+    # 新的一天今日排行清空,本周仍包含窗口内的收益
+    assert earnings.top('today', day=12) == []
+    assert earnings.top('week', day=12) == [('u1', (130, 0)), ('u2', (50, 5))]
+
+    # 第10天移出3天窗口,只减去那一天的收益
+    assert earnings.top('week', day=13) == [('u2', (50, 5)), ('u1', (30, 0))]
+    # 窗口内已没有收益的玩家从本周排行中移除
+    assert earnings.top('week', day=15) == []
+    assert earnings.rank('week', 'u1', day=15) is None
+
+
+def test_rolling_earnings_ignore_losses_and_past_days():
+    earnings = RollingEarnings(days=7)
+    earnings.add('u1', gold=-100, day=20)
+    assert earnings.top('week', day=20) == []
+    earnings.add('u1', gold=10, day=20)
+    # 早于当前日期的收益计入当前桶
+    earnings.add('u1', gold=5, day=19)
+    assert earnings.score('today', 'u1') == (15, 0)
+
+
+def test_rolling_earnings_round_trip(monkeypatch):
+    monkeypatch.setattr(RollingEarnings, '_today', staticmethod(lambda: 100))
+    earnings = RollingEarnings(days=7)
+    earnings.add('u1', gold=10, exp=1, day=93)
+    earnings.add('u1', gold=20, day=94)
+    earnings.add('u2', exp=7, day=100)
+
+    restored = RollingEarnings.from_dict(json.loads(json.dumps(earnings.to_dict())))
+    # 第93天已在7天窗口之外
+    assert restored.top('week') == [('u1', (20, 0)), ('u2', (0, 7))]
+    assert restored.top('today') == [('u2', (0, 7))]
@@ -0,0 +1,120 @@
+import datetime
+import random
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def alias_sampler(game):
+    return sys.modules[type(game.fishing_system).__module__].AliasSampler
+
+
+def _table_probabilities(sampler):
+    """由别名表算出每个下标被抽中的精确概率"""
+    n = len(sampler.values)
+    probabilities = [0.0] * n
+    for i in range(n):
+        probabilities[i] += sampler._prob[i] / n
+        probabilities[sampler._alias[i]] += (1 - sampler._prob[i]) / n
+    return probabilities
+
+
+@pytest.mark.parametrize('weights', [[1, 1, 1], [5, 1, 1, 3], [0.5, 0.25, 0.125, 0.1, 0.025], [1, 0, 3]])
+def test_alias_table_matches_weights(alias_sampler, weights):
+    sampler = alias_sampler(list(range(len(weights))), weights)
+    total = sum(weights)
+    assert _table_probabilities(sampler) == pytest.approx([w / total for w in weights])
+
+
+def test_samples_follow_weights(alias_sampler):
+    sampler = alias_sampler(['a', 'b', 'c'], [6, 3, 1])
+    rng = random.Random(42)
+    draws = 20000
+    counts = {'a': 0, 'b': 0, 'c': 0}
+    for _ in range(draws):
+        counts[sampler.sample(rng)] += 1
+    assert counts['a'] / draws == pytest.approx(0.6, abs=0.02)
+    assert counts['b'] / draws == pytest.approx(0.3, abs=0.02)
+    assert counts['c'] / draws == pytest.approx(0.1, abs=0.02)
+
+
+def test_invalid_weights_are_rejected(alias_sampler):
+    with pytest.raises(ValueError):
+        alias_sampler([], [])
+    with pytest.raises(ValueError):
+        alias_sampler(['a'], [0])
+
+
+def test_fish_sampler_weights_by_rarity(game):
+    fishing = game.fishing_system
+    sampler = fishing._get_fish_sampler()
+    # 物品目录未变化时复用同一个抽样器
+    assert fishing._get_fish_sampler() is sampler
+    weights = [1 / (fish['rarity'] or 1) for fish in sampler.values]
+    total = sum(weights)
+    assert _table_probabilities(sampler) == pytest.approx([w / total for w in weights])
+
+
+@pytest.fixture
+def angler(game, say, monkeypatch):
+    """注册一名带木制鱼竿的玩家,每次钓鱼都落空并消耗1点耐久,返回设置耐久度的函数"""
+    say('u1', 'alice', '注册')
+    random_module = sys.modules[type(game.fishing_system).__module__].random
+    monkeypatch.setattr(random_module, 'random', lambda: 0.99)
+    monkeypatch.setattr(random_module, 'randint', lambda a, b: a)
+
+    def equip(durability):
+        inventory = game.get_player('u1').inventory
+        inventory.add('木制鱼竿', 1)
+        game._update_player_data('u1', {
+            'inventory': inventory,
+            'rod_durability': {'木制鱼竿': durability},
+            'last_fishing': '',
+        })
+
+    return equip
+
+
+def _last_fishing(game):
+    return datetime.datetime.strptime(game.get_player('u1').last_fishing, '%Y-%m-%d %H:%M:%S')
+
+
+@pytest.mark.parametrize('text', ['钓鱼 0', '钓鱼 11', '钓鱼 abc'])
+def test_bulk_fishing_rejects_bad_cast_count(game, say, angler, text):
+    angler(100)
+    assert game.MAX_FISHING_CASTS == 10
+    reply = say('u1', 'alice', text)
+    assert '1' in reply and '10' in reply
+    # 参数错误时不消耗耐久也不进入冷却
+    player = game.get_player('u1')
+    assert (player.rod_durability['木制鱼竿'], player.last_fishing) == (100, '')
+
+
+def test_bulk_fishing_stops_when_rod_breaks(game, say, angler):
+    angler(4)
+    reply = say('u1', 'alice', '钓鱼 10')
+    assert reply.startswith('🎣 连续钓鱼 4 次')
+    assert '已从背包移除' in reply
+    player = game.get_player('u1')
+    assert '木制鱼竿' not in player.inventory
+    assert '木制鱼竿' not in player.rod_durability
+
+
+def test_bulk_fishing_pushes_cooldown_by_cast_count(game, say, angler):
+    angler(100)
+    started = datetime.datetime.now().replace(microsecond=0)
+    assert say('u1', 'alice', '钓鱼 5').startswith('🎣 连续钓鱼 5 次')
+    assert game.get_player('u1').rod_durability['木制鱼竿'] == 95
+    # 5 次按 5 个冷却周期计算: 上次钓鱼时间推后 4 个 3 分钟
+    offset = _last_fishing(game) - started
+    assert datetime.timedelta(minutes=12) <= offset <= datetime.timedelta(minutes=12, seconds=5)
+    remaining = int(say('u1', 'alice', '钓鱼').split('还需等待 ')[1].split(' 秒')[0])
+    assert 14 * 60 < remaining <= 15 * 60
+
+
+def test_single_cast_uses_plain_cooldown(game, say, angler):
+    angler(100)
+    started = datetime.datetime.now().replace(microsecond=0)
+    say('u1', 'alice', '钓鱼')
+    assert datetime.timedelta(0) <= _last_fishing(game) - started <= datetime.timedelta(seconds=5)
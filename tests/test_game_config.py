@@ -0,0 +1,17 @@
+import pytest
+
+from conftest import load_module
+
+pytest.importorskip('common.log')
+game_config = load_module('game_config')
+
+
+def test_invalid_config_falls_back_to_defaults(tmp_path):
+    config_file = tmp_path / 'config.json'
+    config_file.write_text('{"admins": ["alice"],}', encoding='utf-8')
+    service = game_config.ConfigService(str(config_file))
+    assert service.config.admins == frozenset(game_config.ConfigService.DEFAULT_CONFIG['admins'])
+
+    config_file.write_text('{"admins": ["alice"]}', encoding='utf-8')
+    assert service.reload()
+    assert service.is_admin('alice')
@@ -0,0 +1,45 @@
+import pytest
+
+from conftest import load_module
+
+Inventory = load_module('inventory').Inventory
+
+
+@pytest.mark.parametrize('amount', [0, -3])
+def test_add_rejects_non_positive_amount(amount):
+    inventory = Inventory({'面包': 2})
+    with pytest.raises(ValueError):
+        inventory.add('面包', amount)
+    assert inventory == {'面包': 2}
+
+
+@pytest.mark.parametrize('amount', [0, -3])
+def test_remove_rejects_non_positive_amount(amount):
+    inventory = Inventory({'面包': 2})
+    with pytest.raises(ValueError):
+        inventory.remove('面包', amount)
+    assert inventory == {'面包': 2}
+
+
+def test_remove_insufficient_keeps_inventory():
+    inventory = Inventory({'面包': 2})
+    with pytest.raises(ValueError):
+        inventory.remove('面包', 3)
+    inventory.remove('面包', 2)
+    assert '面包' not in inventory
+
+
+def test_decode_skips_non_positive_counts():
+    assert Inventory.decode('{"面包": 2, "木剑": 0, "铁剑": -1}') == {'面包': 2}
+
+
+@pytest.mark.parametrize('amount', ['0', '-3'])
+def test_sell_rejects_non_positive_amount(game, say, amount):
+    say('u1', 'alice', '注册')
+    gold = game.get_player('u1').gold
+    item_name = next(iter(game.item_system.get_all_items()))
+    reply = say('u1', 'alice', f'出售 {item_name} {amount}')
+    assert reply.startswith('出售数量必须大于0')
+    player = game.get_player('u1')
+    assert player.gold == gold
+    assert player.inventory.count(item_name) == 0
@@ -0,0 +1,93 @@
+import json
+
+from conftest import load_module
+
+RankIndex = load_module('leaderboard').RankIndex
+
+
+def test_update_keeps_order_and_ranks():
+    index = RankIndex()
+    for user_id, score in [('a', 10), ('b', 30), ('c', 20)]:
+        index.update(user_id, score)
+    assert index.top(2) == [('b', 30), ('c', 20)]
+    assert [index.rank(user_id) for user_id in 'abc'] == [3, 1, 2]
+
+    # 分数变化后移动到新位置,不留下旧条目
+    index.update('a', 40)
+    assert index.top(10) == [('a', 40), ('b', 30), ('c', 20)]
+    assert len(index) == 3
+    assert index.rank('a') == 1 and index.rank('c') == 3
+
+
+def test_ties_are_ordered_by_user_id():
+    index = RankIndex()
+    for user_id in ('u3', 'u1', 'u2'):
+        index.update(user_id, 5)
+    assert [user_id for user_id, _ in index.top(3)] == ['u1', 'u2', 'u3']
+    assert index.rank('u2') == 2
+
+
+def test_tuple_scores_compare_field_by_field():
+    index = RankIndex()
+    index.update('a', (2, 10))
+    index.update('b', (3, 0))
+    index.update('c', (2, 50))
+    assert [user_id for user_id, _ in index.top(3)] == ['b', 'c', 'a']
+    assert index.score('c') == (2, 50)
+
+
+def test_remove_and_missing_players():
+    index = RankIndex()
+    index.update('a', 1)
+    index.update('b', 2)
+    index.remove('b')
+    index.remove('missing')
+    assert index.top(10) == [('a', 1)]
+    assert 'b' not in index
+    assert index.rank('b') is None
+    assert index.score('b') is None
+
+
+def test_player_store_rankings_follow_updates(game, say):
+    for user_id, nickname in [('u1', 'alice'), ('u2', 'bob'), ('u3', 'carol')]:
+        say(user_id, nickname, '注册')
+    game._update_player_data('u1', {'gold': 500})
+    game._update_player_data('u2', {'gold': 900})
+    game._update_player_data('u3', {'gold': 0, 'level': 3, 'exp': 10})
+    store = game.player_store
+
+    assert [record['user_id'] for record in store.top('gold', 2)] == ['u2', 'u1']
+    assert store.rank('level', 'u3') == 1
+
+    game._update_player_data('u1', {'gold': 1000})
+    assert store.top('gold', 1)[0]['user_id'] == 'u1'
+    assert store.rank('gold', 'u2') == 2
+    assert store.rank('gold', 'missing') is None
+
+
+def _ranked_names(reply):
+    """从排行榜回复中按顺序取出昵称"""
+    return [line.split(' ', 1)[1].split(':')[0] for line in reply.splitlines()[2:] if ':' in line]
+
+
+def test_group_leaderboard_only_ranks_group_members(game, say):
+    say('u1', 'alice', '注册', room='room1')
+    say('u2', 'bob', '注册', room='room1')
+    say('u3', 'carol', '注册', room='room2')
+    game._update_player_data('u1', {'gold': 100})
+    game._update_player_data('u2', {'gold': 300})
+    game._update_player_data('u3', {'gold': 999})
+
+    reply = say('u1', 'alice', '排行榜', room='room1')
+    assert reply.startswith('本群金币排行榜')
+    assert _ranked_names(reply) == ['bob', 'alice']
+    assert _ranked_names(say('u3', 'carol', '排行榜', room='room2')) == ['carol']
+
+    # 已建立的本群索引随玩家加入和金币变化更新
+    say('u3', 'carol', '状态', room='room1')
+    assert game.player_store.group_members('room1') == {'u1', 'u2', 'u3'}
+    assert _ranked_names(say('u1', 'alice', '排行榜', room='room1')) == ['carol', 'bob', 'alice']
+    game._update_player_data('u1', {'gold': 5000})
+    assert _ranked_names(say('u1', 'alice', '排行榜', room='room1')) == ['alice', 'carol', 'bob']
+    with open(game.groups_file, 'r', encoding='utf-8') as f:
+        assert sorted(json.load(f)['room1']) == ['u1', 'u2', 'u3']
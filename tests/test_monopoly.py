@@ -0,0 +1,140 @@
+import json
+import os
+
+
+PURCHASABLE_TYPES = ('空地', '直辖市', '省会', '地级市', '县城', '乡村')
+
+
+def test_bought_property_rent_uses_table(game, say, monkeypatch):
+    say('u1', 'alice', '注册')
+    monopoly = game.monopoly
+    positions = [
+        position for position in range(monopoly.total_blocks)
+        if monopoly.get_block_info(position)['type'] in PURCHASABLE_TYPES
+    ]
+    assert positions
+
+    for position in positions:
+        game._update_player_data('u1', {'gold': 10 ** 9, 'position': position})
+        assert say('u1', 'alice', '购买地块').startswith('🎉 成功购买地块')
+        assert monopoly.get_property_owner(position)['price'] == monopoly.get_purchase_price(position)
+
+    # 按游戏价格购买的地产不应再走公式计算
+    def fail(*args):
+        raise AssertionError("租金没有命中预先计算的租金表")
+    monkeypatch.setattr(monopoly, '_compute_rent', fail)
+    for position in positions:
+        assert monopoly.calculate_rent(position) == monopoly.rent_table[position][1]
+    assert say('u1', 'alice', '升级地块').startswith('🏗️ 地产升级成功')
+    assert monopoly.calculate_rent(positions[-1]) == monopoly.rent_table[positions[-1]][2]
+
+
+def test_buy_property_charges_purchase_price(game, say):
+    say('u1', 'alice', '注册')
+    # 上海: 直辖市基础价格 2000,位于第 12 格,距离系数 1.2
+    game._update_player_data('u1', {'gold': 10000, 'position': 12})
+    assert say('u1', 'alice', '购买地块').startswith('🎉 成功购买地块')
+    assert game.get_player('u1').gold == 10000 - 2400
+    assert game.monopoly.get_property_owner(12)['price'] == 2400
+
+
+def _reload(monopoly):
+    """以同一数据目录创建新的 MonopolySystem,相当于重新启动后加载地产"""
+    return type(monopoly)(monopoly.data_dir)
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_properties_journal_replayed_on_reload(game):
+    monopoly = game.monopoly
+    assert monopoly.buy_property(2, 'u1', 500)
+    assert monopoly.buy_property(5, 'u2', 1500)
+    assert monopoly.buy_property(7, 'u1', 1000)
+    assert not monopoly.buy_property(7, 'u2', 1000)
+    assert monopoly.upgrade_property(7)
+
+    storage = monopoly.property_storage
+    # 快照未改写,每次变更追加一行完整的地块数据
+    assert _read_json(monopoly.properties_file) == {}
+    with open(storage.journal_file, 'r', encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry['position'] for entry in entries] == [2, 5, 7, 7]
+    assert entries[-1]['data'] == {'owner': 'u1', 'level': 2, 'price': 1000}
+
+    reloaded = _reload(monopoly)
+    assert reloaded.get_player_properties('u1') == [2, 7]
+    assert reloaded.get_player_properties('u2') == [5]
+    assert reloaded.get_property_owner(7) == {'owner': 'u1', 'level': 2, 'price': 1000}
+
+
+def test_properties_journal_compacts_into_snapshot(game, monkeypatch):
+    monopoly = game.monopoly
+    storage = monopoly.property_storage
+    monkeypatch.setattr(type(storage), 'COMPACT_MIN_ENTRIES', 3)
+    monopoly.buy_property(2, 'u1', 500)
+    monopoly.buy_property(3, 'u2', 500)
+    assert os.path.exists(storage.journal_file)
+    monopoly.upgrade_property(2)
+
+    # 第3条日志触发压缩: 快照包含全部地产,日志和临时文件都已删除
+    assert not os.path.exists(storage.journal_file)
+    assert not os.path.exists(monopoly.properties_file + '.tmp')
+    assert _read_json(monopoly.properties_file) == {
+        '2': {'owner': 'u1', 'level': 2, 'price': 500},
+        '3': {'owner': 'u2', 'level': 1, 'price': 500},
+    }
+
+    monopoly.buy_property(10, 'u1', 300)
+    reloaded = _reload(monopoly)
+    assert reloaded.get_player_properties('u1') == [2, 10]
+    assert reloaded.get_player_properties('u2') == [3]
+
+
+def test_torn_properties_journal_line_is_ignored(game):
+    monopoly = game.monopoly
+    monopoly.buy_property(2, 'u1', 500)
+    with open(monopoly.property_storage.journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"position": 3, "data": {"own')
+
+    reloaded = _reload(monopoly)
+    assert reloaded.get_player_properties('u1') == [2]
+    assert reloaded.get_property_owner(3) is None
+    # 不完整的日志已压缩进快照
+    assert not os.path.exists(reloaded.property_storage.journal_file)
+    assert set(_read_json(reloaded.properties_file)) == {'2'}
+
+
+def test_map_render_is_rebuilt_after_buy_and_upgrade(game, say, monkeypatch):
+    say('u1', 'alice', '注册')
+    renders = []
+    render_map = game._render_map
+
+    def counting_render_map():
+        renders.append(1)
+        return render_map()
+
+    monkeypatch.setattr(game, '_render_map', counting_render_map)
+
+    def plot_line():
+        lines = say('u1', 'alice', '地图').splitlines()
+        return next(line for line in lines if ' 2:' in line)
+
+    assert plot_line() == '🏘️ 2:周庄古镇'
+    assert plot_line() == '🏘️ 2:周庄古镇'
+    # 地图和地产都没有变化时复用缓存
+    assert len(renders) == 1
+
+    game._update_player_data('u1', {'gold': 10 ** 6, 'position': 2})
+    assert say('u1', 'alice', '购买地块').startswith('🎉 成功购买地块')
+    game._update_player_data('u1', {'position': 0})
+    assert plot_line() == '🏠 2:周庄古镇(alice)'
+    assert len(renders) == 2
+
+    game._update_player_data('u1', {'position': 2})
+    assert say('u1', 'alice', '升级地块').startswith('🏗️ 地产升级成功')
+    game._update_player_data('u1', {'position': 0})
+    assert not plot_line().startswith('🏠')
+    assert len(renders) == 3
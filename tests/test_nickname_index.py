@@ -0,0 +1,33 @@
+def test_duplicate_nicknames_resolve_to_earliest_player(game, say):
+    for user_id in ('u2', 'u1', 'u3'):
+        say(user_id, 'alice', '注册')
+    store = game.player_store
+
+    assert store.get_ids_by_nickname('alice') == ['u2', 'u1', 'u3']
+    assert store.get_by_nickname('alice')['user_id'] == 'u2'
+    assert game.get_player_by_nickname('alice').user_id == 'u2'
+    assert store.get_ids_by_nickname('nobody') == []
+    assert store.get_by_nickname('nobody') is None
+
+    # 重新加载后仍按注册顺序排列
+    game.unload()
+    restarted = type(game)()
+    try:
+        assert restarted.player_store.get_ids_by_nickname('alice') == ['u2', 'u1', 'u3']
+    finally:
+        restarted.unload()
+
+
+def test_nickname_change_updates_index(game, say):
+    say('u1', 'alice', '注册')
+    say('u2', 'alice', '注册')
+    store = game.player_store
+
+    game._update_player_data('u1', {'nickname': 'alicia'})
+    assert store.get_ids_by_nickname('alice') == ['u2']
+    assert store.get_ids_by_nickname('alicia') == ['u1']
+    assert store.get_by_nickname('alice')['user_id'] == 'u2'
+
+    game._update_player_data('u2', {'nickname': 'bob'})
+    assert store.get_ids_by_nickname('alice') == []
+    assert store.get_by_nickname('bob')['user_id'] == 'u2'
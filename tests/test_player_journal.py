@@ -0,0 +1,128 @@
+import csv
+import os
+import threading
+
+import pytest
+
+from conftest import load_module
+
+pytest.importorskip('common.log')
+storage = load_module('storage')
+
+FIELDS = ['user_id', 'nickname', 'gold']
+
+
+def _open(tmp_path):
+    player_file = tmp_path / 'players.csv'
+    if not player_file.exists():
+        player_file.write_text(','.join(FIELDS) + '\n', encoding='utf-8')
+    return storage.CsvPlayerStorage(str(player_file), FIELDS)
+
+
+def _register(store, *user_ids):
+    store.write_batch([({'user_id': uid, 'nickname': uid, 'gold': '0'}, None) for uid in user_ids])
+
+
+def _snapshot_rows(tmp_path):
+    with open(tmp_path / 'players.csv', 'r', encoding='utf-8', newline='') as f:
+        return {row['user_id']: row for row in csv.DictReader(f)}
+
+
+def test_journal_is_replayed_on_load(tmp_path):
+    store = _open(tmp_path)
+    store.load()
+    _register(store, 'u1', 'u2')
+    store.write_batch([({'user_id': 'u1'}, {'gold': '10'}), ({'user_id': 'u1'}, {'gold': '20'})])
+
+    # 快照没有被改写,修改都在日志中
+    assert _snapshot_rows(tmp_path) == {}
+    records = _open(tmp_path).load()
+    assert records['u1']['gold'] == '20'
+    assert records['u2'] == {'user_id': 'u2', 'nickname': 'u2', 'gold': '0'}
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    store = _open(tmp_path)
+    store.load()
+    _register(store, 'u1')
+    store.write_batch([({'user_id': 'u1'}, {'gold': '10'})])
+    with open(store.journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"seq": 3, "user_id": "u1", "upd')
+
+    reopened = _open(tmp_path)
+    assert reopened.load()['u1']['gold'] == '10'
+    # 不完整的日志已写入快照并清空,之后追加的条目不会跟在半行后面
+    assert not os.path.exists(reopened.journal_file)
+    assert _snapshot_rows(tmp_path)['u1']['gold'] == '10'
+    reopened.write_batch([({'user_id': 'u1'}, {'gold': '30'})])
+    assert _open(tmp_path).load()['u1']['gold'] == '30'
+
+
+def test_writes_during_compaction_are_kept(tmp_path, monkeypatch):
+    store = _open(tmp_path)
+    store.load()
+    _register(store, 'u1', 'u2')
+    records = _open(tmp_path).load()
+
+    started, release = threading.Event(), threading.Event()
+    write_snapshot = store._write_snapshot
+
+    def slow_write_snapshot(rows, seq):
+        started.set()
+        release.wait(5)
+        write_snapshot(rows, seq)
+
+    monkeypatch.setattr(store, '_write_snapshot', slow_write_snapshot)
+    store.compact(records.values())
+    started.wait(5)
+    # 后台写快照期间继续写入新日志,也不会再次触发压缩
+    store.write_batch([({'user_id': 'u2'}, {'gold': '50'})])
+    assert not store.needs_compaction(0)
+    assert os.path.exists(store.old_journal_file)
+    release.set()
+    store.close()
+
+    assert not os.path.exists(store.old_journal_file)
+    assert set(_snapshot_rows(tmp_path)) == {'u1', 'u2'}
+    records = _open(tmp_path).load()
+    assert records['u2']['gold'] == '50'
+
+
+def test_interrupted_compaction_replays_old_journal(tmp_path):
+    store = _open(tmp_path)
+    store.load()
+    _register(store, 'u1')
+    # 模拟压缩时轮换出旧日志后、写出快照前退出
+    os.replace(store.journal_file, store.old_journal_file)
+    store.write_batch([({'user_id': 'u1'}, {'gold': '5'})])
+
+    reopened = _open(tmp_path)
+    assert reopened.load()['u1']['gold'] == '5'
+    assert not os.path.exists(reopened.old_journal_file)
+    assert _snapshot_rows(tmp_path)['u1']['gold'] == '5'
+
+
+def test_manual_edit_is_detected_and_merged(tmp_path):
+    store = _open(tmp_path)
+    store.load()
+    _register(store, 'u1', 'u2')
+    records = _open(tmp_path).load()
+    store.compact(records.values())
+    store.close()
+    store.write_batch([({'user_id': 'u2'}, {'gold': '70'})])
+    signature = store.signature()
+
+    rows = _snapshot_rows(tmp_path)
+    rows['u1']['gold'] = '999'
+    with open(store.player_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows.values())
+    assert store.signature() != signature
+
+    records = store.load()
+    assert (records['u1']['gold'], records['u2']['gold']) == ('999', '70')
+    # 合并后立即写出新快照,重新启动时不再当作手动修改
+    assert _snapshot_rows(tmp_path)['u2']['gold'] == '70'
+    records = _open(tmp_path).load()
+    assert (records['u1']['gold'], records['u2']['gold']) == ('999', '70')
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from conftest import load_module
+
+player_lock = load_module('player_lock')
+
+
+def _ordered_keys(locks):
+    """两个落在不同锁上的玩家,按锁编号从小到大返回"""
+    first = 'u1'
+    second = next(f'u{i}' for i in range(2, 1000) if locks._stripe(f'u{i}') != locks._stripe(first))
+    return tuple(sorted((first, second), key=locks._stripe))
+
+
+def test_non_blocking_run_raises_when_player_is_locked():
+    locks = player_lock.PlayerLockManager()
+    entered, release = threading.Event(), threading.Event()
+
+    def busy():
+        locks.run(('u1',), lambda: (entered.set(), release.wait(5)))
+
+    worker = threading.Thread(target=busy)
+    worker.start()
+    entered.wait(5)
+    try:
+        calls = []
+        with pytest.raises(player_lock.PlayerLockBusy):
+            locks.run(('u1',), lambda: calls.append(1), blocking=False)
+        assert calls == []
+    finally:
+        release.set()
+        worker.join()
+    assert locks.run(('u1',), lambda: 'done', blocking=False) == 'done'
+
+
+def test_non_blocking_run_raises_when_added_player_is_locked():
+    locks = player_lock.PlayerLockManager()
+    # 目标玩家的锁编号比当前玩家大,追加加锁时走按顺序等待的分支
+    first, second = _ordered_keys(locks)
+    entered, release = threading.Event(), threading.Event()
+
+    def busy():
+        locks.run((second,), lambda: (entered.set(), release.wait(5)))
+
+    worker = threading.Thread(target=busy)
+    worker.start()
+    entered.wait(5)
+    try:
+        calls = []
+
+        def give():
+            calls.append('start')
+            locks.acquire(second)
+            calls.append('locked')
+
+        started = time.monotonic()
+        with pytest.raises(player_lock.PlayerLockBusy):
+            locks.run((first,), give, blocking=False)
+        assert time.monotonic() - started < 1
+        assert calls == ['start']
+        # 失败后当前玩家的锁已释放
+        assert locks.run((first,), lambda: 'free', blocking=False) == 'free'
+    finally:
+        release.set()
+        worker.join()
+    assert locks.run((first,), give, blocking=False) is None
+    assert calls[-1] == 'locked'
+
+
+def test_kept_value_survives_lock_order_retry():
+    locks = player_lock.PlayerLockManager()
+    # 目标玩家的锁编号比当前玩家小,追加加锁只能尝试,被占用时 run 重新执行命令
+    target, current = _ordered_keys(locks)
+    entered = threading.Event()
+
+    def busy():
+        locks.run((target,), lambda: (entered.set(), time.sleep(0.2)))
+
+    worker = threading.Thread(target=busy)
+    worker.start()
+    entered.wait(5)
+    rolls = iter([3, 5])
+    seen = []
+
+    def go_out():
+        seen.append(locks.keep('dice', lambda: next(rolls)))
+        locks.acquire(target)
+        return seen[-1]
+
+    try:
+        assert locks.run((current,), go_out) == 3
+    finally:
+        worker.join()
+    # 重新执行了一次,两次都使用第一次掷出的点数
+    assert seen == [3, 3]
+    assert locks.keep('dice', lambda: 6) == 6
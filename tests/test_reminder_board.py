@@ -0,0 +1,62 @@
+from conftest import load_module
+
+ReminderBoard = load_module('reminder_board').ReminderBoard
+
+NAMES = {'u1': 'alice', 'u2': 'bob'}
+
+
+def _board(reminders=None):
+    lookups = []
+
+    def resolve_names(user_ids):
+        lookups.append(list(user_ids))
+        return {user_id: NAMES[user_id] for user_id in user_ids if user_id in NAMES}
+
+    return ReminderBoard(reminders if reminders is not None else {}, resolve_names), lookups
+
+
+def test_banner_is_cached_until_reminders_change():
+    board, lookups = _board({'u1': {'content': '开会', 'expire_time': 100}})
+    assert board.banner() == '[alice]: 开会'
+    assert board.banner() == '[alice]: 开会'
+    assert len(lookups) == 1
+
+    board.set('u2', '吃饭', 200)
+    assert board.banner() == '[alice]: 开会\n[bob]: 吃饭'
+    assert len(lookups) == 2
+
+
+def test_expired_reminder_is_dropped_from_banner():
+    board, lookups = _board()
+    board.set('u1', '开会', 100)
+    board.set('u2', '吃饭', 200)
+    assert board.banner() == '[alice]: 开会\n[bob]: 吃饭'
+
+    assert board.expire(now=99) == []
+    assert board.banner() == '[alice]: 开会\n[bob]: 吃饭'
+    assert len(lookups) == 1
+
+    assert board.expire(now=150) == ['u1']
+    assert board.banner() == '[bob]: 吃饭'
+    assert board.expire(now=300) == ['u2']
+    assert board.banner() == ''
+
+
+def test_removed_reminder_is_dropped_from_banner():
+    board, _ = _board()
+    board.set('u1', '开会', 100)
+    assert board.banner() == '[alice]: 开会'
+    assert board.remove('u1')
+    assert not board.remove('u1')
+    assert board.banner() == ''
+
+
+def test_overwritten_reminder_keeps_new_expiry():
+    board, _ = _board()
+    board.set('u1', '开会', 100)
+    board.set('u1', '改期', 500)
+    # 旧的过期时间不会删除覆盖后的提醒
+    assert board.expire(now=200) == []
+    assert board.banner() == '[alice]: 改期'
+    assert board.expire(now=500) == ['u1']
+    assert board.banner() == ''
@@ -0,0 +1,64 @@
+import datetime
+import threading
+import time
+
+import pytest
+
+from conftest import load_module
+
+pytest.importorskip('common.log')
+TaskScheduler = load_module('scheduler').TaskScheduler
+
+
+def _scheduler(tasks):
+    fired, changes = [], []
+    scheduler = TaskScheduler(tasks, fired.append, lambda: changes.append(1))
+    return scheduler, fired, changes
+
+
+def test_run_due_fires_in_time_order_and_drops_one_shot_tasks():
+    scheduler, fired, changes = _scheduler({
+        'late': {'action': 'start', 'time': 200.0, 'is_daily': False},
+        'early': {'action': 'stop', 'time': 100.0, 'is_daily': False},
+        'future': {'action': 'start', 'time': 900.0, 'is_daily': False},
+    })
+    assert scheduler.run_due(now=500.0) == 2
+    assert [task['action'] for task in fired] == ['stop', 'start']
+    assert set(scheduler.tasks()) == {'future'}
+    assert changes == [1]
+    assert scheduler.run_due(now=500.0) == 0
+
+
+def test_daily_task_moves_to_next_day_once():
+    start = datetime.datetime(2024, 1, 1, 8, 0).timestamp()
+    scheduler, fired, _ = _scheduler({'daily': {'action': 'start', 'time': start, 'is_daily': True}})
+    # 停机三天后只补执行一次,下一次执行时间在当前时间之后的同一时刻
+    now = datetime.datetime(2024, 1, 4, 9, 0).timestamp()
+    assert scheduler.run_due(now=now) == 1
+    assert len(fired) == 1
+    assert scheduler.tasks()['daily']['time'] == datetime.datetime(2024, 1, 5, 8, 0).timestamp()
+    assert scheduler.run_due(now=now) == 0
+
+
+def test_replaced_and_removed_tasks_do_not_fire():
+    scheduler, fired, _ = _scheduler({'t': {'action': 'start', 'time': 100.0, 'is_daily': False}})
+    scheduler.add('t', {'action': 'stop', 'time': 300.0, 'is_daily': False})
+    scheduler.add('gone', {'action': 'start', 'time': 100.0, 'is_daily': False})
+    assert scheduler.remove('gone')
+    assert not scheduler.remove('gone')
+    # 覆盖前的堆元素已过期,不会按旧时间执行
+    assert scheduler.run_due(now=200.0) == 0
+    assert scheduler.run_due(now=300.0) == 1
+    assert fired == [{'action': 'stop', 'time': 300.0, 'is_daily': False}]
+
+
+def test_background_thread_fires_added_task():
+    fired = threading.Event()
+    scheduler = TaskScheduler({}, lambda task: fired.set(), lambda: None)
+    scheduler.start()
+    try:
+        scheduler.add('soon', {'action': 'start', 'time': time.time() + 0.1, 'is_daily': False})
+        assert fired.wait(5)
+        assert len(scheduler) == 0
+    finally:
+        scheduler.close()
@@ -0,0 +1,108 @@
+import csv
+import json
+
+import pytest
+
+from conftest import load_module
+
+pytest.importorskip('common.log')
+storage = load_module('storage')
+
+FIELDS = ['user_id', 'nickname', 'gold']
+
+
+def _data_files(directory):
+    """数据库文件以外的文件名"""
+    return sorted(path.name for path in directory.iterdir() if not path.name.startswith('game.db'))
+
+
+@pytest.fixture
+def db(tmp_path):
+    instance = storage.SqliteStorage(str(tmp_path / 'game.db'), FIELDS)
+    yield instance
+    instance.close()
+
+
+def test_players_round_trip(tmp_path, db):
+    db.write_batch([({'user_id': 'u1', 'nickname': 'alice', 'gold': '10'}, None)])
+    db.write_batch([({'user_id': 'u1'}, {'gold': '25', 'unknown': 'x'})])
+    assert db.load() == {'u1': {'user_id': 'u1', 'nickname': 'alice', 'gold': '25'}}
+
+    # 其他连接的修改会改变签名
+    signature = db.signature()
+    other = storage.SqliteStorage(str(tmp_path / 'game.db'), FIELDS)
+    try:
+        other.write_batch([({'user_id': 'u2', 'nickname': 'bob', 'gold': '0'}, None)])
+    finally:
+        other.close()
+    assert db.signature() != signature
+    assert set(db.load()) == {'u1', 'u2'}
+
+
+def test_new_fields_are_added_to_existing_table(tmp_path, db):
+    db.write_batch([({'user_id': 'u1', 'nickname': 'alice', 'gold': '10'}, None)])
+    db.close()
+    reopened = storage.SqliteStorage(str(tmp_path / 'game.db'), FIELDS + ['exp'])
+    try:
+        assert reopened.load()['u1']['exp'] == ''
+    finally:
+        reopened.close()
+
+
+def test_properties_and_reminders_round_trip(db):
+    db.save_property(3, {'owner': 'u1', 'level': 1, 'price': 500})
+    db.save_property(3, {'owner': 'u1', 'level': 2, 'price': 500})
+    assert db.load_properties() == {'3': {'owner': 'u1', 'level': 2, 'price': 500}}
+
+    db.save_reminder('u1', {'content': '开会', 'expire_time': 123})
+    assert db.load_reminders() == {'u1': {'content': '开会', 'expire_time': 123}}
+    db.delete_reminder('u1')
+    assert db.load_reminders() == {}
+
+
+def test_import_legacy_files_once(tmp_path, db):
+    player_file = tmp_path / 'players.csv'
+    with open(player_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        writer.writerow(['u1', 'alice', '10'])
+    properties_file = tmp_path / 'properties.json'
+    properties_file.write_text(json.dumps({'5': {'owner': 'u1', 'level': 1, 'price': 300}}), encoding='utf-8')
+    reminders_file = tmp_path / 'reminders.json'
+    reminders_file.write_text(json.dumps({'u1': {'content': '你好', 'expire_time': 99}}), encoding='utf-8')
+
+    assert db.import_legacy_files(str(player_file), str(properties_file), str(reminders_file))
+    assert db.load() == {'u1': {'user_id': 'u1', 'nickname': 'alice', 'gold': '10'}}
+    assert db.load_properties() == {'5': {'owner': 'u1', 'level': 1, 'price': 300}}
+    assert db.load_reminders() == {'u1': {'content': '你好', 'expire_time': 99}}
+
+    # 已导入过的数据库不会再次导入
+    db.write_batch([({'user_id': 'u1'}, {'gold': '50'})])
+    assert not db.import_legacy_files(str(player_file), str(properties_file), str(reminders_file))
+    assert db.load()['u1']['gold'] == '50'
+
+
+def test_import_reads_csv_journal_without_side_files(tmp_path, db):
+    player_file = tmp_path / 'players.csv'
+    with open(player_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        writer.writerow(['u1', 'alice', '10'])
+    # 快照之后的修改只在日志中
+    journal = [
+        {'seq': 1, 'user_id': 'u1', 'updates': {'gold': '40'}},
+        {'seq': 2, 'user_id': 'u2', 'updates': {'user_id': 'u2', 'nickname': 'bob', 'gold': '5'}},
+    ]
+    (tmp_path / 'players.journal').write_text(
+        ''.join(json.dumps(entry) + '\n' for entry in journal), encoding='utf-8'
+    )
+    before = _data_files(tmp_path)
+
+    assert db.import_legacy_files(
+        str(player_file), str(tmp_path / 'properties.json'), str(tmp_path / 'reminders.json')
+    )
+    assert db.load() == {
+        'u1': {'user_id': 'u1', 'nickname': 'alice', 'gold': '40'},
+        'u2': {'user_id': 'u2', 'nickname': 'bob', 'gold': '5'},
+    }
+    assert _data_files(tmp_path) == before
@@ -0,0 +1,87 @@
+import csv
+
+
+def _edit_players(game, user_id, **changes):
+    """模拟手动编辑 players.csv: 只修改文件中一名玩家的字段,文件中没有该玩家时按当前数据补上一行"""
+    with open(game.player_file, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        if row['user_id'] == user_id:
+            row.update(changes)
+            break
+    else:
+        rows.append(dict(game.player_store._raw[user_id], **changes))
+    with open(game.player_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=game.STANDARD_FIELDS, quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _compact(game):
+    """把当前数据压缩进快照并等待写出"""
+    storage = game.player_store._storage
+    storage.compact(game.player_store._raw.values())
+    storage.close()
+
+
+def test_manual_edit_of_snapshot_wins_over_journal(game, say):
+    say('u1', 'alice', '注册')
+    say('u1', 'alice', '签到')
+    assert game.get_player('u1').gold != 99999
+
+    _edit_players(game, 'u1', gold='99999')
+    assert game.get_player('u1').gold == 99999
+    game._update_player_data('u1', {'exp': 7})
+
+    game.unload()
+    restarted = type(game)()
+    try:
+        player = restarted.get_player('u1')
+        assert (player.gold, player.exp) == (99999, 7)
+    finally:
+        restarted.unload()
+
+
+def test_manual_edit_keeps_other_players_changes(game, say):
+    say('u1', 'alice', '注册')
+    say('u2', 'bob', '注册')
+    _compact(game)
+    # 快照之后 bob 的修改只在日志中
+    say('u2', 'bob', '签到')
+    bob = game.get_player('u2')
+    assert bob.last_checkin
+
+    _edit_players(game, 'u1', gold='99999')
+    assert game.get_player('u1').gold == 99999
+    after_edit = game.get_player('u2')
+    assert (after_edit.gold, after_edit.last_checkin) == (bob.gold, bob.last_checkin)
+
+    game.unload()
+    restarted = type(game)()
+    try:
+        assert restarted.get_player('u1').gold == 99999
+        restarted_bob = restarted.get_player('u2')
+        assert (restarted_bob.gold, restarted_bob.last_checkin) == (bob.gold, bob.last_checkin)
+    finally:
+        restarted.unload()
+
+
+def test_manual_edit_while_stopped(game, say):
+    say('u1', 'alice', '注册')
+    say('u2', 'bob', '注册')
+    _compact(game)
+    say('u1', 'alice', '签到')
+    say('u2', 'bob', '签到')
+    alice = game.get_player('u1')
+    bob = game.get_player('u2')
+    game.unload()
+    _edit_players(game, 'u1', exp='123')
+
+    restarted = type(game)()
+    try:
+        player = restarted.get_player('u1')
+        # 修改的字段生效,未修改的字段保留日志中的最新值
+        assert (player.exp, player.gold, player.last_checkin) == (123, alice.gold, alice.last_checkin)
+        assert restarted.get_player('u2').gold == bob.gold
+    finally:
+        restarted.unload()
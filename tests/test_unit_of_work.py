@@ -0,0 +1,83 @@
+import pytest
+
+
+def _count_writes(game, monkeypatch):
+    """统计存储后端的写入批次"""
+    storage = game.player_store._storage
+    batches = []
+    write_batch = storage.write_batch
+
+    def counting_write_batch(batch):
+        batches.append(batch)
+        write_batch(batch)
+
+    monkeypatch.setattr(storage, 'write_batch', counting_write_batch)
+    return batches
+
+
+def test_unit_of_work_coalesces_writes(game, say, monkeypatch):
+    say('u1', 'alice', '注册')
+    batches = _count_writes(game, monkeypatch)
+    store = game.player_store
+
+    with store.unit_of_work():
+        game._update_player_data('u1', {'gold': 1})
+        game._update_player_data('u1', {'exp': 2})
+        # 工作单元内读取到本单元的修改,但还没有写入
+        assert game.get_player('u1').gold == 1
+        assert batches == []
+    assert len(batches) == 1
+    assert batches[0][0][1] == {'gold': '1', 'exp': '2'}
+    player = game.get_player('u1')
+    assert (player.gold, player.exp) == (1, 2)
+
+
+def test_unit_of_work_discards_changes_on_error(game, say, monkeypatch):
+    say('u1', 'alice', '注册')
+    gold = game.get_player('u1').gold
+    batches = _count_writes(game, monkeypatch)
+    store = game.player_store
+    committed = []
+
+    with pytest.raises(RuntimeError):
+        with store.unit_of_work():
+            game._update_player_data('u1', {'gold': gold + 100})
+            store.after_commit(lambda: committed.append('inner'))
+            raise RuntimeError("命令中途出错")
+    assert batches == []
+    assert committed == []
+    assert game.get_player('u1').gold == gold
+
+
+def test_after_commit_runs_once_after_outermost_unit(game, say):
+    say('u1', 'alice', '注册')
+    store = game.player_store
+    committed = []
+
+    # 不在工作单元中时立即执行
+    store.after_commit(lambda: committed.append('now'))
+    assert committed == ['now']
+
+    with store.unit_of_work():
+        with store.unit_of_work():
+            game._update_player_data('u1', {'gold': 5})
+            store.after_commit(lambda: committed.append(store.get('u1')['gold']))
+        # 嵌套的工作单元由最外层统一提交
+        assert committed == ['now']
+    assert committed == ['now', 5]
+
+
+def test_stale_player_object_keeps_later_updates(game, say):
+    say('u1', 'alice', '注册')
+    store = game.player_store
+
+    with store.unit_of_work():
+        stale = game.get_player('u1')
+        game._update_player_data('u1', {'gold': 12345})
+        # 较早读取的对象只修改了生命值,保存时不能带回旧的金币
+        stale.hp = 1
+        stale.save_player_data(game.player_file, game.STANDARD_FIELDS)
+        player = game.get_player('u1')
+        assert (player.gold, player.hp) == (12345, 1)
+    player = game.get_player('u1')
+    assert (player.gold, player.hp) == (12345, 1)
@@ -0,0 +1,83 @@
+import json
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def restart(game, say, monkeypatch):
+    """注册玩家后以给定配置重新加载插件,返回新的 Game 和记录写入批次的列表"""
+    for user_id, nickname in [('u1', 'alice'), ('u2', 'bob'), ('u3', 'carol')]:
+        say(user_id, nickname, '注册')
+    game.unload()
+    instances = []
+
+    def start(fail_first=False, **config):
+        with open(game.config_service.config_file, 'w', encoding='utf-8') as f:
+            json.dump(dict(config, write_behind=True), f)
+        instance = type(game)()
+        instances.append(instance)
+        storage = instance.player_store._storage
+        write_batch = storage.write_batch
+        batches = []
+        written = threading.Event()
+
+        def recording_write_batch(batch):
+            if fail_first and not batches:
+                batches.append(None)
+                raise OSError("磁盘已满")
+            write_batch(batch)
+            batches.append([dict(changes or record) for record, changes in batch])
+            written.set()
+
+        monkeypatch.setattr(storage, 'write_batch', recording_write_batch)
+        return instance, batches, written
+
+    yield start
+    for instance in instances:
+        instance.unload()
+
+
+def test_flush_waits_for_interval(restart):
+    game, batches, written = restart(flush_interval=0.5, flush_threshold=100)
+    game._update_player_data('u1', {'gold': 111})
+    game._update_player_data('u1', {'exp': 3})
+    # 修改立即可读,但还没有写入存储
+    assert game.get_player('u1').gold == 111
+    time.sleep(0.2)
+    assert batches == []
+    assert written.wait(5)
+    assert batches == [[{'gold': '111', 'exp': '3'}]]
+
+
+def test_flush_starts_early_at_threshold(restart):
+    game, batches, written = restart(flush_interval=30, flush_threshold=3)
+    game._update_player_data('u1', {'gold': 1})
+    game._update_player_data('u2', {'gold': 2})
+    time.sleep(0.2)
+    assert batches == []
+    game._update_player_data('u3', {'gold': 3})
+    assert written.wait(5)
+    assert batches == [[{'gold': '1'}, {'gold': '2'}, {'gold': '3'}]]
+
+
+def test_failed_batch_is_retried(restart):
+    game, batches, written = restart(fail_first=True, flush_interval=0.1, flush_threshold=100)
+    game._update_player_data('u1', {'gold': 77})
+    assert written.wait(5)
+    # 第一次写入失败,脏数据保留到下一次写入
+    assert batches == [None, [{'gold': '77'}]]
+
+
+def test_unload_persists_pending_changes(restart):
+    game, batches, _ = restart(flush_interval=30, flush_threshold=100)
+    game._update_player_data('u1', {'gold': 4321})
+    game._update_player_data('u2', {'hp': 5})
+    assert batches == []
+    game.unload()
+    assert batches == [[{'gold': '4321'}, {'hp': '5'}]]
+
+    reloaded, _, _ = restart(flush_interval=30, flush_threshold=100)
+    assert reloaded.get_player('u1').gold == 4321
+    assert reloaded.get_player('u2').hp == 5